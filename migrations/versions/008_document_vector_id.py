@@ -0,0 +1,32 @@
+"""Add documents.vector_document_id for batched chunk -> document lookups.
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-16
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "008"
+down_revision: Union[str, None] = "007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("documents", sa.Column("vector_document_id", sa.String(64), nullable=True))
+    # Backfill from the content-derived ID already stored in the metadata
+    op.execute(
+        "UPDATE documents SET vector_document_id = metadata->>'document_id' "
+        "WHERE metadata ? 'document_id'"
+    )
+    op.create_index("ix_documents_vector_document_id", "documents", ["vector_document_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_documents_vector_document_id", table_name="documents")
+    op.drop_column("documents", "vector_document_id")
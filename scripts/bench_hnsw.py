@@ -0,0 +1,88 @@
+"""Latency/recall report for HNSW parameters, to choose RAG_HNSW_* settings.
+
+Loads the same clustered fixture corpus as bench_quantization (or a ``.npy``
+of real embeddings) into an embedded Chroma collection per (M,
+construction_ef, search_ef) combination. Recall@k is measured
+against exact float32 search; latency is a single-query ``collection.query``
+round trip, reported as p50/p99.
+
+Usage:
+    python -m scripts.bench_hnsw
+    python -m scripts.bench_hnsw --vectors 100000 --m 16 32 48 --search-ef 50 100 200 400
+    python -m scripts.bench_hnsw --corpus embeddings.npy
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from scripts.bench_quantization import _fixture_corpus
+from src.rag.client import create_chroma_client
+from src.rag.hnsw import HNSWConfig
+from src.rag.quantized import normalize_rows
+
+
+def _percentile(ordered: list[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def main(args: argparse.Namespace) -> None:
+    if args.corpus:
+        corpus = normalize_rows(np.load(args.corpus).astype(np.float32))
+    else:
+        corpus = _fixture_corpus(args.vectors, args.dim, args.clusters, args.seed)
+    rng = np.random.default_rng(args.seed + 1)
+    picks = rng.integers(0, len(corpus), args.queries)
+    noise = rng.standard_normal((args.queries, corpus.shape[1])).astype(np.float32)
+    queries = normalize_rows(corpus[picks] + noise * np.float32(0.3 / np.sqrt(corpus.shape[1])))
+    truth = [set(np.argsort(-(corpus @ q))[: args.k].tolist()) for q in queries]
+    ids = [str(i) for i in range(len(corpus))]
+
+    print(f"corpus {len(corpus)} x {corpus.shape[1]}, {args.queries} queries, recall@{args.k}")
+    print(f"{'M':>4} {'constr_ef':>9} {'search_ef':>9} {'build s':>8} {'recall':>7} {'p50 ms':>7} {'p99 ms':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        client = create_chroma_client("persistent", persist_path=tmp)
+        for m in args.m:
+            for construction_ef in args.construction_ef:
+                for search_ef in args.search_ef:
+                    name = f"bench_hnsw_{m}_{construction_ef}_{search_ef}"
+                    config = HNSWConfig(M=m, construction_ef=construction_ef, search_ef=search_ef)
+                    collection = client.get_or_create_collection(
+                        name=name, metadata=config.metadata_for(name)
+                    )
+                    start = time.perf_counter()
+                    for offset in range(0, len(corpus), 5000):
+                        collection.add(
+                            ids=ids[offset:offset + 5000], embeddings=corpus[offset:offset + 5000]
+                        )
+                    build = time.perf_counter() - start
+                    samples, recalls = [], []
+                    for q, expected in zip(queries, truth):
+                        start = time.perf_counter()
+                        hits = collection.query(query_embeddings=[q], n_results=args.k, include=[])
+                        samples.append((time.perf_counter() - start) * 1000)
+                        recalls.append(len(expected & {int(i) for i in hits["ids"][0]}) / args.k)
+                    ordered = sorted(samples)
+                    print(
+                        f"{m:>4} {construction_ef:>9} {search_ef:>9} {build:8.1f} "
+                        f"{statistics.mean(recalls):7.4f} {statistics.median(samples):7.2f} "
+                        f"{_percentile(ordered, 0.99):7.2f}"
+                    )
+                    client.delete_collection(name)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", default=None, help=".npy file of embeddings (overrides the fixture)")
+    parser.add_argument("--vectors", type=int, default=10000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--m", type=int, nargs="+", default=[16, 32])
+    parser.add_argument("--construction-ef", type=int, nargs="+", default=[100])
+    parser.add_argument("--search-ef", type=int, nargs="+", default=[10, 50, 100])
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
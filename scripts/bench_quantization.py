@@ -0,0 +1,92 @@
+"""Recall vs memory of quantized vector storage, to pick CHROMA_QUANTIZATION.
+
+Builds a fixture corpus of clustered unit vectors (384 dimensions by
+default, like all-MiniLM-L6-v2), or loads real embeddings from a ``.npy``
+file, and compares float32 exact search against each quantization and
+re-scoring factor. Queries are perturbed corpus vectors; recall@k is
+measured against the exact float32 top-k. Resident bytes cover what stays
+in RAM (codes, scales, liveness mask); the float32 vectors used for
+re-scoring stay on disk in the quantized store.
+
+Usage:
+    python -m scripts.bench_quantization
+    python -m scripts.bench_quantization --vectors 200000 --k 10 --rescore 1 4 8
+    python -m scripts.bench_quantization --corpus embeddings.npy
+"""
+
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from src.rag.quantized import QUANTIZATION_MODES, QuantizedIndex, normalize_rows
+
+
+def _fixture_corpus(n: int, dim: int, clusters: int, seed: int) -> np.ndarray:
+    """Clustered unit vectors: sentence embeddings are far from isotropic."""
+    rng = np.random.default_rng(seed)
+    centres = normalize_rows(rng.standard_normal((clusters, dim)).astype(np.float32))
+    assignment = rng.integers(0, clusters, n)
+    noise = rng.standard_normal((n, dim)).astype(np.float32) * np.float32(0.6 / np.sqrt(dim))
+    return normalize_rows(centres[assignment] + noise)
+
+
+def _recall(found: list[np.ndarray], truth: np.ndarray) -> float:
+    return float(np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)]))
+
+
+def main(args: argparse.Namespace) -> None:
+    if args.corpus:
+        corpus = normalize_rows(np.load(args.corpus).astype(np.float32))
+    else:
+        corpus = _fixture_corpus(args.vectors, args.dim, args.clusters, args.seed)
+    rng = np.random.default_rng(args.seed + 1)
+    picks = rng.integers(0, len(corpus), args.queries)
+    noise = rng.standard_normal((args.queries, corpus.shape[1])).astype(np.float32)
+    queries = normalize_rows(corpus[picks] + noise * np.float32(0.3 / np.sqrt(corpus.shape[1])))
+
+    truth, samples = [], []
+    for q in queries:
+        start = time.perf_counter()
+        scores = corpus @ q
+        top = np.argpartition(-scores, args.k - 1)[: args.k]
+        truth.append(top[np.argsort(-scores[top])])
+        samples.append((time.perf_counter() - start) * 1000)
+    float_ms = statistics.median(samples)
+
+    print(f"corpus {len(corpus)} x {corpus.shape[1]}, {args.queries} queries, recall@{args.k}")
+    print(f"{'setting':>18} {'recall':>8} {'bytes/vec':>10} {'resident MB':>12} {'ms/query':>9}")
+    print(
+        f"{'float32':>18} {1.0:8.4f} {corpus.shape[1] * 4:10d} "
+        f"{corpus.nbytes / 2**20:12.1f} {float_ms:9.2f}"
+    )
+    for mode in args.modes:
+        for factor in args.rescore:
+            index = QuantizedIndex(mode, rescore_factor=factor)
+            index.set_rows(np.arange(len(corpus)), corpus)
+            found, samples = [], []
+            for q in queries:
+                start = time.perf_counter()
+                rows, _ = index.search(q, args.k, lambda r: corpus[r])[0]
+                samples.append((time.perf_counter() - start) * 1000)
+                found.append(rows)
+            print(
+                f"{f'{mode} x{factor}':>18} {_recall(found, truth):8.4f} "
+                f"{index.nbytes() / len(corpus):10.1f} {index.nbytes() / 2**20:12.1f} "
+                f"{statistics.median(samples):9.2f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", default=None, help=".npy file of embeddings (overrides the fixture)")
+    parser.add_argument("--vectors", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--modes", nargs="+", default=list(QUANTIZATION_MODES), choices=QUANTIZATION_MODES)
+    parser.add_argument("--rescore", nargs="+", type=int, default=[1, 2, 4])
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
@@ -0,0 +1,103 @@
+"""Benchmark batched retrieval against sequential retrieve() calls.
+
+Runs against the ChromaDB server configured in settings (CHROMA_HOST /
+CHROMA_PORT). If the target collection is empty, it is seeded with a small
+synthetic corpus first.
+
+Usage:
+    python -m scripts.bench_retrieval --queries 8 --rounds 5
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from src.config import settings
+from src.rag.retriever import KnowledgeRetriever
+
+TOPICS = [
+    "photosynthesis converts light energy into chemical energy in chloroplasts",
+    "newton's second law relates force, mass and acceleration",
+    "the french revolution began in 1789 and reshaped european politics",
+    "mitosis divides a cell nucleus into two identical nuclei",
+    "the pythagorean theorem relates the sides of a right triangle",
+    "supply and demand determine market prices in a free economy",
+    "the water cycle moves water through evaporation, condensation and precipitation",
+    "ionic bonds form when electrons transfer between atoms",
+    "shakespeare wrote tragedies such as hamlet and macbeth",
+    "plate tectonics explains earthquakes and mountain formation",
+]
+
+QUESTIONS = [
+    "How do plants make food from sunlight?",
+    "What is the relationship between force and acceleration?",
+    "When did the French Revolution start?",
+    "How does a cell divide?",
+    "How do you find the hypotenuse of a triangle?",
+    "What sets prices in a market?",
+    "How does rain form?",
+    "What is an ionic bond?",
+    "Who wrote Hamlet?",
+    "What causes earthquakes?",
+]
+
+
+async def _seed(retriever: KnowledgeRetriever) -> None:
+    collection = await retriever._acquire_collection()
+    count, _ = await retriever._executor.run(collection.count)
+    if count:
+        return
+    ids, docs, metas = [], [], []
+    for t, topic in enumerate(TOPICS):
+        for variant in range(20):
+            ids.append(f"bench_{t}_{variant}")
+            docs.append(f"{topic}. Example {variant}: {topic.split()[0]} explained for grade {variant % 12 + 1}.")
+            metas.append({"subject": "bench", "document_id": f"bench_{t}"})
+    await retriever.add_chunks(ids=ids, documents=docs, metadatas=metas)
+
+
+def _summary(samples: list[float]) -> str:
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return f"mean {statistics.mean(samples):8.2f} ms   p50 {statistics.median(samples):8.2f} ms   p95 {p95:8.2f} ms"
+
+
+async def main(num_queries: int, rounds: int, k: int, collection: str) -> None:
+    retriever = KnowledgeRetriever(
+        chroma_host=settings.CHROMA_HOST,
+        chroma_port=settings.CHROMA_PORT,
+        collection_name=collection,
+    )
+    await retriever.initialize()
+    await _seed(retriever)
+
+    queries = [QUESTIONS[i % len(QUESTIONS)] for i in range(num_queries)]
+    sequential: list[float] = []
+    batched: list[float] = []
+
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for q in queries:
+            await retriever.retrieve(q, k=k, rewrite=False, use_cache=False)
+        sequential.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        await retriever.retrieve_many(queries, k=k, rewrite=False, use_cache=False)
+        batched.append((time.perf_counter() - start) * 1000)
+
+    print(f"{num_queries} queries x {rounds} rounds, k={k}")
+    print(f"  sequential retrieve(): {_summary(sequential)}")
+    print(f"  retrieve_many():       {_summary(batched)}")
+    print(f"  speedup (mean):        {statistics.mean(sequential) / statistics.mean(batched):.2f}x")
+    retriever.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--collection", default="bench_retrieval")
+    args = parser.parse_args()
+    asyncio.run(main(args.queries, args.rounds, args.k, args.collection))
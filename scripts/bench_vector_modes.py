@@ -0,0 +1,109 @@
+"""Benchmark retrieval latency in HTTP vs embedded (persistent) Chroma mode.
+
+Seeds the same synthetic corpus into each mode and times retrieve() calls
+(cache and rewriting off), reporting p50/p99. Embeddings come from a cheap
+deterministic hashing embedder so the numbers reflect the vector store
+round trip, not model inference. HTTP mode uses CHROMA_HOST / CHROMA_PORT
+and is skipped if the server is unreachable.
+
+Usage:
+    python -m scripts.bench_vector_modes --queries 200
+    python -m scripts.bench_vector_modes --modes persistent --persist-path /tmp/chroma-bench
+"""
+
+import argparse
+import asyncio
+import hashlib
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from scripts.bench_retrieval import QUESTIONS, TOPICS
+from src.config import settings
+from src.rag.embedding_store import EmbeddingStore
+from src.rag.embeddings import EmbeddingService
+from src.rag.retriever import KnowledgeRetriever
+
+DIM = 64
+
+
+def _hash_embed(texts: list[str]) -> list[np.ndarray]:
+    """Bag-of-words feature hashing into DIM dimensions, L2-normalized."""
+    vectors = []
+    for text in texts:
+        vec = np.zeros(DIM, dtype=np.float32)
+        for word in text.lower().split():
+            vec[int.from_bytes(hashlib.blake2b(word.encode(), digest_size=4).digest(), "little") % DIM] += 1
+        vectors.append(vec / (np.linalg.norm(vec) or 1.0))
+    return vectors
+
+
+def _percentile(ordered: list[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+async def _bench_mode(mode: str, persist_path: str, collection: str, queries: int, k: int):
+    embedder = EmbeddingService(embedding_function=_hash_embed, model_id="bench-hash")
+    retriever = KnowledgeRetriever(
+        chroma_host=settings.CHROMA_HOST,
+        chroma_port=settings.CHROMA_PORT,
+        chroma_mode=mode,
+        chroma_persist_path=persist_path,
+        collection_name=collection,
+        embedder=embedder,
+        embedding_store=EmbeddingStore(f"{persist_path}/embeddings", model_id="bench-hash"),
+    )
+    try:
+        await retriever.initialize()
+    except ValueError as exc:  # chromadb reports an unreachable server as ValueError
+        await embedder.close()
+        retriever.close()
+        print(f"{mode:>10}: skipped ({exc})")
+        return
+
+    ids, docs, metas = [], [], []
+    for t, topic in enumerate(TOPICS):
+        for variant in range(50):
+            ids.append(f"bench_{t}_{variant}")
+            docs.append(f"{topic}. Example {variant}: {topic.split()[0]} explained for grade {variant % 12 + 1}.")
+            metas.append({"subject": "bench", "document_id": f"bench_{t}", "chunk_index": variant})
+    await retriever.add_chunks(ids=ids, documents=docs, metadatas=metas)
+
+    # Warm up connections and the query embedding cache path
+    for question in QUESTIONS:
+        await retriever.retrieve(question, k=k, rewrite=False, use_cache=False)
+
+    samples = []
+    for i in range(queries):
+        start = time.perf_counter()
+        await retriever.retrieve(QUESTIONS[i % len(QUESTIONS)], k=k, rewrite=False, use_cache=False)
+        samples.append((time.perf_counter() - start) * 1000)
+    await embedder.close()
+    retriever.close()
+
+    ordered = sorted(samples)
+    print(
+        f"{mode:>10}: p50 {statistics.median(samples):7.2f} ms   "
+        f"p99 {_percentile(ordered, 0.99):7.2f} ms   mean {statistics.mean(samples):7.2f} ms"
+    )
+
+
+async def main(modes: list[str], persist_path: str | None, collection: str, queries: int, k: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = persist_path or tmp
+        print(f"{queries} retrievals per mode, k={k}, corpus {len(TOPICS) * 50} chunks")
+        for mode in modes:
+            await _bench_mode(mode, path, collection, queries, k)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modes", nargs="+", default=["http", "persistent"], choices=["http", "persistent", "quantized"])
+    parser.add_argument("--persist-path", default=None, help="Defaults to a temporary directory")
+    parser.add_argument("--collection", default="bench_vector_modes")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.modes, args.persist_path, args.collection, args.queries, args.k))
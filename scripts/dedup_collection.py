@@ -0,0 +1,42 @@
+"""Report and remove duplicate chunks from a ChromaDB collection.
+
+Chunks ingested before content-derived IDs were introduced got random or
+process-salted IDs, so the same text may be stored several times. This
+keeps the first copy of each identical chunk and deletes the rest.
+
+Usage:
+    python -m scripts.dedup_collection                 # report only
+    python -m scripts.dedup_collection --apply         # delete duplicates
+"""
+
+import argparse
+import asyncio
+import json
+
+from src.config import settings
+from src.rag.bm25 import BM25Index
+from src.rag.retriever import KnowledgeRetriever
+
+
+async def main(collection: str, apply: bool) -> None:
+    keyword_index = None
+    if settings.RAG_HYBRID_ENABLED:
+        keyword_index = BM25Index.load(settings.RAG_BM25_INDEX_PATH)
+    retriever = KnowledgeRetriever(
+        chroma_host=settings.CHROMA_HOST,
+        chroma_port=settings.CHROMA_PORT,
+        collection_name=collection,
+        keyword_index=keyword_index,
+    )
+    await retriever.initialize()
+    report = await retriever.deduplicate(dry_run=not apply)
+    print(json.dumps(report, indent=2))
+    retriever.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--collection", default="educational_content")
+    parser.add_argument("--apply", action="store_true", help="delete duplicates (default: report only)")
+    args = parser.parse_args()
+    asyncio.run(main(args.collection, args.apply))
@@ -0,0 +1,62 @@
+"""Rebuild ChromaDB collections with the configured HNSW parameters and swap them in.
+
+Copies every chunk, with its stored embedding, into a new collection created
+with RAG_HNSW_* / RAG_HNSW_OVERRIDES, then points the collection's alias at
+the copy and drops the old collection. API workers on this host share the
+RAG_WRITE_LOCK_PATH lock with the script and mirror their writes into the
+copy while it is built, so the API can keep running. Also compacts
+collections after heavy deletes.
+
+Usage:
+    python -m scripts.rebuild_collection                          # every collection holding chunks
+    python -m scripts.rebuild_collection --name educational_content__math
+    RAG_HNSW_M=32 python -m scripts.rebuild_collection
+"""
+
+import argparse
+import asyncio
+import json
+
+from src.config import settings
+from src.rag.hnsw import HNSWConfig
+from src.rag.retriever import KnowledgeRetriever
+from src.rag.sharding import ShardRouter
+
+
+async def main(collection: str, names: list[str] | None, batch_size: int) -> None:
+    retriever = KnowledgeRetriever(
+        chroma_host=settings.CHROMA_HOST,
+        chroma_port=settings.CHROMA_PORT,
+        chroma_mode=settings.CHROMA_MODE,
+        chroma_persist_path=settings.CHROMA_PERSIST_PATH,
+        chroma_quantization=settings.CHROMA_QUANTIZATION,
+        chroma_rescore_factor=settings.CHROMA_RESCORE_FACTOR,
+        collection_name=collection,
+        shard_router=ShardRouter(
+            base_name=collection,
+            shard_key=settings.RAG_SHARD_KEY,
+            default_shard=settings.RAG_SHARD_DEFAULT,
+        ) if settings.RAG_SHARDING_ENABLED else None,
+        hnsw=HNSWConfig(
+            M=settings.RAG_HNSW_M,
+            construction_ef=settings.RAG_HNSW_CONSTRUCTION_EF,
+            search_ef=settings.RAG_HNSW_SEARCH_EF,
+            overrides=settings.RAG_HNSW_OVERRIDES,
+        ),
+        write_lock_path=settings.RAG_WRITE_LOCK_PATH or None,
+    )
+    await retriever.initialize()
+    report = await retriever.rebuild(names=names, batch_size=batch_size)
+    print(json.dumps(report, indent=2))
+    retriever.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--collection", default="educational_content")
+    parser.add_argument(
+        "--name", action="append", dest="names", help="collection to rebuild (repeatable)"
+    )
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(main(args.collection, args.names, args.batch_size))
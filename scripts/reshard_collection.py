@@ -0,0 +1,53 @@
+"""Redistribute an unsharded ChromaDB collection into per-subject shard collections.
+
+Each chunk is copied, with its stored embedding, into
+``{collection}__{value}`` where ``value`` is the chunk's shard-key metadata
+(RAG_SHARD_KEY, ``subject`` by default). Re-running is safe; chunks are
+upserted by ID. Enable RAG_SHARDING_ENABLED once the copy is done.
+
+Usage:
+    python -m scripts.reshard_collection                        # copy only
+    python -m scripts.reshard_collection --shard-key grade_level
+    python -m scripts.reshard_collection --delete-source        # drop the old collection
+"""
+
+import argparse
+import asyncio
+import json
+
+from src.config import settings
+from src.rag.retriever import KnowledgeRetriever
+from src.rag.sharding import ShardRouter
+
+
+async def main(collection: str, shard_key: str, batch_size: int, delete_source: bool) -> None:
+    retriever = KnowledgeRetriever(
+        chroma_host=settings.CHROMA_HOST,
+        chroma_port=settings.CHROMA_PORT,
+        chroma_mode=settings.CHROMA_MODE,
+        chroma_persist_path=settings.CHROMA_PERSIST_PATH,
+        chroma_quantization=settings.CHROMA_QUANTIZATION,
+        chroma_rescore_factor=settings.CHROMA_RESCORE_FACTOR,
+        collection_name=collection,
+        shard_router=ShardRouter(
+            base_name=collection,
+            shard_key=shard_key,
+            default_shard=settings.RAG_SHARD_DEFAULT,
+        ),
+    )
+    await retriever.initialize()
+    report = await retriever.reshard(batch_size=batch_size, delete_source=delete_source)
+    print(json.dumps(report, indent=2))
+    retriever.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--collection", default="educational_content")
+    parser.add_argument("--shard-key", default=settings.RAG_SHARD_KEY)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument(
+        "--delete-source", action="store_true", help="drop the source collection after copying"
+    )
+    args = parser.parse_args()
+    asyncio.run(main(args.collection, args.shard_key, args.batch_size, args.delete_source))
@@ -0,0 +1,50 @@
+"""Strip document-level fields from chunk metadata already stored in ChromaDB.
+
+Chunks ingested before metadata slimming carry the whole enriched document
+metadata (key_terms, summary, llm_analysis, ...). Chroma merges metadata on
+upsert, so re-ingesting does not remove them; this removes every key not in
+CHUNK_METADATA_FIELDS. Document-level metadata stays in documents.metadata
+in Postgres, where citations resolve it from (apply migration 008 first).
+
+Usage:
+    python -m scripts.slim_chunk_metadata                 # report only
+    python -m scripts.slim_chunk_metadata --apply         # remove the keys
+"""
+
+import argparse
+import asyncio
+import json
+
+from src.config import settings
+from src.documents.metadata import CHUNK_METADATA_FIELDS
+from src.rag.retriever import KnowledgeRetriever
+from src.rag.sharding import ShardRouter
+
+
+async def main(collection: str, apply: bool) -> None:
+    retriever = KnowledgeRetriever(
+        chroma_host=settings.CHROMA_HOST,
+        chroma_port=settings.CHROMA_PORT,
+        chroma_mode=settings.CHROMA_MODE,
+        chroma_persist_path=settings.CHROMA_PERSIST_PATH,
+        chroma_quantization=settings.CHROMA_QUANTIZATION,
+        chroma_rescore_factor=settings.CHROMA_RESCORE_FACTOR,
+        collection_name=collection,
+        shard_router=ShardRouter(
+            base_name=collection,
+            shard_key=settings.RAG_SHARD_KEY,
+            default_shard=settings.RAG_SHARD_DEFAULT,
+        ) if settings.RAG_SHARDING_ENABLED else None,
+    )
+    await retriever.initialize()
+    report = await retriever.prune_metadata(CHUNK_METADATA_FIELDS, dry_run=not apply)
+    print(json.dumps(report, indent=2))
+    retriever.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--collection", default="educational_content")
+    parser.add_argument("--apply", action="store_true", help="remove the keys (default: report only)")
+    args = parser.parse_args()
+    asyncio.run(main(args.collection, args.apply))
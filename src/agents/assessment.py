@@ -17,9 +17,10 @@ class AssessmentAgent(BaseAgent):
 
     def __init__(self, config: AgentConfig | None = None):
         if config is None:
-            config = AgentConfig(name="assessment", temperature=0.5)
+            config = AgentConfig(name="assessment", temperature=0.5, priority="grading")
         super().__init__(config)
-        self.generator = QuestionGenerator(llm=self.llm)
+        # Question generation is bulk work: queue it behind grading
+        self.generator = QuestionGenerator(llm=self._initialize_llm(priority="background"))
         self.grader = AutoGrader(llm=self.llm)
 
     def get_system_prompt(self, context: AgentContext) -> str:
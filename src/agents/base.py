@@ -13,6 +13,7 @@ class AgentConfig(BaseModel):
     model: str = settings.DEFAULT_MODEL
     temperature: float = 0.7
     max_tokens: int = 4096
+    priority: str = "interactive"  # LLM scheduling class (src.llm.scheduler.PRIORITIES)
     tools: list[str] = []
     memory_enabled: bool = True
 
@@ -56,11 +57,19 @@ class BaseAgent(ABC):
         """Generate system prompt based on context."""
         pass
 
-    def _initialize_llm(self):
-        """Initialize the LLM with configuration."""
+    def _initialize_llm(self, priority: str | None = None):
+        """Initialize the LLM with configuration, scheduled at ``priority`` (default: config's)."""
         from src.llm.factory import LLMFactory
 
-        return LLMFactory.create(
+        priority = priority or self.config.priority
+        if settings.LLM_ROUTING_PROVIDERS:
+            return LLMFactory.routed(
+                temperature=self.config.temperature,
+                max_tokens=self.config.max_tokens,
+                priority=priority,
+            )
+        return LLMFactory.get(
             temperature=self.config.temperature,
             max_tokens=self.config.max_tokens,
+            priority=priority,
         )
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from collections.abc import AsyncIterator
 from typing import TYPE_CHECKING
 
 from src.agents.base import AgentContext, AgentResponse
@@ -7,6 +8,8 @@ from src.agents.tutor import TutorAgent
 from src.memory.student_context import StudentContextBuilder
 
 if TYPE_CHECKING:
+    from langchain_core.language_models.chat_models import BaseChatModel
+
     from src.memory.manager import MemoryManager
     from src.rag.retriever import KnowledgeRetriever
 
@@ -39,11 +42,29 @@ class MasterOrchestrator:
             context_builder=self.context_builder,
         )
 
-    async def process(self, message: str, context: AgentContext) -> AgentResponse:
+    async def process(
+        self, message: str, context: AgentContext, llm: BaseChatModel | None = None
+    ) -> AgentResponse:
         """Route a message to the appropriate agent and return its response.
 
         Enriches the context with mastery/struggle data before routing.
+        ``llm`` overrides the agent's model for this message only.
         """
+        await self._enrich_profile(context)
+
+        # For now, all messages go to the tutor agent.
+        agent = self.agents["tutor"]
+        return await agent.process(message, context, llm=llm)
+
+    async def process_stream(
+        self, message: str, context: AgentContext, llm: BaseChatModel | None = None
+    ) -> AsyncIterator[str | AgentResponse]:
+        """Streaming ``process``: yields text chunks, then the final ``AgentResponse``."""
+        await self._enrich_profile(context)
+        async for item in self.agents["tutor"].stream(message, context, llm=llm):
+            yield item
+
+    async def _enrich_profile(self, context: AgentContext) -> None:
         # Enrich student profile with mastery data if available
         if self.memory_manager and context.student_id:
             try:
@@ -55,10 +76,6 @@ class MasterOrchestrator:
             except Exception:
                 pass
 
-        # For now, all messages go to the tutor agent.
-        agent = self.agents["tutor"]
-        return await agent.process(message, context)
-
     async def close(self) -> None:
         """Cleanup resources."""
         pass
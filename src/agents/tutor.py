@@ -1,8 +1,11 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 import re
 import time
+from collections import deque
+from collections.abc import AsyncIterator
 from typing import TYPE_CHECKING, Any
 
 logger = logging.getLogger(__name__)
@@ -11,8 +14,11 @@ from langchain_core.messages import HumanMessage, SystemMessage
 
 from src.agents.base import AgentConfig, AgentContext, AgentResponse, BaseAgent
 from src.agents.strategies import StrategySelector, TeachingStrategy
+from src.config import settings
 
 if TYPE_CHECKING:
+    from langchain_core.language_models.chat_models import BaseChatModel
+
     from src.memory.manager import MemoryManager
     from src.memory.student_context import StudentContextBuilder
     from src.rag.retriever import KnowledgeRetriever
@@ -24,7 +30,15 @@ VISUAL_KEYWORDS = re.compile(
 
 
 class TutorAgent(BaseAgent):
-    """Adaptive tutoring agent with strategy selection and enriched context."""
+    """Adaptive tutoring agent with strategy selection and enriched context.
+
+    The pre-LLM stages (``context``, ``confusion``, ``retrieval``) are
+    independent and run concurrently, each bounded by its entry in
+    ``stage_timeouts`` (seconds). A stage that fails or times out is skipped
+    and the turn continues without it. Everything skipped is listed in the
+    response's ``degraded_stages``, including failed parts of the student
+    context as ``context.<part>``.
+    """
 
     strategy_selector: StrategySelector = StrategySelector()
 
@@ -34,6 +48,7 @@ class TutorAgent(BaseAgent):
         memory: MemoryManager | None = None,
         context_builder: StudentContextBuilder | None = None,
         config: AgentConfig | None = None,
+        stage_timeouts: dict[str, float] | None = None,
     ):
         if config is None:
             config = AgentConfig(name="tutor")
@@ -41,6 +56,14 @@ class TutorAgent(BaseAgent):
         self.retriever = retriever
         self.memory = memory
         self.context_builder = context_builder
+        self.stage_timeouts = {
+            "context": settings.TUTOR_CONTEXT_TIMEOUT_SECONDS,
+            "confusion": settings.TUTOR_CONFUSION_TIMEOUT_SECONDS,
+            "retrieval": settings.TUTOR_RETRIEVAL_TIMEOUT_SECONDS,
+            **(stage_timeouts or {}),
+        }
+        self.streams = 0
+        self._ttft_samples: deque[float] = deque(maxlen=1000)
 
     def get_system_prompt(
         self,
@@ -127,21 +150,87 @@ class TutorAgent(BaseAgent):
             f"{strategy_instructions}"
         )
 
-    async def process(self, input_text: str, context: AgentContext) -> AgentResponse:
-        """Process student input and generate a tutoring response."""
+    async def process(
+        self, input_text: str, context: AgentContext, llm: BaseChatModel | None = None
+    ) -> AgentResponse:
+        """Process student input and generate a tutoring response.
+
+        ``llm`` replaces the agent's own model for this call only (e.g. a
+        per-request provider/model override); the agent itself is unchanged.
+        """
+        turn = await self._prepare_turn(input_text, context)
+
+        # Call the LLM.
+        llm_start = time.perf_counter()
+        response = await (llm or self.llm).ainvoke(turn["messages"])
+        response_text: str = response.content  # type: ignore[assignment]
+        turn["stage_timings"]["llm_ms"] = round((time.perf_counter() - llm_start) * 1000, 2)
+
+        return self._finish_turn(input_text, response_text, turn)
+
+    async def stream(
+        self, input_text: str, context: AgentContext, llm: BaseChatModel | None = None
+    ) -> AsyncIterator[str | AgentResponse]:
+        """Like ``process``, but yield the response text in chunks as the LLM produces them.
+
+        The last item is the complete ``AgentResponse``. Its ``stage_timings``
+        include ``ttft_ms``, the time from the start of the turn to the first
+        chunk, which is also kept for ``stats()``.
+        """
+        turn = await self._prepare_turn(input_text, context)
+        timings = turn["stage_timings"]
+        self.streams += 1
+
+        llm_start = time.perf_counter()
+        parts: list[str] = []
+        async for chunk in (llm or self.llm).astream(turn["messages"]):
+            text = self._chunk_text(chunk)
+            if not text:
+                continue
+            if not parts:
+                timings["ttft_ms"] = round((time.time() - turn["start"]) * 1000, 2)
+                self._ttft_samples.append(timings["ttft_ms"])
+            parts.append(text)
+            yield text
+        timings["llm_ms"] = round((time.perf_counter() - llm_start) * 1000, 2)
+
+        yield self._finish_turn(input_text, "".join(parts), turn)
+
+    async def _prepare_turn(self, input_text: str, context: AgentContext) -> dict[str, Any]:
+        """Run the pre-LLM stages and build the prompt messages for one turn."""
         start = time.time()
 
-        # Build enriched context if context_builder is available
-        enriched_context: dict[str, Any] | None = None
+        # Pre-LLM stages: none needs another's output, so run them together
+        stages: dict[str, Any] = {}
         if self.context_builder:
-            try:
-                enriched_context = await self.context_builder.build_context(
-                    student_id=context.student_id,
-                    session_id=context.session_id,
-                )
-            except Exception:
-                logger.warning("Failed to build enriched context for student %s", context.student_id, exc_info=True)
-                enriched_context = None
+            stages["context"] = self.context_builder.build_context(
+                student_id=context.student_id,
+                session_id=context.session_id,
+            )
+        if self.memory and context.current_topic:
+            stages["confusion"] = self.memory.track_confusion(
+                context.session_id, context.current_topic
+            )
+        if self.retriever is not None:
+            stages["retrieval"] = self.retriever.retrieve(
+                query=input_text,
+                subject=context.current_subject,
+            )
+        stage_timings: dict[str, float] = {}
+        degraded: list[str] = []
+        pre_llm_start = time.perf_counter()
+        results = await asyncio.gather(
+            *(self._run_stage(name, coro, stage_timings, degraded) for name, coro in stages.items())
+        )
+        stage_timings["pre_llm_ms"] = round((time.perf_counter() - pre_llm_start) * 1000, 2)
+        outputs = dict(zip(stages, results))
+
+        enriched_context: dict[str, Any] | None = outputs.get("context")
+        if enriched_context:
+            # Parts of the context that failed on their own, e.g. "context.knowledge_gaps"
+            degraded.extend(f"context.{part}" for part in enriched_context.get("degraded", []))
+        confusion_count: int | None = outputs.get("confusion")
+        rag_result: dict[str, Any] = outputs.get("retrieval") or {}
 
         # Select teaching strategy based on student mastery and history
         strategy: TeachingStrategy | None = None
@@ -169,27 +258,10 @@ class TutorAgent(BaseAgent):
             previous_strategy=previous_strategy,
         )
 
-        # Track confusion if same topic asked 3+ times
-        if self.memory and context.current_topic:
-            try:
-                confusion_count = await self.memory.track_confusion(
-                    context.session_id, context.current_topic
-                )
-                if confusion_count >= 3:
-                    # Switch to scaffolded for confused students
-                    strategy = TeachingStrategy.scaffolded
-            except Exception:
-                logger.warning("Failed to track confusion for topic %s", context.current_topic, exc_info=True)
-
-        # Retrieve relevant knowledge if a retriever is available.
-        rag_result: dict[str, Any] = {}
-        if self.retriever is not None:
-            rag_result = await self.retriever.retrieve(
-                query=input_text,
-                subject=context.current_subject,
-            )
+        # Same topic asked 3+ times: switch to scaffolded for confused students
+        if confusion_count is not None and confusion_count >= 3:
+            strategy = TeachingStrategy.scaffolded
 
-        knowledge_sources: list[dict[str, Any]] = rag_result.get("sources", [])
         knowledge_text: str = rag_result.get("context", "")
 
         # Build message list.
@@ -220,21 +292,47 @@ class TutorAgent(BaseAgent):
 
         messages.append(HumanMessage(content=input_text))
 
-        # Call the LLM.
-        response = await self.llm.ainvoke(messages)
-        response_text: str = response.content  # type: ignore[assignment]
-
-        elapsed = time.time() - start
+        return {
+            "start": start,
+            "messages": messages,
+            "strategy": strategy,
+            "rag_result": rag_result,
+            "stages": list(stages),
+            "stage_timings": stage_timings,
+            "degraded": degraded,
+        }
+
+    def _finish_turn(self, input_text: str, response_text: str, turn: dict[str, Any]) -> AgentResponse:
+        """Build the ``AgentResponse`` (sources, strategy, timings) for a completed turn."""
+        elapsed = time.time() - turn["start"]
+        rag_result = turn["rag_result"]
+        strategy = turn["strategy"]
+        stage_timings = turn["stage_timings"]
+        knowledge_sources: list[dict[str, Any]] = rag_result.get("sources", [])
 
         metadata: dict[str, Any] = {}
         if knowledge_sources:
+            citations = rag_result.get("citations") or []
             metadata["knowledge_sources"] = [
-                src.get("metadata", {}).get("source", "unknown")
-                for src in knowledge_sources
+                citations[i]["source"] if i < len(citations)
+                else src.get("metadata", {}).get("source", "unknown")
+                for i, src in enumerate(knowledge_sources)
             ]
+        if rag_result.get("packing"):
+            metadata["context_tokens"] = rag_result["packing"]["packed_tokens"]
+            metadata["context_tokens_saved"] = rag_result["packing"]["tokens_saved"]
         metadata["needs_visual_aid"] = self._needs_visual_aid(input_text, response_text)
         if strategy:
             metadata["teaching_strategy"] = strategy.value
+        stage_timings["total_ms"] = round(elapsed * 1000, 2)
+        metadata["stage_timings"] = stage_timings
+        if turn["stages"]:
+            # The slowest pre-LLM stage bounds the time to the LLM call
+            metadata["critical_path"] = max(
+                turn["stages"], key=lambda name: stage_timings[f"{name}_ms"]
+            )
+        if turn["degraded"]:
+            metadata["degraded_stages"] = turn["degraded"]
 
         return AgentResponse(
             text=response_text,
@@ -243,6 +341,55 @@ class TutorAgent(BaseAgent):
             processing_time=elapsed,
         )
 
+    async def _run_stage(
+        self,
+        name: str,
+        coro: Any,
+        timings: dict[str, float],
+        degraded: list[str],
+    ) -> Any:
+        """Await one pre-LLM stage within its timeout; ``None`` if it fails or times out."""
+        started = time.perf_counter()
+        try:
+            return await asyncio.wait_for(coro, self.stage_timeouts.get(name))
+        except TimeoutError:
+            degraded.append(name)
+            logger.warning(
+                "Tutor stage %s timed out after %.2fs", name, self.stage_timeouts.get(name)
+            )
+        except Exception:
+            degraded.append(name)
+            logger.warning("Tutor stage %s failed", name, exc_info=True)
+        finally:
+            timings[f"{name}_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return None
+
+    @staticmethod
+    def _chunk_text(chunk: Any) -> str:
+        """Text of a streamed message chunk (string content or text content blocks)."""
+        content = getattr(chunk, "content", chunk)
+        if isinstance(content, str):
+            return content
+        if isinstance(content, list):
+            return "".join(
+                block.get("text", "") if isinstance(block, dict) else str(block)
+                for block in content
+            )
+        return ""
+
+    def stats(self) -> dict[str, Any]:
+        """Streaming statistics: turns streamed and time to first token (ms)."""
+        samples = sorted(self._ttft_samples)
+        ttft = None
+        if samples:
+            ttft = {
+                "p50": samples[len(samples) // 2],
+                "p95": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+                "last": self._ttft_samples[-1],
+                "samples": len(samples),
+            }
+        return {"streams": self.streams, "ttft_ms": ttft}
+
     @staticmethod
     def _needs_visual_aid(input_text: str, response_text: str) -> bool:
         """Heuristic check for whether a visual aid would help."""
@@ -12,6 +12,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from src.agents.orchestrator import MasterOrchestrator
 from src.auth.security import verify_token
 from src.config import settings
+from src.documents.reconciler import OrphanReconciler
 from src.memory.manager import MemoryManager
 from src.models.database import async_session
 from src.models.user import User
@@ -57,6 +58,11 @@ def get_retriever(request: Request) -> KnowledgeRetriever:
     return request.app.state.retriever
 
 
+def get_reconciler(request: Request) -> OrphanReconciler:
+    """Get the OrphanReconciler from app state."""
+    return request.app.state.reconciler
+
+
 ACCESS_TOKEN_BLACKLIST_PREFIX = "token_blacklist:"
 
 
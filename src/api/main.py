@@ -1,36 +1,175 @@
 """FastAPI application with lifespan management."""
 
+import asyncio
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from src.config import settings
+from src.documents.metadata import DocumentMetadataResolver
+from src.documents.reconciler import OrphanReconciler
 from src.memory.manager import MemoryManager
 from src.models.database import async_session, close_db
+from src.rag.bm25 import BM25Index
+from src.rag.cache import LRUCache, RetrievalCache, TwoTierCache
+from src.rag.embedding_store import EmbeddingStore
+from src.rag.embeddings import EmbeddingCache, EmbeddingService
+from src.rag.executor import ChromaExecutor
+from src.rag.hnsw import HNSWConfig
+from src.rag.mmr import MMRDiversifier
+from src.rag.packer import ContextPacker
+from src.rag.ranker import ResultRanker
 from src.rag.retriever import KnowledgeRetriever
+from src.rag.rewriter import QueryRewriter
+from src.rag.sharding import ShardRouter
 from src.agents.orchestrator import MasterOrchestrator
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
+    embedder = None
+    if settings.RAG_EMBEDDING_SERVICE_ENABLED:
+        embedder = EmbeddingService(
+            max_batch_size=settings.RAG_EMBEDDING_MAX_BATCH,
+            max_wait_ms=settings.RAG_EMBEDDING_MAX_WAIT_MS,
+            max_workers=settings.RAG_EMBEDDING_WORKERS,
+            bulk_timeout=settings.RAG_EMBEDDING_TIMEOUT_SECONDS or None,
+            cache=EmbeddingCache(
+                max_bytes=settings.RAG_EMBEDDING_CACHE_MAX_MB * 1024 * 1024,
+            ) if settings.RAG_EMBEDDING_CACHE_MAX_MB > 0 else None,
+        )
+
     memory = MemoryManager(
         redis_url=settings.REDIS_URL,
         db_session_factory=async_session,
+        chroma_host=settings.CHROMA_HOST,
+        chroma_port=settings.CHROMA_PORT,
+        chroma_mode=settings.CHROMA_MODE,
+        chroma_persist_path=settings.CHROMA_PERSIST_PATH,
+        chroma_quantization=settings.CHROMA_QUANTIZATION,
+        chroma_rescore_factor=settings.CHROMA_RESCORE_FACTOR,
+        embedder=embedder,
     )
     await memory.initialize()
     app.state.memory_manager = memory
 
+    retrieval_cache = None
+    if settings.RAG_CACHE_ENABLED:
+        retrieval_cache = RetrievalCache(
+            redis_url=settings.REDIS_URL,
+            max_entries=settings.RAG_CACHE_MAX_ENTRIES,
+            ttl=settings.RAG_CACHE_TTL_SECONDS,
+        )
+
+    rewrite_cache = None
+    rewriter_llm = None
+    if settings.RAG_REWRITE_WITH_LLM:
+        from src.llm.factory import LLMFactory
+
+        rewriter_llm = LLMFactory.get(temperature=0.0, max_tokens=256)
+        rewrite_cache = TwoTierCache(
+            redis_url=settings.REDIS_URL,
+            max_entries=settings.RAG_REWRITE_CACHE_MAX_ENTRIES,
+            ttl=settings.RAG_REWRITE_CACHE_TTL_SECONDS,
+            namespace="rag:rewrite",
+        )
+
+    keyword_index = None
+    if settings.RAG_HYBRID_ENABLED:
+        keyword_index = BM25Index.load(settings.RAG_BM25_INDEX_PATH)
+
     retriever = KnowledgeRetriever(
         chroma_host=settings.CHROMA_HOST,
         chroma_port=settings.CHROMA_PORT,
+        chroma_mode=settings.CHROMA_MODE,
+        chroma_persist_path=settings.CHROMA_PERSIST_PATH,
+        chroma_quantization=settings.CHROMA_QUANTIZATION,
+        chroma_rescore_factor=settings.CHROMA_RESCORE_FACTOR,
+        query_rewriter=QueryRewriter(
+            llm=rewriter_llm,
+            cache=rewrite_cache,
+            deadline_ms=settings.RAG_REWRITE_DEADLINE_MS,
+        ),
+        result_ranker=ResultRanker(
+            weights=settings.RAG_RANKER_WEIGHTS.get("default"),
+            subject_weights={
+                subject: w for subject, w in settings.RAG_RANKER_WEIGHTS.items() if subject != "default"
+            },
+        ),
+        executor=ChromaExecutor(
+            max_workers=settings.CHROMA_MAX_WORKERS,
+            max_pending=settings.CHROMA_MAX_PENDING,
+            timeout=settings.CHROMA_TIMEOUT_SECONDS,
+            write_timeout=settings.CHROMA_WRITE_TIMEOUT_SECONDS or None,
+        ),
+        revalidate_interval=settings.CHROMA_REVALIDATE_SECONDS,
+        retry_backoff=settings.CHROMA_RETRY_BACKOFF_SECONDS,
+        retry_backoff_max=settings.CHROMA_RETRY_BACKOFF_MAX_SECONDS,
+        cache=retrieval_cache,
+        keyword_index=keyword_index,
+        keyword_save_interval=settings.RAG_BM25_SAVE_INTERVAL_SECONDS,
+        diversifier=MMRDiversifier(
+            lambda_mult=settings.RAG_MMR_LAMBDA,
+            fetch_factor=settings.RAG_MMR_FETCH_FACTOR,
+            max_per_document=settings.RAG_MMR_MAX_PER_DOCUMENT,
+        ) if settings.RAG_MMR_ENABLED else None,
+        context_packer=ContextPacker(
+            max_tokens=settings.RAG_CONTEXT_TOKEN_BUDGET,
+        ) if settings.RAG_CONTEXT_PACKING_ENABLED else None,
+        neighbor_window=settings.RAG_NEIGHBOR_WINDOW,
+        neighbor_cache=LRUCache(
+            max_entries=settings.RAG_NEIGHBOR_CACHE_MAX_ENTRIES,
+            ttl=settings.RAG_NEIGHBOR_CACHE_TTL_SECONDS,
+        ),
+        embedder=embedder,
+        embedding_store=EmbeddingStore(
+            settings.RAG_EMBEDDING_STORE_PATH, model_id=embedder.model_id,
+        ) if embedder is not None and settings.RAG_EMBEDDING_STORE_PATH else None,
+        shard_router=ShardRouter(
+            shard_key=settings.RAG_SHARD_KEY,
+            default_shard=settings.RAG_SHARD_DEFAULT,
+        ) if settings.RAG_SHARDING_ENABLED else None,
+        document_resolver=DocumentMetadataResolver(async_session),
+        hnsw=HNSWConfig(
+            M=settings.RAG_HNSW_M,
+            construction_ef=settings.RAG_HNSW_CONSTRUCTION_EF,
+            search_ef=settings.RAG_HNSW_SEARCH_EF,
+            overrides=settings.RAG_HNSW_OVERRIDES,
+        ),
+        write_lock_path=settings.RAG_WRITE_LOCK_PATH or None,
     )
     try:
         await retriever.initialize()
     except Exception:
         pass  # ChromaDB may not be available in dev/test
+    background_tasks: set[asyncio.Task] = set()
+    if keyword_index is not None and len(keyword_index) == 0:
+        # First start with hybrid retrieval, or another worker owns the index
+        # file: index what is already in ChromaDB
+        task = asyncio.create_task(retriever.rebuild_keyword_index())
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
+    if keyword_index is not None and settings.RAG_BM25_SYNC_INTERVAL_SECONDS > 0:
+        task = asyncio.create_task(
+            retriever.sync_keyword_index_forever(settings.RAG_BM25_SYNC_INTERVAL_SECONDS)
+        )
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
     app.state.retriever = retriever
+    memory.retriever = retriever  # searches of the content collection follow its shards
+
+    reconciler = OrphanReconciler(
+        retriever, async_session, delete=settings.RAG_ORPHAN_RECONCILE_DELETE
+    )
+    if settings.RAG_ORPHAN_RECONCILE_INTERVAL_SECONDS > 0:
+        task = asyncio.create_task(
+            reconciler.run_forever(settings.RAG_ORPHAN_RECONCILE_INTERVAL_SECONDS)
+        )
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
+    app.state.reconciler = reconciler
 
     orchestrator = MasterOrchestrator(
         memory_manager=memory,
@@ -42,9 +181,17 @@ async def lifespan(app: FastAPI):
     yield
 
     # Shutdown
+    for task in background_tasks:
+        task.cancel()
     await orchestrator.close()
     await memory.close()
     retriever.close()
+    if embedder is not None:
+        await embedder.close()
+    if retrieval_cache is not None:
+        await retrieval_cache.close()
+    if rewrite_cache is not None:
+        await rewrite_cache.close()
     await close_db()
 
 
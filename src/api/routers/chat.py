@@ -1,14 +1,17 @@
 """Chat and session endpoints."""
 
+import logging
 import uuid
 from datetime import datetime, timezone
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.agents.base import AgentContext
+from src.agents.base import AgentContext, AgentResponse
 from src.agents.orchestrator import MasterOrchestrator
 from src.api.dependencies import get_current_user, get_db, get_memory, get_orchestrator
+from src.api.sse import sse_event, sse_response
+from src.auth.rbac import Role, require_role
 from src.memory.manager import MemoryManager
 from src.models.session import Session
 from src.models.user import User
@@ -19,6 +22,8 @@ from src.schemas.chat import (
     SessionResponse,
 )
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 
@@ -75,14 +80,10 @@ async def create_session(
     )
 
 
-@router.post("/message", response_model=MessageResponse)
-async def send_message(
-    body: MessageRequest,
-    current_user: User = Depends(get_current_user),
-    orchestrator: MasterOrchestrator = Depends(get_orchestrator),
-    memory: MemoryManager = Depends(get_memory),
-):
-    """Send a message to the AI tutor."""
+async def _load_turn(
+    body: MessageRequest, current_user: User, memory: MemoryManager
+) -> tuple[dict, AgentContext]:
+    """Load and check the session, then build the agent context for one message."""
     # Get session context from Redis
     context_data = await memory.get_session_context(body.session_id)
     if not context_data:
@@ -118,41 +119,46 @@ async def send_message(
         current_topic=context_data.get("current_topic"),
         learning_objectives=context_data.get("learning_objectives", []),
     )
+    return context_data, agent_context
 
-    # Per-request LLM override: swap orchestrator's tutor LLM if requested
-    _original_llm = None
-    if body.provider or body.model:
-        from src.llm.factory import LLMFactory
 
-        tutor = orchestrator.agents.get("tutor")
-        if tutor:
-            _original_llm = tutor.llm
-            tutor.llm = LLMFactory.create(
-                provider=body.provider,
-                model=body.model,
-            )
+def _request_llm(body: MessageRequest):
+    """Pooled LLM for a per-request provider/model override, or None for the tutor's own."""
+    if not (body.provider or body.model):
+        return None
+    from src.llm.factory import LLMFactory
 
-    # Process message through orchestrator
-    response = await orchestrator.process(body.content, agent_context)
+    return LLMFactory.get(provider=body.provider, model=body.model)
 
-    # Restore original LLM after request
-    if _original_llm is not None:
-        orchestrator.agents["tutor"].llm = _original_llm
 
+async def _record_turn(
+    body: MessageRequest,
+    current_user: User,
+    memory: MemoryManager,
+    context_data: dict,
+    response: AgentResponse,
+) -> None:
+    """Persist the exchange and its learning event."""
     # Save messages to conversation history
     await memory.add_to_conversation(body.session_id, "user", body.content)
     await memory.add_to_conversation(body.session_id, "assistant", response.text)
 
+    data = {"input": body.content, "response_length": len(response.text)}
+    if "ttft_ms" in response.metadata.get("stage_timings", {}):
+        data["ttft_ms"] = response.metadata["stage_timings"]["ttft_ms"]
+
     # Save learning event
     await memory.save_learning_event(
         student_id=str(current_user.id),
         event_type="interaction",
         subject=context_data.get("current_subject"),
         topic=context_data.get("current_topic"),
-        data={"input": body.content, "response_length": len(response.text)},
+        data=data,
         outcome="completed",
     )
 
+
+def _message_response(body: MessageRequest, response: AgentResponse) -> MessageResponse:
     return MessageResponse(
         text=response.text,
         session_id=body.session_id,
@@ -161,10 +167,80 @@ async def send_message(
         metadata={
             "agent": response.agent_name,
             "processing_time": response.processing_time,
+            **{
+                key: response.metadata[key]
+                for key in ("context_tokens", "context_tokens_saved", "stage_timings")
+                if key in response.metadata
+            },
         },
     )
 
 
+@router.post("/message", response_model=MessageResponse)
+async def send_message(
+    body: MessageRequest,
+    current_user: User = Depends(get_current_user),
+    orchestrator: MasterOrchestrator = Depends(get_orchestrator),
+    memory: MemoryManager = Depends(get_memory),
+):
+    """Send a message to the AI tutor."""
+    context_data, agent_context = await _load_turn(body, current_user, memory)
+
+    # Process message through orchestrator (with the per-request LLM override, if any)
+    response = await orchestrator.process(body.content, agent_context, llm=_request_llm(body))
+
+    await _record_turn(body, current_user, memory, context_data, response)
+    return _message_response(body, response)
+
+
+@router.post("/message/stream")
+async def stream_message(
+    body: MessageRequest,
+    current_user: User = Depends(get_current_user),
+    orchestrator: MasterOrchestrator = Depends(get_orchestrator),
+    memory: MemoryManager = Depends(get_memory),
+):
+    """Send a message to the AI tutor and stream the reply as Server-Sent Events.
+
+    Emits ``{"type": "token", "text": ...}`` per chunk, then one
+    ``{"type": "done", ...}`` event with the ``MessageResponse`` fields, or
+    ``{"type": "error", "detail": ...}``. The conversation and learning event
+    are saved once the stream has finished.
+    """
+    context_data, agent_context = await _load_turn(body, current_user, memory)
+
+    async def events():
+        try:
+            response: AgentResponse | None = None
+            stream = orchestrator.process_stream(body.content, agent_context, llm=_request_llm(body))
+            async for item in stream:
+                if isinstance(item, AgentResponse):
+                    response = item
+                else:
+                    yield sse_event({"type": "token", "text": item})
+            if response is None:
+                # Nothing to persist: the stream ended without its final response
+                logger.warning("Streaming reply for session %s ended without a response", body.session_id)
+                yield sse_event({"type": "error", "detail": "The tutor ended the reply without a response"})
+                return
+            await _record_turn(body, current_user, memory, context_data, response)
+            yield sse_event({"type": "done", **_message_response(body, response).model_dump()})
+        except Exception:
+            logger.warning("Streaming reply failed for session %s", body.session_id, exc_info=True)
+            yield sse_event({"type": "error", "detail": "The tutor could not complete a reply"})
+
+    return sse_response(events())
+
+
+@router.get("/stats")
+async def chat_stats(
+    user: User = Depends(require_role(Role.teacher, Role.admin)),
+    orchestrator: MasterOrchestrator = Depends(get_orchestrator),
+):
+    """Streaming statistics per agent (streams served, time to first token)."""
+    return {name: agent.stats() for name, agent in orchestrator.agents.items()}
+
+
 @router.get("/history/{session_id}")
 async def get_history(
     session_id: str,
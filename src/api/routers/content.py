@@ -1,6 +1,5 @@
 """Content upload, document management, and search endpoints."""
 
-import json
 import logging
 import os
 import re
@@ -9,18 +8,20 @@ import uuid
 from datetime import datetime, timezone
 
 from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
-from fastapi.responses import StreamingResponse
-from pydantic import BaseModel, HttpUrl
+from pydantic import BaseModel, Field, HttpUrl
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.api.dependencies import get_current_user, get_db, get_retriever
+from src.api.dependencies import get_current_user, get_db, get_reconciler, get_retriever
+from src.api.sse import sse_event, sse_response
 from src.auth.rbac import Role, require_role
 from src.documents.chunker import SemanticChunker
 from src.documents.enricher import ContentEnricher
 from src.documents.processor import DocumentProcessor
+from src.documents.reconciler import OrphanReconciler
 from src.models.document import Document
 from src.models.user import User
+from src.rag.ids import document_id_for
 from src.rag.retriever import KnowledgeRetriever
 
 logger = logging.getLogger(__name__)
@@ -43,20 +44,11 @@ _MAGIC_BYTES: dict[str, list[bytes]] = {
 
 
 def _sse_event(step: str, progress: int, message: str, result: dict | None = None) -> str:
-    """Format a Server-Sent Event line."""
+    """Format a progress Server-Sent Event."""
     payload: dict = {"step": step, "progress": progress, "message": message}
     if result is not None:
         payload["result"] = result
-    return f"data: {json.dumps(payload)}\n\n"
-
-
-def _sse_response(generator):
-    """Wrap an async generator as an SSE StreamingResponse."""
-    return StreamingResponse(
-        generator,
-        media_type="text/event-stream",
-        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
-    )
+    return sse_event(payload)
 
 
 def _sanitize_filename(filename: str) -> str:
@@ -90,6 +82,10 @@ class DocumentResponse(BaseModel):
     processed_at: datetime | None = None
 
 
+class BulkDeleteRequest(BaseModel):
+    document_ids: list[str] = Field(..., min_length=1, max_length=500)
+
+
 class SearchResult(BaseModel):
     content_preview: str
     metadata: dict = {}
@@ -177,7 +173,7 @@ async def upload_content(
                 file_meta["source"] = file_path
                 file_meta["file_type"] = ext
 
-                document_id = str(uuid.uuid4())
+                document_id = document_id_for(text)
                 file_meta["document_id"] = document_id
 
                 yield _sse_event("enriching", 70, "Enriching metadata...")
@@ -189,31 +185,34 @@ async def upload_content(
                 chunks = chunker.chunk(text, enriched_meta)
 
                 yield _sse_event("storing", 90, f"Storing {len(chunks)} chunks in knowledge base...")
+                store_timing: dict[str, float] = {}
                 if retriever:
-                    collection = retriever._get_collection()
-                    if collection is not None:
-                        ids = [f"{document_id}_chunk_{i}" for i in range(len(chunks))]
-                        documents_list = [c["content"] for c in chunks]
-                        metadatas = [DocumentProcessor._clean_metadata(c["metadata"]) for c in chunks]
-                        collection.add(documents=documents_list, metadatas=metadatas, ids=ids)
+                    ids = [f"{document_id}_chunk_{i}" for i in range(len(chunks))]
+                    documents_list = [c["content"] for c in chunks]
+                    metadatas = [DocumentProcessor._clean_metadata(c["metadata"]) for c in chunks]
+                    store_timing = await retriever.add_chunks(
+                        ids=ids, documents=documents_list, metadatas=metadatas, document_id=document_id
+                    )
 
                 doc.chunk_count = len(chunks)
                 doc.status = "completed"
                 doc.processed_at = datetime.now(timezone.utc)
                 doc.metadata_ = enriched_meta
+                doc.vector_document_id = document_id
 
                 yield _sse_event("complete", 100, f"Processed '{title or safe_name}' — {len(chunks)} chunks", {
                     "document_id": str(doc.id),
                     "status": "completed",
                     "chunk_count": len(chunks),
                     "filename": safe_name,
+                    "embedding_reuse_ratio": DocumentProcessor._reuse_ratio(store_timing, len(chunks)),
                 })
             except Exception as exc:
                 doc.status = "failed"
                 doc.metadata_ = {"error": str(exc)}
                 yield _sse_event("error", 0, str(exc))
 
-        return _sse_response(generate())
+        return sse_response(generate())
 
     # --- Non-streaming path (unchanged) ---
     with open(file_path, "wb") as f:
@@ -250,6 +249,7 @@ async def upload_content(
         doc.status = "completed"
         doc.processed_at = datetime.now(timezone.utc)
         doc.metadata_ = result.get("metadata", {})
+        doc.vector_document_id = result["document_id"]
     except Exception as e:
         doc.status = "failed"
         doc.metadata_ = {"error": str(e)}
@@ -302,7 +302,7 @@ async def upload_url(
                     "source": url_str,
                     "file_type": "url",
                 }
-                document_id = str(uuid.uuid4())
+                document_id = document_id_for(text)
                 url_meta["document_id"] = document_id
 
                 yield _sse_event("enriching", 40, "Enriching metadata...")
@@ -314,30 +314,33 @@ async def upload_url(
                 chunks = chunker.chunk(text, enriched_meta)
 
                 yield _sse_event("storing", 80, f"Storing {len(chunks)} chunks in knowledge base...")
+                store_timing: dict[str, float] = {}
                 if retriever:
-                    collection = retriever._get_collection()
-                    if collection is not None:
-                        ids = [f"{document_id}_chunk_{i}" for i in range(len(chunks))]
-                        documents_list = [c["content"] for c in chunks]
-                        metadatas = [DocumentProcessor._clean_metadata(c["metadata"]) for c in chunks]
-                        collection.add(documents=documents_list, metadatas=metadatas, ids=ids)
+                    ids = [f"{document_id}_chunk_{i}" for i in range(len(chunks))]
+                    documents_list = [c["content"] for c in chunks]
+                    metadatas = [DocumentProcessor._clean_metadata(c["metadata"]) for c in chunks]
+                    store_timing = await retriever.add_chunks(
+                        ids=ids, documents=documents_list, metadatas=metadatas, document_id=document_id
+                    )
 
                 doc.chunk_count = len(chunks)
                 doc.status = "completed"
                 doc.processed_at = datetime.now(timezone.utc)
                 doc.metadata_ = enriched_meta
+                doc.vector_document_id = document_id
 
                 yield _sse_event("complete", 100, f"Ingested URL — {len(chunks)} chunks", {
                     "document_id": str(doc.id),
                     "status": "completed",
                     "chunk_count": len(chunks),
+                    "embedding_reuse_ratio": DocumentProcessor._reuse_ratio(store_timing, len(chunks)),
                 })
             except Exception as exc:
                 doc.status = "failed"
                 doc.metadata_ = {"error": str(exc)}
                 yield _sse_event("error", 0, str(exc))
 
-        return _sse_response(generate())
+        return sse_response(generate())
 
     # --- Non-streaming path (unchanged) ---
     doc = Document(
@@ -367,6 +370,7 @@ async def upload_url(
         doc.status = "completed"
         doc.processed_at = datetime.now(timezone.utc)
         doc.metadata_ = result.get("metadata", {})
+        doc.vector_document_id = result["document_id"]
     except Exception as e:
         doc.status = "failed"
         doc.metadata_ = {"error": str(e)}
@@ -471,19 +475,71 @@ async def delete_document(
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
 
-    # Remove chunks from ChromaDB
-    retriever.delete_document_chunks(document_id)
+    await _remove_documents([doc], db, retriever)
+    return {"status": "deleted", "document_id": document_id}
+
+
+@router.post("/documents/bulk-delete")
+async def bulk_delete_documents(
+    body: BulkDeleteRequest,
+    user: User = Depends(require_role(Role.teacher, Role.admin)),
+    db: AsyncSession = Depends(get_db),
+    retriever: KnowledgeRetriever = Depends(get_retriever),
+):
+    """Delete several documents and their chunks in one request."""
+    requested = list(dict.fromkeys(body.document_ids))
+    try:
+        ids = [uuid.UUID(document_id) for document_id in requested]
+    except ValueError:
+        raise HTTPException(status_code=422, detail="document_ids must be UUIDs") from None
+    result = await db.execute(
+        select(Document).where(Document.id.in_(ids), Document.uploaded_by == user.id)
+    )
+    docs = result.scalars().all()
+    chunks = await _remove_documents(docs, db, retriever)
+    deleted = {str(doc.id) for doc in docs}
+    return {
+        "status": "deleted",
+        "deleted": [document_id for document_id in requested if document_id in deleted],
+        "not_found": [document_id for document_id in requested if document_id not in deleted],
+        "chunks": chunks,
+    }
 
-    # Delete the file if it exists and is within UPLOAD_DIR
-    if doc.file_path and os.path.exists(doc.file_path):
-        real_path = os.path.realpath(doc.file_path)
-        real_upload_dir = os.path.realpath(UPLOAD_DIR)
-        if real_path.startswith(real_upload_dir + os.sep):
-            os.remove(real_path)
 
-    await db.delete(doc)
+async def _remove_documents(
+    docs: list[Document], db: AsyncSession, retriever: KnowledgeRetriever
+) -> dict:
+    """Delete document rows, their uploaded files and their chunks.
+
+    Chunks are keyed by the content-derived ``vector_document_id``, which
+    identical uploads share, so they are kept while a document row outside
+    ``docs`` still points at them. The rest are deleted by ID from the
+    (vector_document_id, chunk_count) manifest.
+    """
+    manifest: dict[str, int | None] = {}
+    for doc in docs:
+        vector_id = doc.vector_document_id or (doc.metadata_ or {}).get("document_id") or str(doc.id)
+        manifest[vector_id] = max(manifest.get(vector_id) or 0, doc.chunk_count or 0) or None
+    if manifest:
+        shared = await db.execute(
+            select(Document.vector_document_id).where(
+                Document.vector_document_id.in_(list(manifest)),
+                Document.id.notin_([doc.id for doc in docs]),
+            )
+        )
+        for vector_id in shared.scalars().all():
+            manifest.pop(vector_id, None)
+    report = await retriever.delete_documents(manifest) if manifest else {}
 
-    return {"status": "deleted", "document_id": document_id}
+    for doc in docs:
+        # Delete the file if it exists and is within UPLOAD_DIR
+        if doc.file_path and os.path.exists(doc.file_path):
+            real_path = os.path.realpath(doc.file_path)
+            real_upload_dir = os.path.realpath(UPLOAD_DIR)
+            if real_path.startswith(real_upload_dir + os.sep):
+                os.remove(real_path)
+        await db.delete(doc)
+    return report
 
 
 @router.get("/search")
@@ -491,6 +547,8 @@ async def search_content(
     q: str = Query("", description="Search query"),
     subject: str | None = Query(None),
     limit: int = Query(5, ge=1, le=20),
+    cache: bool = Query(True, description="Set false to bypass the retrieval cache"),
+    diverse: bool = Query(True, description="Set false to skip MMR diversification"),
     user: User = Depends(get_current_user),
     retriever: KnowledgeRetriever = Depends(get_retriever),
 ):
@@ -502,6 +560,8 @@ async def search_content(
         query=q,
         subject=subject,
         k=limit,
+        use_cache=cache,
+        diversify=diverse,
     )
 
     sources = rag_results.get("sources", [])
@@ -517,11 +577,14 @@ async def search_content(
             "citation": citation,
         })
 
-    return {
+    response = {
         "query": q,
         "results": results,
         "total": rag_results.get("num_results", 0),
     }
+    if "packing" in rag_results:
+        response["packing"] = rag_results["packing"]
+    return response
 
 
 @router.get("/rag-test")
@@ -532,19 +595,23 @@ async def rag_test(
     user: User = Depends(get_current_user),
     retriever: KnowledgeRetriever = Depends(get_retriever),
 ):
-    """RAG debug endpoint — returns full chunk content, timing, and metadata."""
+    """RAG debug endpoint — returns full chunk content, timing, and metadata.
+
+    Always runs the pipeline cold (the retrieval and rewrite caches are
+    bypassed) so the timings reflect real rewrite/search/rank cost.
+    """
     if not q.strip():
         return {"query": q, "chunks": [], "timing": {}, "stats": {}}
 
-    collection = retriever._get_collection()
-    total_chunks = collection.count() if collection else 0
+    collection = await retriever._acquire_collection()
+    total_chunks = await retriever.count() if collection else 0
 
     # Step 1: Query rewriting
     t0 = time.perf_counter()
     context = {}
     if subject:
         context["subject"] = subject
-    rewritten = await retriever._rewriter.rewrite(q, context)
+    rewritten = await retriever._rewriter.rewrite(q, context, use_cache=False)
     t_rewrite = time.perf_counter() - t0
 
     # Step 2: ChromaDB vector search
@@ -554,13 +621,20 @@ async def rag_test(
         where_filter["subject"] = subject
 
     raw_results = None
+    search_timing = {"queue_wait_ms": 0.0, "query_ms": 0.0}
     if collection:
         try:
-            raw_results = collection.query(
-                query_texts=[rewritten],
-                n_results=limit,
-                where=where_filter if where_filter else None,
-            )
+            collections, search_where = await retriever._search_targets(collection, where_filter)
+            if collections:
+                query_input = await retriever._query_input([rewritten])
+                raw_results = await retriever._query_collections(
+                    collections,
+                    search_timing,
+                    **query_input,
+                    n_results=limit,
+                    where=search_where,
+                    include=["documents", "metadatas", "distances"],
+                )
         except Exception as exc:
             return {"query": q, "error": str(exc), "chunks": [], "timing": {}, "stats": {}}
     t_search = time.perf_counter() - t1
@@ -573,6 +647,8 @@ async def rag_test(
             "timing": {
                 "rewrite_ms": round(t_rewrite * 1000, 2),
                 "search_ms": round(t_search * 1000, 2),
+                "search_queue_wait_ms": search_timing["queue_wait_ms"],
+                "search_query_ms": search_timing["query_ms"],
                 "total_ms": round((t_rewrite + t_search) * 1000, 2),
             },
             "stats": {"total_chunks_in_db": total_chunks, "results_found": 0},
@@ -589,7 +665,7 @@ async def rag_test(
         {"content_preview": doc, "metadata": meta, "distance": dist}
         for doc, meta, dist in zip(documents, metadatas, distances)
     ]
-    ranked = retriever._ranker.rank(sources, q)
+    ranked = retriever._ranker.rank(sources, q, subject=subject)
     t_rank = time.perf_counter() - t2
 
     total_time = t_rewrite + t_search + t_rank
@@ -620,6 +696,8 @@ async def rag_test(
         "timing": {
             "rewrite_ms": round(t_rewrite * 1000, 2),
             "search_ms": round(t_search * 1000, 2),
+            "search_queue_wait_ms": search_timing["queue_wait_ms"],
+            "search_query_ms": search_timing["query_ms"],
             "rank_ms": round(t_rank * 1000, 2),
             "total_ms": round(total_time * 1000, 2),
         },
@@ -627,5 +705,59 @@ async def rag_test(
             "total_chunks_in_db": total_chunks,
             "results_found": len(chunks),
             "limit": limit,
+            "cache": retriever.stats().get("cache"),
         },
     }
+
+
+@router.post("/dedup")
+async def deduplicate_chunks(
+    dry_run: bool = Query(True, description="Only report duplicates; set false to delete them"),
+    user: User = Depends(require_role(Role.admin)),
+    retriever: KnowledgeRetriever = Depends(get_retriever),
+):
+    """Find (and optionally remove) chunks with identical text in the knowledge base."""
+    return await retriever.deduplicate(dry_run=dry_run)
+
+
+@router.post("/rebuild-index")
+async def rebuild_index(
+    collection: list[str] | None = Query(
+        None, description="Collections to rebuild (default: every collection holding chunks)"
+    ),
+    user: User = Depends(require_role(Role.admin)),
+    retriever: KnowledgeRetriever = Depends(get_retriever),
+):
+    """Rebuild collections with the configured HNSW parameters and swap them in.
+
+    Also compacts collections after heavy deletes. Writes keep going and are
+    mirrored into the copy; each waits at most for one copied batch or the
+    final catch-up and alias flip.
+    """
+    try:
+        return await retriever.rebuild(names=collection)
+    except RuntimeError as exc:
+        raise HTTPException(status_code=503, detail=str(exc)) from exc
+
+
+@router.post("/reconcile")
+async def reconcile_orphans(
+    delete: bool = Query(False, description="Delete orphans confirmed by a previous run"),
+    user: User = Depends(require_role(Role.admin)),
+    reconciler: OrphanReconciler = Depends(get_reconciler),
+):
+    """Find chunks whose document row no longer exists (and optionally delete them).
+
+    An orphan must show up in two consecutive runs (this endpoint or the
+    background reconciler) before it is deleted.
+    """
+    return await reconciler.run_once(delete=delete)
+
+
+@router.get("/rag-stats")
+async def rag_stats(
+    user: User = Depends(require_role(Role.teacher, Role.admin)),
+    retriever: KnowledgeRetriever = Depends(get_retriever),
+):
+    """Runtime statistics for the retrieval path (executor, caches)."""
+    return retriever.stats()
@@ -4,7 +4,6 @@ from __future__ import annotations
 
 from typing import Any
 
-import httpx
 from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel
 
@@ -38,43 +37,15 @@ class SetDefaultResponse(BaseModel):
 
 
 @router.get("/models", response_model=list[dict[str, Any]])
-async def list_models():
-    """List all available providers and their models."""
-    results: list[dict[str, Any]] = []
-
-    # Ollama — query live API for available models
-    ollama_models: list[str] = []
-    try:
-        async with httpx.AsyncClient(timeout=3.0) as client:
-            resp = await client.get(f"{settings.OLLAMA_BASE_URL}/api/tags")
-            if resp.status_code == 200:
-                data = resp.json()
-                ollama_models = [m["name"] for m in data.get("models", [])]
-    except Exception:
-        pass  # Ollama not reachable
-
-    results.append({
-        "provider": "ollama",
-        "available": len(ollama_models) > 0,
-        "models": ollama_models,
-        "base_url": settings.OLLAMA_BASE_URL,
-    })
-
-    # Anthropic
-    results.append({
-        "provider": "anthropic",
-        "available": bool(settings.ANTHROPIC_API_KEY),
-        "models": [settings.DEFAULT_MODEL],
-    })
-
-    # OpenAI
-    results.append({
-        "provider": "openai",
-        "available": bool(settings.OPENAI_API_KEY),
-        "models": ["gpt-4o", "gpt-4o-mini"],
-    })
-
-    return results
+async def list_models(refresh: bool = False):
+    """List all providers with their models and recent health.
+
+    Served from the provider registry's cache (re-probed after
+    LLM_HEALTH_TTL_SECONDS, or now with ``refresh=true``).
+    """
+    from src.llm.factory import LLMFactory
+
+    return await LLMFactory.registry().discover(force=refresh)
 
 
 @router.get("/models/current", response_model=CurrentModelResponse)
@@ -90,6 +61,20 @@ async def get_current_model():
     return CurrentModelResponse(provider=settings.LLM_PROVIDER, model=model)
 
 
+@router.get("/models/scheduler")
+async def scheduler_stats(
+    _current_user: User = Depends(require_role(Role.teacher, Role.admin)),
+):
+    """LLM queueing metrics per provider, plus pooled-client and routing counters."""
+    from src.llm.factory import LLMFactory
+
+    return {
+        "providers": LLMFactory.scheduler().stats(),
+        "pool": LLMFactory.pool().stats(),
+        "routing": LLMFactory.registry().stats(),
+    }
+
+
 @router.post("/models/default", response_model=SetDefaultResponse)
 async def set_default_model(
     body: SetDefaultRequest,
@@ -2,7 +2,6 @@
 
 import json
 import logging
-import uuid
 from datetime import datetime
 
 from fastapi import APIRouter, Depends, HTTPException, Query
@@ -17,6 +16,7 @@ from src.documents.enricher import ContentEnricher
 from src.documents.processor import DocumentProcessor
 from src.models.document import Document
 from src.models.user import User
+from src.rag.ids import document_id_for
 from src.rag.retriever import KnowledgeRetriever
 
 from src.documents.loaders.youtube import YouTubeLoader
@@ -134,6 +134,7 @@ async def _ingest_single(
         doc.status = "completed"
         doc.processed_at = datetime.utcnow()
         doc.metadata_ = result.get("metadata", {})
+        doc.vector_document_id = result["document_id"]
     except Exception as exc:
         logger.error("Ingest failed for %s '%s': %s", source_type, title, exc)
         doc.status = "failed"
@@ -222,7 +223,7 @@ async def _ingest_single_sse(
     try:
         chunker = SemanticChunker()
         enricher = ContentEnricher()
-        document_id = str(uuid.uuid4())
+        document_id = document_id_for(text)
         meta = {
             "subject": subject or "",
             "grade_level": grade_level or "",
@@ -239,23 +240,25 @@ async def _ingest_single_sse(
         chunks = chunker.chunk(text, enriched_meta)
 
         yield _sse_event("storing", 75, f"Storing {len(chunks)} chunks in vector database...")
-        collection = retriever._get_collection()
-        if collection is not None:
-            ids = [f"{document_id}_chunk_{i}" for i in range(len(chunks))]
-            documents_list = [c["content"] for c in chunks]
-            metadatas = [DocumentProcessor._clean_metadata(c["metadata"]) for c in chunks]
-            collection.add(documents=documents_list, metadatas=metadatas, ids=ids)
+        ids = [f"{document_id}_chunk_{i}" for i in range(len(chunks))]
+        documents_list = [c["content"] for c in chunks]
+        metadatas = [DocumentProcessor._clean_metadata(c["metadata"]) for c in chunks]
+        store_timing = await retriever.add_chunks(
+            ids=ids, documents=documents_list, metadatas=metadatas, document_id=document_id
+        )
 
         doc.chunk_count = len(chunks)
         doc.status = "completed"
         doc.processed_at = datetime.utcnow()
         doc.metadata_ = enriched_meta
+        doc.vector_document_id = document_id
 
         result = {
             "document_id": str(doc.id),
             "status": doc.status,
             "chunk_count": doc.chunk_count,
             "title": doc.title,
+            "embedding_reuse_ratio": DocumentProcessor._reuse_ratio(store_timing, len(chunks)),
         }
         yield _sse_event("complete", 100, "Ingestion complete!", result)
     except Exception as exc:
@@ -299,7 +302,7 @@ async def _ingest_multiple_sse(
         await db.flush()
 
         try:
-            document_id = str(uuid.uuid4())
+            document_id = document_id_for(item["text"])
             meta = {
                 "subject": subject or "",
                 "grade_level": grade_level or "",
@@ -315,23 +318,25 @@ async def _ingest_multiple_sse(
             store_progress = base + int(50 / total)
             yield _sse_event("storing", store_progress, f"Storing {len(chunks)} chunks from '{item['title']}'...")
 
-            collection = retriever._get_collection()
-            if collection is not None:
-                ids = [f"{document_id}_chunk_{i}" for i in range(len(chunks))]
-                documents_list = [c["content"] for c in chunks]
-                metadatas = [DocumentProcessor._clean_metadata(c["metadata"]) for c in chunks]
-                collection.add(documents=documents_list, metadatas=metadatas, ids=ids)
+            ids = [f"{document_id}_chunk_{i}" for i in range(len(chunks))]
+            documents_list = [c["content"] for c in chunks]
+            metadatas = [DocumentProcessor._clean_metadata(c["metadata"]) for c in chunks]
+            store_timing = await retriever.add_chunks(
+                ids=ids, documents=documents_list, metadatas=metadatas, document_id=document_id
+            )
 
             doc.chunk_count = len(chunks)
             doc.status = "completed"
             doc.processed_at = datetime.utcnow()
             doc.metadata_ = enriched_meta
+            doc.vector_document_id = document_id
 
             results.append({
                 "document_id": str(doc.id),
                 "status": "completed",
                 "chunk_count": len(chunks),
                 "title": item["title"],
+                "embedding_reuse_ratio": DocumentProcessor._reuse_ratio(store_timing, len(chunks)),
             })
         except Exception as exc:
             logger.error("SSE ingest failed for %s '%s': %s", source_type, item["title"], exc)
@@ -0,0 +1,20 @@
+"""Server-Sent Events helpers shared by streaming endpoints."""
+
+import json
+from collections.abc import AsyncIterator
+
+from fastapi.responses import StreamingResponse
+
+
+def sse_event(payload: dict) -> str:
+    """Format one Server-Sent Event carrying ``payload`` as JSON."""
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+def sse_response(generator: AsyncIterator[str]) -> StreamingResponse:
+    """Wrap an async generator of events as an SSE StreamingResponse."""
+    return StreamingResponse(
+        generator,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
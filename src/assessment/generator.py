@@ -17,7 +17,7 @@ class QuestionGenerator:
 
     def __init__(self, llm: BaseChatModel | None = None):
         if llm is None:
-            self.llm = LLMFactory.create()
+            self.llm = LLMFactory.get(priority="background")
         else:
             self.llm = llm
 
@@ -22,7 +22,7 @@ class AutoGrader:
 
     def __init__(self, llm: BaseChatModel | None = None):
         if llm is None:
-            self.llm = LLMFactory.create(temperature=0.0, max_tokens=2048)
+            self.llm = LLMFactory.get(temperature=0.0, max_tokens=2048, priority="grading")
         else:
             self.llm = llm
 
@@ -2,6 +2,9 @@
 
 from __future__ import annotations
 
+import json as json_lib
+from collections.abc import Iterator
+
 import httpx
 
 from src.cli.config import clear_credentials, get_api_url, load_credentials, save_credentials
@@ -76,6 +79,12 @@ class CLIClient:
             except httpx.HTTPError as exc:
                 raise CLIError(f"Network error after token refresh: {exc}")
 
+        self._raise_for_status(resp)
+        return resp
+
+    @staticmethod
+    def _raise_for_status(resp: httpx.Response) -> None:
+        """Translate error statuses into friendly ``CLIError`` messages."""
         if resp.status_code == 401:
             clear_credentials()
             raise CLIError("Session expired. Please log in again with: eduagi login")
@@ -97,7 +106,29 @@ class CLIClient:
                 pass
             raise CLIError(detail or f"Request failed with status {resp.status_code}")
 
-        return resp
+    def stream_events(self, path: str, *, json: dict | None = None) -> Iterator[dict]:
+        """POST to a Server-Sent Events endpoint and yield each event's JSON payload."""
+        url = f"{self.base_url}{path}"
+        for attempt in range(2):
+            try:
+                # The timeout applies per read, so long streams are fine
+                with httpx.stream("POST", url, json=json, headers=self._headers(), timeout=60.0) as resp:
+                    if resp.status_code == 401 and attempt == 0 and self._try_refresh():
+                        continue
+                    if resp.status_code >= 400:
+                        resp.read()
+                        self._raise_for_status(resp)
+                    for line in resp.iter_lines():
+                        if line.startswith("data: "):
+                            yield json_lib.loads(line[len("data: "):])
+                    return
+            except httpx.ConnectError:
+                raise CLIError(
+                    "Cannot connect to the EduAGI server. "
+                    f"Is it running at {self.base_url}?"
+                )
+            except httpx.HTTPError as exc:
+                raise CLIError(f"Network error: {exc}")
 
     def get(self, path: str, *, params: dict | None = None, authenticated: bool = True) -> httpx.Response:
         return self._request("GET", path, params=params, authenticated=authenticated)
@@ -3,11 +3,12 @@
 from typing import Optional
 
 import typer
+from rich.live import Live
 from rich.prompt import Prompt
 
 from src.cli.api_client import CLIClient, CLIError
 from src.cli.config import load_credentials
-from src.cli.display import console, show_ai_response, show_error
+from src.cli.display import ai_response_panel, console, show_ai_response, show_error
 
 app = typer.Typer(help="Chat commands")
 
@@ -17,6 +18,7 @@ def start(
     subject: Optional[str] = typer.Option(None, "-s", "--subject", help="Subject for the session"),
     topic: Optional[str] = typer.Option(None, "-t", "--topic", help="Topic for the session"),
     model: Optional[str] = typer.Option(None, "-m", "--model", help="Model override (provider/model, e.g. ollama/llama3)"),
+    stream: bool = typer.Option(True, "--stream/--no-stream", help="Show the reply as it is generated"),
 ) -> None:
     """Start an interactive chat session with the AI tutor."""
     creds = load_credentials()
@@ -90,15 +92,24 @@ def start(
         if model_name:
             msg_body["model"] = model_name
 
-        with console.status("Thinking..."):
+        if stream:
             try:
-                resp = client.post("/chat/message", json=msg_body)
+                data = _stream_reply(client, msg_body)
             except CLIError as exc:
                 show_error(str(exc))
                 continue
+            if data is None:
+                continue
+        else:
+            with console.status("Thinking..."):
+                try:
+                    resp = client.post("/chat/message", json=msg_body)
+                except CLIError as exc:
+                    show_error(str(exc))
+                    continue
 
-        data = resp.json()
-        show_ai_response(data.get("text", ""))
+            data = resp.json()
+            show_ai_response(data.get("text", ""))
 
         # Show sources if any
         sources = data.get("sources", [])
@@ -111,3 +122,25 @@ def start(
             console.print("[dim]Suggestions: " + " | ".join(actions) + "[/dim]")
 
         console.print()
+
+
+def _stream_reply(client: CLIClient, msg_body: dict) -> dict | None:
+    """Render a streamed reply as tokens arrive. Returns the final response payload."""
+    events = client.stream_events("/chat/message/stream", json=msg_body)
+    with console.status("Thinking..."):
+        event = next(events, None)  # spinner until the first token
+
+    text = ""
+    final: dict | None = None
+    with Live(ai_response_panel(text), console=console, refresh_per_second=12) as live:
+        while event is not None:
+            if event.get("type") == "token":
+                text += event.get("text", "")
+                live.update(ai_response_panel(text))
+            elif event.get("type") == "done":
+                final = event
+                live.update(ai_response_panel(event.get("text", text)))
+            elif event.get("type") == "error":
+                show_error(event.get("detail", "The tutor could not complete a reply"))
+            event = next(events, None)
+    return final
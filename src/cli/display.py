@@ -9,10 +9,14 @@ console = Console()
 err_console = Console(stderr=True)
 
 
+def ai_response_panel(text: str) -> Panel:
+    """AI response as Rich Markdown inside a panel."""
+    return Panel(Markdown(text), title="EduAGI", border_style="blue", padding=(1, 2))
+
+
 def show_ai_response(text: str) -> None:
     """Render AI response as Rich Markdown inside a panel."""
-    md = Markdown(text)
-    console.print(Panel(md, title="EduAGI", border_style="blue", padding=(1, 2)))
+    console.print(ai_response_panel(text))
 
 
 def show_error(msg: str) -> None:
@@ -95,8 +95,9 @@ def search_docs(
         meta_parts = []
         if meta.get("subject"):
             meta_parts.append(f"Subject: {meta['subject']}")
-        if meta.get("title"):
-            meta_parts.append(f"Source: {meta['title']}")
+        title = citation.get("title") or meta.get("title")
+        if title:
+            meta_parts.append(f"Source: {title}")
         if citation.get("page"):
             meta_parts.append(f"Page: {citation['page']}")
 
@@ -17,6 +17,94 @@ class Settings(BaseSettings):
     REDIS_URL: str = "redis://localhost:6380/0"
     CHROMA_HOST: str = "localhost"
     CHROMA_PORT: int = 8100
+    # "http" = Chroma server at CHROMA_HOST:CHROMA_PORT; "persistent" = in-process
+    # store under CHROMA_PERSIST_PATH (single-node deployments); "quantized" = in-process
+    # store keeping CHROMA_QUANTIZATION vectors in RAM (scripts/bench_quantization.py)
+    CHROMA_MODE: str = "http"
+    CHROMA_PERSIST_PATH: str = "data/chroma"
+    CHROMA_QUANTIZATION: str = "int8"  # "int8" (~4x less RAM) or "float16" (2x)
+    CHROMA_RESCORE_FACTOR: int = 4  # float re-scoring of rescore_factor * k candidates
+
+    # Vector store client
+    CHROMA_MAX_WORKERS: int = 8
+    CHROMA_MAX_PENDING: int = 64
+    CHROMA_TIMEOUT_SECONDS: float = 10.0
+    CHROMA_WRITE_TIMEOUT_SECONDS: float = 0.0  # upserts/deletes/index saves; 0 = no deadline
+    CHROMA_REVALIDATE_SECONDS: float = 60.0
+    CHROMA_RETRY_BACKOFF_SECONDS: float = 1.0
+    CHROMA_RETRY_BACKOFF_MAX_SECONDS: float = 30.0
+
+    # Retrieval caching
+    RAG_CACHE_ENABLED: bool = True
+    RAG_CACHE_MAX_ENTRIES: int = 1024
+    RAG_CACHE_TTL_SECONDS: int = 300
+
+    # Query rewriting (LLM-backed rewriting is off unless enabled)
+    RAG_REWRITE_WITH_LLM: bool = False
+    RAG_REWRITE_CACHE_MAX_ENTRIES: int = 4096
+    RAG_REWRITE_CACHE_TTL_SECONDS: int = 86400
+    RAG_REWRITE_DEADLINE_MS: int = 0  # 0 = wait for the LLM
+
+    # Hybrid retrieval (local BM25 index fused with vector search)
+    RAG_HYBRID_ENABLED: bool = False
+    RAG_BM25_INDEX_PATH: str = "data/bm25/educational_content.idx"
+    RAG_BM25_SAVE_INTERVAL_SECONDS: float = 30.0
+    RAG_BM25_SYNC_INTERVAL_SECONDS: float = 60.0  # pick up other workers' writes; 0 = never
+
+    # Re-ranking weights: {"default": {...}, "<subject>": {...}} with keys
+    # semantic / keyword / recency / authority
+    RAG_RANKER_WEIGHTS: dict[str, dict[str, float]] = {}
+
+    # MMR diversification (over-fetch fetch_factor * k, keep a diverse k)
+    RAG_MMR_ENABLED: bool = False
+    RAG_MMR_LAMBDA: float = 0.7
+    RAG_MMR_FETCH_FACTOR: int = 4
+    RAG_MMR_MAX_PER_DOCUMENT: int = 2  # 0 = no cap
+
+    # Context packing (merge adjacent chunks, drop overlap, cap prompt tokens)
+    RAG_CONTEXT_PACKING_ENABLED: bool = True
+    RAG_CONTEXT_TOKEN_BUDGET: int = 2000
+
+    # Small-to-big retrieval: also fetch +/- N neighbouring chunks of each hit
+    RAG_NEIGHBOR_WINDOW: int = 0
+    RAG_NEIGHBOR_CACHE_MAX_ENTRIES: int = 4096
+    RAG_NEIGHBOR_CACHE_TTL_SECONDS: int = 300
+
+    # Query embedding inside the app (micro-batched on a worker pool)
+    RAG_EMBEDDING_SERVICE_ENABLED: bool = True
+    RAG_EMBEDDING_MAX_BATCH: int = 32
+    RAG_EMBEDDING_MAX_WAIT_MS: float = 5.0
+    RAG_EMBEDDING_WORKERS: int = 1
+    RAG_EMBEDDING_TIMEOUT_SECONDS: float = 120.0  # per ingest batch; 0 = no deadline
+    RAG_EMBEDDING_CACHE_MAX_MB: int = 16  # 0 disables the query-embedding cache
+    # Content-addressed chunk embeddings reused across ingests ("" disables)
+    RAG_EMBEDDING_STORE_PATH: str = "data/embeddings"
+
+    # Sharding: one collection per value of RAG_SHARD_KEY (e.g. subject or
+    # grade_level). Migrate existing data with scripts/reshard_collection.py
+    RAG_SHARDING_ENABLED: bool = False
+    RAG_SHARD_KEY: str = "subject"
+    RAG_SHARD_DEFAULT: str = "general"  # shard for chunks without the key
+
+    # HNSW index parameters (Chroma defaults). Overrides per collection, e.g.
+    # {"educational_content": {"M": 32, "search_ef": 200}}; a base name also
+    # covers its shards. M / construction_ef changes need scripts/rebuild_collection.py
+    RAG_HNSW_M: int = 16
+    RAG_HNSW_CONSTRUCTION_EF: int = 100
+    RAG_HNSW_SEARCH_EF: int = 100
+    RAG_HNSW_OVERRIDES: dict[str, dict[str, int]] = {}
+    # Host-wide lock serializing collection writes with rebuild steps across
+    # workers and scripts; empty = lock only within the process
+    RAG_WRITE_LOCK_PATH: str = "data/locks/rag-write.lock"
+
+    # Orphaned-chunk reconciler (chunks whose documents row is gone)
+    RAG_ORPHAN_RECONCILE_INTERVAL_SECONDS: float = 0.0  # 0 = no background runs
+    RAG_ORPHAN_RECONCILE_DELETE: bool = False  # False = report only
+
+    # Tutor pre-LLM stages (run concurrently; a stage that fails or times out is skipped)
+    TUTOR_CONTEXT_TIMEOUT_SECONDS: float = 2.0
+    TUTOR_CONFUSION_TIMEOUT_SECONDS: float = 0.5
+    TUTOR_RETRIEVAL_TIMEOUT_SECONDS: float = 5.0
 
     # AI/LLM
     LLM_PROVIDER: str = "ollama"
@@ -25,6 +113,23 @@ class Settings(BaseSettings):
     ANTHROPIC_API_KEY: str = ""
     OPENAI_API_KEY: str = ""
     DEFAULT_MODEL: str = "claude-sonnet-4-5-20250929"
+    # Chat models are pooled per (provider, model, temperature, max_tokens) and
+    # reused across agents and requests; least recently used beyond this many
+    LLM_POOL_SIZE: int = 16
+    # Scheduling per provider: concurrent calls and tokens per minute (0 or
+    # missing = unlimited). Chats queue ahead of grading, grading ahead of
+    # generation; a 429 pauses the provider and the call is retried
+    LLM_MAX_CONCURRENCY: dict[str, int] = {"ollama": 2, "anthropic": 8, "openai": 8}
+    LLM_TOKENS_PER_MINUTE: dict[str, int] = {}
+    LLM_RATE_LIMIT_RETRIES: int = 3
+    LLM_RATE_LIMIT_BACKOFF_SECONDS: float = 1.0
+    # Failover routing: agents send each call to the healthiest of these
+    # providers (rolling latency / error rate); empty = LLM_PROVIDER only.
+    # LLM_HEDGE_AFTER_MS > 0 also starts the runner-up when a call takes that long
+    LLM_ROUTING_PROVIDERS: list[str] = []
+    LLM_HEDGE_AFTER_MS: int = 0
+    LLM_HEALTH_TTL_SECONDS: float = 30.0  # provider discovery cache (/models)
+    LLM_HEALTH_WINDOW: int = 200  # calls kept per provider for latency / errors
 
     # Voice (optional)
     ELEVENLABS_API_KEY: str = ""
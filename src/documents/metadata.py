@@ -0,0 +1,106 @@
+"""Chunk metadata slimming and batched document metadata lookup."""
+
+from __future__ import annotations
+
+import logging
+from typing import Any
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.models.document import Document
+from src.rag.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Per-chunk fields stored in the vector store: IDs plus the fields used to
+# filter, shard and rank. Everything else (title, source, key_terms, summary,
+# llm_analysis, parser metadata) is document-level and lives once in
+# documents.metadata.
+CHUNK_METADATA_FIELDS = (
+    "document_id",
+    "chunk_index",
+    "total_chunks",
+    "subject",
+    "grade_level",
+    "source_type",
+    "file_type",
+    "authority",
+    "published_at",
+    "created_at",
+)
+
+
+def chunk_metadata(meta: dict[str, Any]) -> dict[str, Any]:
+    """Keep only ``CHUNK_METADATA_FIELDS`` of a chunk's metadata."""
+    return {key: meta[key] for key in CHUNK_METADATA_FIELDS if key in meta}
+
+
+class DocumentMetadataResolver:
+    """Resolve content-derived document IDs to document-level metadata.
+
+    One ``SELECT ... WHERE vector_document_id IN (...)`` per call for the IDs
+    not already cached. Unknown IDs are cached as empty so chunks ingested
+    outside the API do not trigger a query on every retrieval.
+    """
+
+    def __init__(self, session_factory: async_sessionmaker, cache: LRUCache | None = None):
+        self.session_factory = session_factory
+        self._cache = cache if cache is not None else LRUCache(max_entries=4096, ttl=300)
+        self.lookups = 0
+        self.errors = 0
+
+    async def resolve(self, document_ids: list[str]) -> dict[str, dict[str, Any]]:
+        """Return ``{document_id: {"title", "source", "summary", ...}}`` for known IDs."""
+        found: dict[str, dict[str, Any]] = {}
+        missing: list[str] = []
+        for doc_id in dict.fromkeys(d for d in document_ids if d):
+            cached = self._cache.get(doc_id)
+            if cached is None:
+                missing.append(doc_id)
+            elif cached:
+                found[doc_id] = cached
+        if not missing:
+            return found
+
+        self.lookups += 1
+        try:
+            async with self.session_factory() as session:
+                rows = await session.execute(
+                    select(
+                        Document.vector_document_id,
+                        Document.title,
+                        Document.original_filename,
+                        Document.subject,
+                        Document.grade_level,
+                        Document.metadata_,
+                    ).where(Document.vector_document_id.in_(missing))
+                )
+                rows = rows.all()
+        except Exception:
+            self.errors += 1
+            logger.warning("Document metadata lookup failed for %d ids", len(missing), exc_info=True)
+            return found
+
+        for doc_id, title, filename, subject, grade_level, meta in rows:
+            if doc_id in found:
+                continue  # several uploads of the same content: first row wins
+            meta = meta or {}
+            found[doc_id] = {
+                "title": title,
+                "source": meta.get("source") or filename,
+                "subject": subject,
+                "grade_level": grade_level,
+                "summary": meta.get("summary", ""),
+                "key_terms": meta.get("key_terms", []),
+            }
+        for doc_id in missing:
+            self._cache.set(doc_id, found.get(doc_id, {}))
+        return found
+
+    def clear(self) -> None:
+        """Drop cached entries (called after writes to the knowledge base)."""
+        self._cache.clear()
+
+    def stats(self) -> dict[str, Any]:
+        return {"cache_entries": len(self._cache), "lookups": self.lookups, "errors": self.errors}
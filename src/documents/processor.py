@@ -2,7 +2,6 @@
 
 import logging
 import os
-import uuid
 from typing import Any
 
 from src.documents.chunker import SemanticChunker
@@ -16,6 +15,8 @@ from src.documents.parsers.text import TextParser
 from src.documents.parsers.web import WebParser
 from src.documents.parsers.xlsx import SpreadsheetParser
 from src.documents.loaders.json_loader import JSONFileLoader
+from src.documents.metadata import chunk_metadata
+from src.rag.ids import document_id_for
 from src.rag.retriever import KnowledgeRetriever
 
 logger = logging.getLogger(__name__)
@@ -74,7 +75,7 @@ class DocumentProcessor:
 
     async def _process_text(self, text: str, metadata: dict[str, Any]) -> dict:
         """Chunk, enrich, and store text content."""
-        document_id = str(uuid.uuid4())
+        document_id = document_id_for(text)
         metadata["document_id"] = document_id
 
         # Enrich
@@ -84,25 +85,37 @@ class DocumentProcessor:
         chunks = self.chunker.chunk(text, enriched_meta)
 
         # Store in ChromaDB
+        store_timing: dict[str, float] = {}
         if self.retriever:
-            collection = self.retriever._get_collection()
-            if collection is not None:
-                ids = [f"{document_id}_chunk_{i}" for i in range(len(chunks))]
-                documents = [c["content"] for c in chunks]
-                metadatas = [c["metadata"] for c in chunks]
-                clean_metadatas = [self._clean_metadata(m) for m in metadatas]
-
-                collection.add(
-                    documents=documents,
-                    metadatas=clean_metadatas,
-                    ids=ids,
-                )
-
-        return {
+            ids = [f"{document_id}_chunk_{i}" for i in range(len(chunks))]
+            documents = [c["content"] for c in chunks]
+            metadatas = [c["metadata"] for c in chunks]
+            clean_metadatas = [self._clean_metadata(m) for m in metadatas]
+
+            store_timing = await self.retriever.add_chunks(
+                ids=ids,
+                documents=documents,
+                metadatas=clean_metadatas,
+                document_id=document_id,
+            )
+
+        result = {
             "document_id": document_id,
             "chunk_count": len(chunks),
             "metadata": enriched_meta,
+            "store_timing": store_timing,
         }
+        reuse_ratio = self._reuse_ratio(store_timing, len(chunks))
+        if reuse_ratio is not None:
+            result["embedding_reuse_ratio"] = reuse_ratio
+        return result
+
+    @staticmethod
+    def _reuse_ratio(store_timing: dict[str, Any], chunk_count: int) -> float | None:
+        """Share of chunks whose embedding came from the embedding store."""
+        if "embeddings_reused" not in store_timing or not chunk_count:
+            return None
+        return round(store_timing["embeddings_reused"] / chunk_count, 4)
 
     def _detect_parser(self, file_path: str):
         """Route to the appropriate parser based on file extension."""
@@ -128,9 +141,13 @@ class DocumentProcessor:
 
     @staticmethod
     def _clean_metadata(meta: dict) -> dict:
-        """Ensure metadata values are ChromaDB-compatible types."""
+        """Reduce chunk metadata to ``CHUNK_METADATA_FIELDS`` with ChromaDB-compatible types.
+
+        Document-level fields (title, summary, key terms, LLM analysis) are
+        stored once in ``documents.metadata`` instead of on every chunk.
+        """
         clean = {}
-        for k, v in meta.items():
+        for k, v in chunk_metadata(meta).items():
             if isinstance(v, (str, int, float, bool)):
                 clean[k] = v
             elif isinstance(v, list):
@@ -0,0 +1,107 @@
+"""Background reconciliation of vector-store chunks against ``documents`` rows."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.models.document import Document
+from src.rag.retriever import KnowledgeRetriever
+
+logger = logging.getLogger(__name__)
+
+
+class OrphanReconciler:
+    """Find (and optionally delete) chunks whose ``Document`` row no longer exists.
+
+    A ``document_id`` in the vector store that matches no
+    ``documents.vector_document_id`` is an orphan, e.g. left behind when a
+    delete failed halfway or a row was removed directly in the database.
+    An orphan is only deleted after it was seen in two consecutive runs, so
+    chunks written just before their document row is committed are never
+    touched.
+    """
+
+    def __init__(
+        self,
+        retriever: KnowledgeRetriever,
+        session_factory: async_sessionmaker,
+        delete: bool = False,
+        batch_size: int = 1000,
+    ):
+        self.retriever = retriever
+        self.session_factory = session_factory
+        self.delete = delete
+        self.batch_size = batch_size
+        self._suspects: set[str] = set()
+        self.runs = 0
+        self.deleted = 0
+        self.last_report: dict[str, Any] | None = None
+
+    async def run_once(self, delete: bool | None = None) -> dict[str, Any]:
+        """Scan once. ``delete`` overrides the configured mode for this run."""
+        delete = self.delete if delete is None else delete
+        stored = await self.retriever.scan_documents(self.batch_size)
+        known = await self._known_ids(list(stored))
+        orphans = {doc_id: count for doc_id, count in stored.items() if doc_id not in known}
+        confirmed = {doc_id: count for doc_id, count in orphans.items() if doc_id in self._suspects}
+        self._suspects = set(orphans)
+
+        deleted = 0
+        if confirmed and delete:
+            result = await self.retriever.delete_documents(confirmed, batch_size=self.batch_size)
+            if result["deleted"]:
+                deleted = len(confirmed)
+                self._suspects -= set(confirmed)
+                logger.info("Deleted chunks of %d orphaned documents", deleted)
+
+        self.runs += 1
+        self.deleted += deleted
+        self.last_report = {
+            "documents_scanned": len(stored),
+            "orphans": len(orphans),
+            "confirmed": len(confirmed),
+            "deleted": deleted,
+            "delete": delete,
+            "examples": sorted(orphans)[:10],
+        }
+        return self.last_report
+
+    async def _known_ids(self, document_ids: list[str]) -> set[str]:
+        known: set[str] = set()
+        async with self.session_factory() as session:
+            for start in range(0, len(document_ids), self.batch_size):
+                batch = document_ids[start:start + self.batch_size]
+                rows = await session.execute(
+                    select(Document.vector_document_id).where(
+                        Document.vector_document_id.in_(batch)
+                    )
+                )
+                known.update(rows.scalars().all())
+        return known
+
+    async def run_forever(self, interval: float) -> None:
+        """Run every ``interval`` seconds until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                report = await self.run_once()
+                if report["orphans"]:
+                    logger.warning(
+                        "Found %d orphaned documents in the vector store (%d deleted)",
+                        report["orphans"], report["deleted"],
+                    )
+            except Exception:
+                logger.warning("Orphan reconciliation failed", exc_info=True)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "runs": self.runs,
+            "deleted": self.deleted,
+            "suspects": len(self._suspects),
+            "last_report": self.last_report,
+        }
@@ -1,5 +1,15 @@
 """LLM provider abstraction layer."""
 
-from src.llm.factory import LLMFactory
+from src.llm.factory import LLMFactory, LLMPool
+from src.llm.registry import ProviderRegistry, RoutedLLM
+from src.llm.scheduler import PRIORITIES, LLMScheduler, ScheduledLLM
 
-__all__ = ["LLMFactory"]
+__all__ = [
+    "PRIORITIES",
+    "LLMFactory",
+    "LLMPool",
+    "LLMScheduler",
+    "ProviderRegistry",
+    "RoutedLLM",
+    "ScheduledLLM",
+]
@@ -2,9 +2,73 @@
 
 from __future__ import annotations
 
+import threading
+from collections import OrderedDict
+
 from langchain_core.language_models.chat_models import BaseChatModel
 
 from src.config import settings
+from src.llm.registry import ProviderRegistry, RoutedLLM
+from src.llm.scheduler import LLMScheduler, ScheduledLLM
+
+PoolKey = tuple[str, str, float, int]
+
+
+class LLMPool:
+    """Bounded LRU pool of chat models keyed on (provider, model, temperature, max_tokens).
+
+    Each LangChain chat model owns its HTTP client, so handing out the same
+    instance for the same key keeps its keep-alive connections in use
+    instead of opening a new client per agent or per request. The least
+    recently used model is dropped once ``max_size`` keys are pooled.
+    """
+
+    def __init__(self, max_size: int = 16):
+        self.max_size = max(1, max_size)
+        self._models: OrderedDict[PoolKey, BaseChatModel] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: PoolKey) -> BaseChatModel | None:
+        with self._lock:
+            llm = self._models.get(key)
+            if llm is None:
+                self.misses += 1
+                return None
+            self._models.move_to_end(key)
+            self.hits += 1
+            return llm
+
+    def put(self, key: PoolKey, llm: BaseChatModel) -> BaseChatModel:
+        """Pool ``llm`` under ``key``; if another caller got there first, return its model."""
+        with self._lock:
+            existing = self._models.get(key)
+            if existing is not None:
+                self._models.move_to_end(key)
+                return existing
+            self._models[key] = llm
+            while len(self._models) > self.max_size:
+                self._models.popitem(last=False)
+                self.evictions += 1
+            return llm
+
+    def clear(self) -> None:
+        with self._lock:
+            self._models.clear()
+
+    def __len__(self) -> int:
+        return len(self._models)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self._models),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
 
 
 class LLMFactory:
@@ -12,6 +76,103 @@ class LLMFactory:
 
     SUPPORTED_PROVIDERS = ("ollama", "anthropic", "openai")
 
+    _pool: LLMPool | None = None
+    _scheduler: LLMScheduler | None = None
+    _registry: ProviderRegistry | None = None
+
+    @classmethod
+    def pool(cls) -> LLMPool:
+        """The process-wide client pool (sized by settings.LLM_POOL_SIZE)."""
+        if cls._pool is None:
+            cls._pool = LLMPool(settings.LLM_POOL_SIZE)
+        return cls._pool
+
+    @classmethod
+    def scheduler(cls) -> LLMScheduler:
+        """The process-wide scheduler every pooled model's calls go through."""
+        if cls._scheduler is None:
+            cls._scheduler = LLMScheduler(
+                concurrency=settings.LLM_MAX_CONCURRENCY,
+                tokens_per_minute=settings.LLM_TOKENS_PER_MINUTE,
+                max_retries=settings.LLM_RATE_LIMIT_RETRIES,
+                backoff_seconds=settings.LLM_RATE_LIMIT_BACKOFF_SECONDS,
+            )
+        return cls._scheduler
+
+    @classmethod
+    def get(
+        cls,
+        provider: str | None = None,
+        model: str | None = None,
+        temperature: float = 0.7,
+        max_tokens: int = 4096,
+        priority: str = "interactive",
+    ) -> ScheduledLLM:
+        """Return a pooled chat model, creating it on first use.
+
+        Same arguments as ``create``. Defaults are resolved before the lookup,
+        so ``get()`` and ``get(provider=<default>, model=<default>)`` share
+        one model. Pooled models are shared between callers: pass them per
+        call rather than reconfiguring them.
+
+        The model comes wrapped so its ``ainvoke``/``astream`` calls are
+        queued by the provider's scheduler at ``priority`` ("interactive",
+        "grading" or "background").
+        """
+        provider = (provider or settings.LLM_PROVIDER).lower()
+        key = (provider, model or cls.default_model(provider), float(temperature), int(max_tokens))
+        pool = cls.pool()
+        llm = pool.get(key)
+        if llm is None:
+            llm = pool.put(key, cls.create(provider, model, temperature, max_tokens))
+        return ScheduledLLM(llm, provider, priority, max_tokens, cls.scheduler())
+
+    @classmethod
+    def registry(cls) -> ProviderRegistry:
+        """The process-wide provider health registry (routing and ``/models``)."""
+        if cls._registry is None:
+            cls._registry = ProviderRegistry(
+                ttl_seconds=settings.LLM_HEALTH_TTL_SECONDS,
+                window=settings.LLM_HEALTH_WINDOW,
+                hedge_after_ms=settings.LLM_HEDGE_AFTER_MS,
+            )
+        return cls._registry
+
+    @classmethod
+    def routed(
+        cls,
+        providers: list[str] | None = None,
+        temperature: float = 0.7,
+        max_tokens: int = 4096,
+        priority: str = "interactive",
+    ) -> RoutedLLM:
+        """Return a model that routes each call to the healthiest of ``providers``.
+
+        ``providers`` defaults to settings.LLM_ROUTING_PROVIDERS. Each provider
+        uses its default model, pooled and scheduled as with ``get``.
+        """
+        providers = [p.lower() for p in (providers or settings.LLM_ROUTING_PROVIDERS)]
+        return RoutedLLM(
+            cls.registry(),
+            providers,
+            lambda provider: cls.get(provider, None, temperature, max_tokens, priority),
+        )
+
+    @staticmethod
+    def default_model(provider: str) -> str:
+        """The model used for ``provider`` when none is given."""
+        provider = provider.lower()
+        if provider == "ollama":
+            return settings.OLLAMA_MODEL
+        if provider == "anthropic":
+            return settings.DEFAULT_MODEL
+        if provider == "openai":
+            return "gpt-4o"
+        raise ValueError(
+            f"Unsupported LLM provider: {provider!r}. "
+            f"Supported: {', '.join(LLMFactory.SUPPORTED_PROVIDERS)}"
+        )
+
     @staticmethod
     def create(
         provider: str | None = None,
@@ -19,7 +180,10 @@ class LLMFactory:
         temperature: float = 0.7,
         max_tokens: int = 4096,
     ) -> BaseChatModel:
-        """Return a BaseChatModel for the requested provider.
+        """Return a new BaseChatModel for the requested provider.
+
+        Each call builds a fresh model with its own HTTP client; long-lived
+        callers should use ``get`` to share pooled models.
 
         Args:
             provider: "ollama", "anthropic", or "openai". Defaults to settings.LLM_PROVIDER.
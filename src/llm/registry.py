@@ -0,0 +1,281 @@
+"""Provider health tracking, latency-based routing and hedged LLM requests."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Callable
+from typing import Any
+
+import httpx
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROVIDERS = ("ollama", "anthropic", "openai")
+OPENAI_MODELS = ["gpt-4o", "gpt-4o-mini"]
+
+# A provider failing at least this share of recent calls is only used once
+# every healthier one has been tried
+UNHEALTHY_ERROR_RATE = 0.5
+
+
+class ProviderHealth:
+    """Rolling latency and outcome samples plus discovery data for one provider."""
+
+    def __init__(self, window: int = 200):
+        self.latencies_ms: deque[float] = deque(maxlen=window)
+        self.outcomes: deque[bool] = deque(maxlen=window)
+        self.available = True  # until discovery says otherwise
+        self.models: list[str] = []
+        self.checked_at: float | None = None
+
+    def record(self, latency_ms: float, ok: bool) -> None:
+        self.outcomes.append(ok)
+        if ok:
+            self.latencies_ms.append(latency_ms)
+
+    @property
+    def error_rate(self) -> float:
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    def percentile(self, q: float) -> float | None:
+        ordered = sorted(self.latencies_ms)
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "error_rate": round(self.error_rate, 3),
+            "samples": len(self.outcomes),
+        }
+
+
+class ProviderRegistry:
+    """Health of every LLM provider, used to rank them for routing and for ``/models``.
+
+    Each call made through a ``RoutedLLM`` records its latency and outcome.
+    Discovery (which providers are reachable and which models they offer)
+    is cached for ``ttl_seconds``; Ollama is probed over HTTP, the cloud
+    providers count as available when their API key is set.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = 30.0,
+        window: int = 200,
+        hedge_after_ms: float = 0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.hedge_after_ms = hedge_after_ms
+        self._clock = clock
+        self._health = {name: ProviderHealth(window) for name in PROVIDERS}
+        self._refreshing: asyncio.Task | None = None
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+
+    def health(self, provider: str) -> ProviderHealth:
+        return self._health[provider]
+
+    def record(self, provider: str, latency_ms: float, ok: bool) -> None:
+        self._health[provider].record(latency_ms, ok)
+
+    def ranked(self, providers: list[str]) -> list[str]:
+        """``providers`` healthiest first.
+
+        Available providers with recent successes come first, fastest
+        (p50 weighted by error rate) leading; then providers without
+        samples yet, in the given order; then the mostly failing ones;
+        unavailable providers last.
+        """
+        def key(item: tuple[int, str]) -> tuple[int, float, int]:
+            index, name = item
+            health = self._health[name]
+            if not health.available:
+                return (3, 0.0, index)
+            if health.error_rate >= UNHEALTHY_ERROR_RATE:
+                return (2, health.error_rate, index)
+            p50 = health.percentile(0.5)
+            if p50 is None:
+                return (1, 0.0, index)
+            return (0, p50 * (1 + 4 * health.error_rate), index)
+
+        return [name for _, name in sorted(enumerate(providers), key=key)]
+
+    # ------------------------------------------------------------------
+    # Discovery
+    # ------------------------------------------------------------------
+
+    def _stale(self) -> bool:
+        checked = [h.checked_at for h in self._health.values()]
+        return any(c is None or self._clock() - c > self.ttl_seconds for c in checked)
+
+    async def refresh(self, force: bool = False) -> None:
+        """Re-probe provider availability if the cached data is older than the TTL."""
+        if not (force or self._stale()):
+            return
+        ollama_models: list[str] | None = None
+        try:
+            async with httpx.AsyncClient(timeout=3.0) as client:
+                resp = await client.get(f"{settings.OLLAMA_BASE_URL}/api/tags")
+                if resp.status_code == 200:
+                    ollama_models = [m["name"] for m in resp.json().get("models", [])]
+        except (httpx.HTTPError, ValueError, KeyError) as exc:
+            logger.debug("Ollama discovery probe failed: %s", exc)
+
+        now = self._clock()
+        discovered = {
+            "ollama": (bool(ollama_models), ollama_models or []),
+            "anthropic": (bool(settings.ANTHROPIC_API_KEY), [settings.DEFAULT_MODEL]),
+            "openai": (bool(settings.OPENAI_API_KEY), list(OPENAI_MODELS)),
+        }
+        for name, (available, models) in discovered.items():
+            health = self._health[name]
+            health.available, health.models, health.checked_at = available, models, now
+
+    def refresh_soon(self) -> None:
+        """Start a background refresh when the cached data is stale (never blocks a call)."""
+        if self._stale() and (self._refreshing is None or self._refreshing.done()):
+            self._refreshing = asyncio.get_running_loop().create_task(self.refresh())
+
+    async def discover(self, force: bool = False) -> list[dict[str, Any]]:
+        """Providers with availability, models and recent health, from the cache."""
+        await self.refresh(force)
+        results = []
+        for name in PROVIDERS:
+            health = self._health[name]
+            entry: dict[str, Any] = {
+                "provider": name,
+                "available": health.available,
+                "models": list(health.models),
+            }
+            if name == "ollama":
+                entry["base_url"] = settings.OLLAMA_BASE_URL
+            entry["health"] = health.summary()
+            results.append(entry)
+        return results
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "providers": {name: h.summary() for name, h in self._health.items()},
+            "hedge_after_ms": self.hedge_after_ms or None,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "failovers": self.failovers,
+        }
+
+
+class RoutedLLM:
+    """A chat model that sends each call to the healthiest of several providers.
+
+    ``model_for(provider)`` returns the (pooled, scheduled) model to use for
+    a provider. A failed call moves on to the next provider in the ranking.
+    With ``registry.hedge_after_ms`` set, ``ainvoke`` starts the same request
+    on the runner-up once the first has taken that long and returns whichever
+    answers first, cancelling the other. Streams are not hedged; they fail
+    over only before their first chunk.
+    """
+
+    def __init__(self, registry: ProviderRegistry, providers: list[str], model_for: Callable[[str], Any]):
+        unknown = set(providers) - set(PROVIDERS)
+        if unknown or not providers:
+            raise ValueError(f"Unsupported routing providers: {sorted(unknown) or providers}")
+        self.registry = registry
+        self.providers = list(providers)
+        self.model_for = model_for
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.model_for(self.registry.ranked(self.providers)[0]), name)
+
+    async def _call(self, provider: str, input: Any, args: tuple, kwargs: dict) -> Any:
+        start = time.perf_counter()
+        try:
+            result = await self.model_for(provider).ainvoke(input, *args, **kwargs)
+        except asyncio.CancelledError:
+            # Lost a hedge (or the caller gave up): the true latency is at
+            # least the time spent so far, and at least the hedge threshold,
+            # so record that as a sample or a slow provider would never be demoted
+            elapsed = (time.perf_counter() - start) * 1000
+            self.registry.record(provider, max(elapsed, self.registry.hedge_after_ms), ok=True)
+            raise
+        except Exception:
+            self.registry.record(provider, (time.perf_counter() - start) * 1000, ok=False)
+            raise
+        self.registry.record(provider, (time.perf_counter() - start) * 1000, ok=True)
+        return result
+
+    async def _hedged(self, primary: str, backup: str, input: Any, args: tuple, kwargs: dict) -> Any:
+        first = asyncio.ensure_future(self._call(primary, input, args, kwargs))
+        done, _ = await asyncio.wait({first}, timeout=self.registry.hedge_after_ms / 1000)
+        if done and first.exception() is None:
+            return first.result()
+        if done:
+            logger.warning("LLM provider %s failed, trying %s", primary, backup, exc_info=first.exception())
+            self.registry.failovers += 1
+            return await self._call(backup, input, args, kwargs)
+
+        self.registry.hedges += 1
+        second = asyncio.ensure_future(self._call(backup, input, args, kwargs))
+        pending = {first, second}
+        error: BaseException | None = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self.registry.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def ainvoke(self, input: Any, *args: Any, **kwargs: Any) -> Any:
+        self.registry.refresh_soon()
+        order = self.registry.ranked(self.providers)
+        hedge = self.registry.hedge_after_ms > 0
+        error: Exception | None = None
+        i = 0
+        while i < len(order):
+            backup = order[i + 1] if hedge and i + 1 < len(order) else None
+            try:
+                if backup is not None:
+                    return await self._hedged(order[i], backup, input, args, kwargs)
+                return await self._call(order[i], input, args, kwargs)
+            except Exception as exc:  # noqa: BLE001 - any provider error fails over; re-raised below
+                error = exc
+            i += 2 if backup is not None else 1
+            if i < len(order):
+                logger.warning("LLM providers %s failed, trying %s", order[:i], order[i])
+                self.registry.failovers += 1
+        raise error
+
+    async def astream(self, input: Any, *args: Any, **kwargs: Any) -> AsyncIterator[Any]:
+        self.registry.refresh_soon()
+        order = self.registry.ranked(self.providers)
+        for i, provider in enumerate(order):
+            start = time.perf_counter()
+            started = False
+            try:
+                async for chunk in self.model_for(provider).astream(input, *args, **kwargs):
+                    started = True
+                    yield chunk
+            except Exception:
+                self.registry.record(provider, (time.perf_counter() - start) * 1000, ok=False)
+                if started or i == len(order) - 1:
+                    raise
+                logger.warning("LLM provider %s failed, trying %s", provider, order[i + 1])
+                self.registry.failovers += 1
+                continue
+            self.registry.record(provider, (time.perf_counter() - start) * 1000, ok=True)
+            return
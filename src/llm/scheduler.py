@@ -0,0 +1,346 @@
+"""Per-provider LLM concurrency limits, token budgets and priority queueing."""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Callable
+from typing import Any, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Highest priority first: student chats, then grading, then bulk generation
+# and enrichment. A waiting request is only started once nothing of a higher
+# class is queued for the same provider.
+PRIORITIES = ("interactive", "grading", "background")
+
+TOKEN_WINDOW_SECONDS = 60.0
+
+
+def is_rate_limit(exc: BaseException) -> bool:
+    """True for provider "429 Too Many Requests" errors (any SDK)."""
+    for source in (exc, getattr(exc, "response", None)):
+        if getattr(source, "status_code", None) == 429 or getattr(source, "status", None) == 429:
+            return True
+    return type(exc).__name__ in ("RateLimitError", "TooManyRequests")
+
+
+def retry_after(exc: BaseException) -> float | None:
+    """Seconds from the error's ``Retry-After`` header, if it has one."""
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        return max(0.0, float(headers.get("retry-after")))
+    except (TypeError, ValueError):
+        return None
+
+
+def _percentiles(samples: deque) -> dict[str, float] | None:
+    ordered = sorted(samples)
+    if not ordered:
+        return None
+    return {
+        "p50": ordered[len(ordered) // 2],
+        "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "samples": len(ordered),
+    }
+
+
+class _Provider:
+    """Queue, active count, token window and backoff state of one provider."""
+
+    def __init__(self, concurrency: int, tokens_per_minute: int):
+        self.concurrency = max(1, concurrency)
+        self.tokens_per_minute = tokens_per_minute
+        self.active = 0
+        self.waiting: list[tuple[int, int, asyncio.Future, int]] = []
+        self.window: deque[list[float]] = deque()  # [started_at, tokens]
+        self.window_tokens = 0.0
+        self.backoff_until = 0.0
+        self.wakeup: asyncio.TimerHandle | None = None
+        self.completed = dict.fromkeys(PRIORITIES, 0)
+        self.wait_ms = {priority: deque(maxlen=1000) for priority in PRIORITIES}
+        self.rate_limited = 0
+
+
+class LLMScheduler:
+    """Admit LLM calls per provider by priority, concurrency and tokens per minute.
+
+    Each provider runs at most ``concurrency[provider]`` calls at once and
+    starts no call that would push its tokens over ``tokens_per_minute``
+    in the trailing minute (missing or 0 = unlimited). Calls wait in a
+    priority queue (``PRIORITIES``, FIFO within a class). A 429 from the
+    provider pauses it for the ``Retry-After`` delay, or an exponential
+    backoff, and the call is queued again up to ``max_retries`` times.
+    """
+
+    def __init__(
+        self,
+        concurrency: dict[str, int] | None = None,
+        tokens_per_minute: dict[str, int] | None = None,
+        default_concurrency: int = 4,
+        max_retries: int = 3,
+        backoff_seconds: float = 1.0,
+        max_backoff_seconds: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.concurrency = concurrency or {}
+        self.tokens_per_minute = tokens_per_minute or {}
+        self.default_concurrency = default_concurrency
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self._clock = clock
+        self._providers: dict[str, _Provider] = {}
+        self._seq = itertools.count()
+
+    def _provider(self, name: str) -> _Provider:
+        state = self._providers.get(name)
+        if state is None:
+            state = _Provider(
+                self.concurrency.get(name, self.default_concurrency),
+                self.tokens_per_minute.get(name, 0),
+            )
+            self._providers[name] = state
+        return state
+
+    # ------------------------------------------------------------------
+    # Admission
+    # ------------------------------------------------------------------
+
+    async def acquire(self, provider: str, priority: str, tokens: int) -> list[float]:
+        """Wait for a slot; returns the token-window entry to pass to ``release``."""
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown LLM priority: {priority!r}. Supported: {', '.join(PRIORITIES)}")
+        state = self._provider(provider)
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        heapq.heappush(state.waiting, (PRIORITIES.index(priority), next(self._seq), future, tokens))
+        queued_at = time.perf_counter()
+        self._dispatch(state)
+        try:
+            entry = await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release(provider, future.result())
+            else:
+                self._dispatch(state)  # the head of the queue may have changed
+            raise
+        state.wait_ms[priority].append(round((time.perf_counter() - queued_at) * 1000, 2))
+        return entry
+
+    def release(self, provider: str, entry: list[float], tokens_used: int | None = None) -> None:
+        """Free the slot; ``tokens_used`` replaces the estimate counted at admission."""
+        state = self._provider(provider)
+        state.active -= 1
+        if tokens_used is not None and any(e is entry for e in state.window):
+            state.window_tokens += tokens_used - entry[1]
+            entry[1] = tokens_used
+        self._dispatch(state)
+
+    def _dispatch(self, state: _Provider) -> None:
+        """Start queued calls while the provider has a free slot and token budget."""
+        if state.wakeup is not None:
+            state.wakeup.cancel()
+            state.wakeup = None
+        now = self._clock()
+        while state.window and state.window[0][0] <= now - TOKEN_WINDOW_SECONDS:
+            state.window_tokens -= state.window.popleft()[1]
+
+        wake_at = None
+        if now < state.backoff_until:
+            wake_at = state.backoff_until
+        while wake_at is None and state.waiting and state.active < state.concurrency:
+            _, _, future, tokens = state.waiting[0]
+            if future.done():  # cancelled while queued
+                heapq.heappop(state.waiting)
+                continue
+            budget = state.tokens_per_minute
+            if budget and state.window and state.window_tokens + tokens > budget:
+                wake_at = state.window[0][0] + TOKEN_WINDOW_SECONDS
+                break
+            heapq.heappop(state.waiting)
+            entry = [now, float(tokens)]
+            state.window.append(entry)
+            state.window_tokens += tokens
+            state.active += 1
+            future.set_result(entry)
+
+        if wake_at is not None and state.waiting:
+            loop = state.waiting[0][2].get_loop()
+            state.wakeup = loop.call_later(max(0.0, wake_at - now), self._dispatch, state)
+
+    def _backoff(self, provider: str, exc: BaseException, attempt: int) -> None:
+        state = self._provider(provider)
+        state.rate_limited += 1
+        delay = retry_after(exc)
+        if delay is None:
+            delay = min(self.max_backoff_seconds, self.backoff_seconds * 2**attempt)
+            delay *= 0.5 + random.random() / 2
+        state.backoff_until = max(state.backoff_until, self._clock() + delay)
+        logger.warning("LLM provider %s rate limited; pausing %.1fs", provider, delay)
+
+    # ------------------------------------------------------------------
+    # Calls
+    # ------------------------------------------------------------------
+
+    async def run(
+        self,
+        provider: str,
+        priority: str,
+        tokens: int,
+        call: Callable[[], Awaitable[T]],
+        used: Callable[[T], int | None] | None = None,
+    ) -> T:
+        """Run ``call()`` once admitted, retrying after 429s.
+
+        ``used(result)`` may report the tokens the call actually consumed.
+        """
+        for attempt in range(self.max_retries + 1):
+            entry = await self.acquire(provider, priority, tokens)
+            tokens_used = None
+            try:
+                result = await call()
+                tokens_used = used(result) if used is not None else None
+            except Exception as exc:
+                if not is_rate_limit(exc) or attempt == self.max_retries:
+                    raise
+                self._backoff(provider, exc, attempt)
+                continue
+            finally:
+                self.release(provider, entry, tokens_used)
+            self._provider(provider).completed[priority] += 1
+            return result
+        raise AssertionError("unreachable")
+
+    async def stream(
+        self,
+        provider: str,
+        priority: str,
+        tokens: int,
+        open_stream: Callable[[], AsyncIterator[T]],
+        used: Callable[[], int | None] | None = None,
+    ) -> AsyncIterator[T]:
+        """Yield from ``open_stream()``, holding the slot until it is exhausted.
+
+        A 429 is retried only before the first item has been yielded.
+        ``used()`` is asked for the tokens consumed once the stream ends.
+        """
+        for attempt in range(self.max_retries + 1):
+            entry = await self.acquire(provider, priority, tokens)
+            started = False
+            try:
+                async for item in open_stream():
+                    started = True
+                    yield item
+            except Exception as exc:
+                if started or not is_rate_limit(exc) or attempt == self.max_retries:
+                    raise
+                self._backoff(provider, exc, attempt)
+                continue
+            finally:
+                self.release(provider, entry, used() if used is not None and started else None)
+            self._provider(provider).completed[priority] += 1
+            return
+
+    # ------------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------------
+
+    def stats(self) -> dict[str, Any]:
+        """Per-provider queue depth, active calls, token usage and wait times."""
+        now = self._clock()
+        result: dict[str, Any] = {}
+        for name, state in self._providers.items():
+            queued = dict.fromkeys(PRIORITIES, 0)
+            for priority, _, future, _ in state.waiting:
+                if not future.done():
+                    queued[PRIORITIES[priority]] += 1
+            window = sum(t for started, t in state.window if started > now - TOKEN_WINDOW_SECONDS)
+            result[name] = {
+                "concurrency": state.concurrency,
+                "active": state.active,
+                "queued": queued,
+                "completed": dict(state.completed),
+                "tokens_per_minute": state.tokens_per_minute or None,
+                "tokens_last_minute": int(window),
+                "rate_limited": state.rate_limited,
+                "backoff_remaining_s": round(max(0.0, state.backoff_until - now), 2),
+                "wait_ms": {p: _percentiles(samples) for p, samples in state.wait_ms.items()},
+            }
+        return result
+
+
+def estimate_tokens(value: Any) -> int:
+    """Rough prompt size in tokens (about four characters per token)."""
+    if isinstance(value, str):
+        return len(value) // 4 + 1
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_tokens(item) for item in value)
+    content = getattr(value, "content", None)
+    if isinstance(content, str):
+        return len(content) // 4 + 1
+    return len(str(value)) // 4 + 1
+
+
+class ScheduledLLM:
+    """A chat model whose ``ainvoke``/``astream`` calls go through an ``LLMScheduler``.
+
+    Everything else (``model``, ``invoke``, ...) is the wrapped model's.
+    Each call reserves its prompt estimate plus ``max_tokens`` against the
+    provider's budget and settles on the reported usage afterwards.
+    """
+
+    def __init__(self, llm: Any, provider: str, priority: str, max_tokens: int, scheduler: LLMScheduler):
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown LLM priority: {priority!r}. Supported: {', '.join(PRIORITIES)}")
+        self.llm = llm
+        self.provider = provider
+        self.priority = priority
+        self.max_tokens = max_tokens
+        self.scheduler = scheduler
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.llm, name)
+
+    async def ainvoke(self, input: Any, *args: Any, **kwargs: Any) -> Any:
+        prompt_tokens = estimate_tokens(input)
+
+        def used(response: Any) -> int:
+            usage = getattr(response, "usage_metadata", None)
+            if isinstance(usage, dict) and usage.get("total_tokens"):
+                return int(usage["total_tokens"])
+            return prompt_tokens + estimate_tokens(getattr(response, "content", ""))
+
+        return await self.scheduler.run(
+            self.provider,
+            self.priority,
+            prompt_tokens + self.max_tokens,
+            lambda: self.llm.ainvoke(input, *args, **kwargs),
+            used,
+        )
+
+    def astream(self, input: Any, *args: Any, **kwargs: Any) -> AsyncIterator[Any]:
+        prompt_tokens = estimate_tokens(input)
+        output_tokens = 0
+
+        async def counted() -> AsyncIterator[Any]:
+            nonlocal output_tokens
+            async for chunk in self.llm.astream(input, *args, **kwargs):
+                output_tokens += estimate_tokens(getattr(chunk, "content", "")) - 1
+                yield chunk
+
+        return self.scheduler.stream(
+            self.provider,
+            self.priority,
+            prompt_tokens + self.max_tokens,
+            counted,
+            lambda: prompt_tokens + output_tokens,
+        )
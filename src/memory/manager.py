@@ -1,11 +1,25 @@
+from __future__ import annotations
+
+import asyncio
 import json
+import logging
 from datetime import datetime, timezone
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 import chromadb
 import redis.asyncio as aioredis
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
+from src.rag import aliases
+from src.rag.client import create_chroma_client
+from src.rag.ids import content_chunk_id
+
+if TYPE_CHECKING:
+    from src.rag.embeddings import EmbeddingService
+    from src.rag.retriever import KnowledgeRetriever
+
+logger = logging.getLogger(__name__)
+
 
 class MemoryManager:
     """
@@ -21,17 +35,33 @@ class MemoryManager:
         db_session_factory: async_sessionmaker | None = None,
         chroma_host: str = "localhost",
         chroma_port: int = 8100,
+        chroma_mode: str = "http",
+        chroma_persist_path: str | None = None,
+        chroma_quantization: str = "int8",
+        chroma_rescore_factor: int = 4,
+        embedder: EmbeddingService | None = None,
+        retriever: KnowledgeRetriever | None = None,
     ):
         self.redis_url = redis_url
         self.db_session_factory = db_session_factory
         self.chroma_host = chroma_host
         self.chroma_port = chroma_port
+        self.chroma_mode = chroma_mode
+        self.chroma_persist_path = chroma_persist_path
+        self.chroma_quantization = chroma_quantization
+        self.chroma_rescore_factor = chroma_rescore_factor
         self._redis: aioredis.Redis | None = None
-        self._chroma: chromadb.HttpClient | None = None
+        self._chroma: chromadb.ClientAPI | None = None
+        self._embedder = embedder
+        # Searches of the retriever's collection go through it (shard routing)
+        self.retriever = retriever
 
     async def initialize(self):
         self._redis = aioredis.from_url(self.redis_url, decode_responses=True)
-        self._chroma = chromadb.HttpClient(host=self.chroma_host, port=self.chroma_port)
+        self._chroma = create_chroma_client(
+            self.chroma_mode, self.chroma_host, self.chroma_port, self.chroma_persist_path,
+            self.chroma_quantization, self.chroma_rescore_factor,
+        )
 
     # === Working Memory (Redis) ===
 
@@ -129,11 +159,18 @@ class MemoryManager:
         if not self._chroma:
             return
         collection = self._chroma.get_or_create_collection(
-            name=collection_name,
+            name=aliases.resolve(self._chroma, collection_name),
             metadata={"hnsw:space": "cosine"},
         )
-        ids = [f"doc_{hash(d)}_{i}" for i, d in enumerate(documents)]
-        collection.add(
+        # Content-derived IDs + upsert: storing the same text twice is a no-op
+        unique: dict[str, int] = {}
+        for i, d in enumerate(documents):
+            unique.setdefault(content_chunk_id(d, prefix="doc"), i)
+        ids = list(unique)
+        documents = [documents[i] for i in unique.values()]
+        if metadatas:
+            metadatas = [metadatas[i] for i in unique.values()]
+        collection.upsert(
             documents=documents,
             metadatas=metadatas or [{} for _ in documents],
             ids=ids,
@@ -146,28 +183,53 @@ class MemoryManager:
         n_results: int = 5,
         filters: dict[str, Any] | None = None,
     ) -> list[dict[str, Any]]:
-        """Search ChromaDB for relevant knowledge."""
+        """Search ChromaDB for relevant knowledge.
+
+        With an embedding service the query is embedded (and cached) there
+        and sent as ``query_embeddings``. The retriever's own collection is
+        searched through ``KnowledgeRetriever.search_chunks``, so subject
+        shards are used when sharding is on. Errors from the vector store
+        are raised, so callers can record the lookup as failed.
+        """
+        if self.retriever is not None and collection_name == self.retriever.collection_name:
+            return self._format_hits(
+                await self.retriever.search_chunks(query, n_results=n_results, where=filters)
+            )
         if not self._chroma:
             return []
-        try:
+        query_input: dict[str, Any] = {"query_texts": [query]}
+        if self._embedder is not None:
+            try:
+                query_input = {"query_embeddings": await self._embedder.embed([query])}
+            except Exception:
+                # Let Chroma embed the text itself
+                logger.warning("Query embedding failed; falling back to Chroma", exc_info=True)
+
+        def query() -> dict[str, Any]:
             collection = self._chroma.get_or_create_collection(
-                name=collection_name,
+                name=aliases.resolve(self._chroma, collection_name),
                 metadata={"hnsw:space": "cosine"},
             )
-            results = collection.query(
-                query_texts=[query],
+            return collection.query(
+                **query_input,
                 n_results=n_results,
                 where=filters if filters else None,
             )
-        except Exception:
-            return []
 
-        if not results or not results.get("documents") or not results["documents"][0]:
-            return []
+        # Blocking client call: keep it off the event loop so concurrent
+        # context lookups are not stalled behind it
+        results = await asyncio.get_running_loop().run_in_executor(None, query) or {}
+        fields = ("documents", "metadatas", "distances")
+        return self._format_hits({field: (results.get(field) or [[]])[0] for field in fields})
 
-        documents = results["documents"][0]
-        metadatas = results["metadatas"][0] if results.get("metadatas") else [{}] * len(documents)
-        distances = results["distances"][0] if results.get("distances") else [0.0] * len(documents)
+    @staticmethod
+    def _format_hits(results: dict[str, Any]) -> list[dict[str, Any]]:
+        """``{"document", "metadata", "distance"}`` per hit of one query's results."""
+        documents = results.get("documents") or []
+        if not documents:
+            return []
+        metadatas = results.get("metadatas") or [{}] * len(documents)
+        distances = results.get("distances") or [0.0] * len(documents)
 
         return [
             {"document": doc, "metadata": meta, "distance": dist}
@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+import asyncio
+import logging
 from typing import TYPE_CHECKING, Any
 
 if TYPE_CHECKING:
@@ -9,6 +11,8 @@ if TYPE_CHECKING:
 
     from src.memory.manager import MemoryManager
 
+logger = logging.getLogger(__name__)
+
 
 class StudentContextBuilder:
     """Build a rich student context by merging data from Redis, PostgreSQL, and ChromaDB."""
@@ -27,48 +31,52 @@ class StudentContextBuilder:
         - Tier 1 (Redis): current session state, recent conversation
         - Tier 2 (PostgreSQL): last 5 session summaries, mastery scores, struggle points
         - Tier 3 (ChromaDB): student-specific knowledge gaps (optional)
+
+        A failed optional lookup leaves its part empty and is listed under
+        ``degraded``.
         """
         context: dict[str, Any] = {
             "student_id": student_id,
             "session_id": session_id,
         }
+        degraded: list[str] = []
+
+        async def knowledge_gaps() -> list[dict[str, Any]]:
+            try:
+                return await self.memory.search_knowledge(
+                    query=f"knowledge gaps for student {student_id}",
+                    collection_name="student_gaps",
+                    n_results=3,
+                    filters={"student_id": student_id} if student_id else None,
+                )
+            except Exception:
+                degraded.append("knowledge_gaps")
+                logger.warning("Knowledge gap lookup failed for student %s", student_id, exc_info=True)
+                return []
+
+        # The lookups are independent, so all tiers are queried concurrently
+        session_context, conversation, summaries, mastery, struggles, gaps = await asyncio.gather(
+            # Tier 1: Working Memory (Redis) - session state, recent conversation
+            self.memory.get_session_context(session_id),
+            self.memory.get_conversation_history(session_id, limit=20),
+            # Tier 2: Episodic Memory (PostgreSQL) - summaries, mastery, struggles
+            self.memory.get_student_history(student_id=student_id, limit=5),
+            self.memory.get_student_mastery(student_id),
+            self.memory.get_struggle_points(student_id),
+            # Tier 3: Semantic Memory (ChromaDB, optional)
+            knowledge_gaps(),
+        )
 
-        # --- Tier 1: Working Memory (Redis) ---
-        session_context = await self.memory.get_session_context(session_id)
         if session_context:
             context["session_state"] = session_context
-
-        conversation = await self.memory.get_conversation_history(session_id, limit=20)
         context["recent_conversation"] = conversation
-
-        # --- Tier 2: Episodic Memory (PostgreSQL) ---
-        # Recent session summaries
-        summaries = await self.memory.get_student_history(
-            student_id=student_id,
-            limit=5,
-        )
         context["session_summaries"] = [
             s for s in summaries if s.get("event_type") == "session_summary"
         ]
-
-        # Mastery scores
-        mastery = await self.memory.get_student_mastery(student_id)
         context["mastery_scores"] = mastery
-
-        # Struggle points
-        struggles = await self.memory.get_struggle_points(student_id)
         context["struggle_points"] = struggles
-
-        # --- Tier 3: Semantic Memory (ChromaDB, optional) ---
-        try:
-            gaps = await self.memory.search_knowledge(
-                query=f"knowledge gaps for student {student_id}",
-                collection_name="student_gaps",
-                n_results=3,
-                filters={"student_id": student_id} if student_id else None,
-            )
-            context["knowledge_gaps"] = gaps
-        except Exception:
-            context["knowledge_gaps"] = []
+        context["knowledge_gaps"] = gaps
+        if degraded:
+            context["degraded"] = degraded
 
         return context
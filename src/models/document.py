@@ -21,6 +21,8 @@ class Document(Base):
     chunk_count = Column(Integer, default=0)
     status = Column(String(50), default="pending")
     metadata_ = Column("metadata", JSONB, server_default=text("'{}'"))
+    # Content-derived ID shared with the document's chunks in the vector store
+    vector_document_id = Column(String(64), nullable=True, index=True)
     uploaded_by = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     created_at = Column(DateTime, server_default=func.now())
     processed_at = Column(DateTime, nullable=True)
@@ -0,0 +1,83 @@
+"""Logical -> physical collection names, stored in the vector store itself.
+
+Rebuilding a collection creates a new physical collection and then points
+the logical name at it with a single metadata write, so the logical name
+always resolves to a complete collection. While a rebuild copies data, the
+logical name is also marked as *rebuilding* into the new collection; writers
+(holding the shared write lock) send their writes to both collections.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from chromadb.errors import NotFoundError
+
+# Collection whose metadata holds the mapping. Keeping it in Chroma makes a
+# flip visible to every process and host using the same server. Names
+# without an entry are their own physical collection.
+ALIAS_COLLECTION = "collection-aliases"
+_MARKER = "_aliases"
+_REBUILDING = "rebuilding:"  # never part of a collection name
+
+
+def _alias_collection(client: Any, create: bool = False):
+    if create:
+        return client.get_or_create_collection(name=ALIAS_COLLECTION, metadata={_MARKER: 1})
+    try:
+        return client.get_collection(ALIAS_COLLECTION)
+    except (NotFoundError, ValueError):  # ValueError: older chromadb, quantized store
+        return None
+
+
+def _read(client: Any) -> dict[str, Any]:
+    collection = _alias_collection(client)
+    metadata = collection.metadata if collection is not None else None
+    return dict(metadata) if isinstance(metadata, dict) else {}
+
+
+def _write(client: Any, metadata: dict[str, Any]) -> None:
+    metadata[_MARKER] = 1  # Chroma rejects empty metadata
+    _alias_collection(client, create=True).modify(metadata=metadata)
+
+
+def aliases(client: Any) -> dict[str, str]:
+    """Every logical name that currently points at another collection."""
+    return {
+        name: physical for name, physical in _read(client).items()
+        if name != _MARKER and not name.startswith(_REBUILDING)
+    }
+
+
+def rebuilding(client: Any) -> dict[str, str]:
+    """Logical names being rebuilt -> the collection their writes are mirrored to."""
+    return {
+        name[len(_REBUILDING):]: physical for name, physical in _read(client).items()
+        if name.startswith(_REBUILDING)
+    }
+
+
+def resolve(client: Any, name: str) -> str:
+    """Physical collection currently serving logical collection ``name``."""
+    return aliases(client).get(name, name)
+
+
+def mark_rebuilding(client: Any, name: str, physical: str | None) -> None:
+    """Start (``physical``) or stop (None) mirroring writes to ``name`` into ``physical``."""
+    metadata = _read(client)
+    if physical is None:
+        metadata.pop(_REBUILDING + name, None)
+    else:
+        metadata[_REBUILDING + name] = physical
+    _write(client, metadata)
+
+
+def point(client: Any, name: str, physical: str) -> None:
+    """Make ``name`` resolve to ``physical`` and end its rebuild, in one metadata write."""
+    metadata = _read(client)
+    metadata.pop(_REBUILDING + name, None)
+    if physical == name:
+        metadata.pop(name, None)
+    else:
+        metadata[name] = physical
+    _write(client, metadata)
@@ -0,0 +1,410 @@
+"""Local BM25 inverted index used alongside ChromaDB for hybrid retrieval."""
+
+from __future__ import annotations
+
+import json
+import logging
+import math
+import os
+import re
+import struct
+import threading
+import time
+from array import array
+from typing import Any
+
+import numpy as np
+
+from src.rag.locks import FileLock
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"\b[a-zA-Z]{2,}\b")
+_MAGIC = b"EDUBM25\x01"
+_MAX_TF = 0xFFFF
+
+
+def tokenize(text: str) -> list[str]:
+    """Extract lowercase words of 2+ chars (same rule as ``ResultRanker``)."""
+    return _TOKEN_RE.findall(text.lower())
+
+
+def reciprocal_rank_fusion(rankings: list[list[str]], k: int = 60) -> list[tuple[str, float]]:
+    """Merge ranked id lists with reciprocal-rank fusion.
+
+    Each id scores ``sum(1 / (k + rank))`` over the lists it appears in
+    (rank is 1-based). Returns (id, score) pairs, best first.
+    """
+    scores: dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, 1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+
+
+class BM25Index:
+    """Append-friendly BM25 index over chunk texts.
+
+    Postings are stored per term as two parallel arrays: ``array('I')`` chunk
+    numbers (ascending, since chunks are only appended) and ``array('H')``
+    term frequencies; ``search`` scores them with numpy. Deleted chunks are
+    tombstoned (excluded from scores and document frequencies) and dropped
+    on the next compaction. Each chunk also remembers its ``document_id``
+    and ``subject`` so deletes and subject filters work without touching
+    ChromaDB.
+
+    The index lives in one process. Only the process holding
+    ``{path}.lock`` (taken by ``load``) writes the file; the others are
+    ``read_only`` and start empty, so they rebuild from ChromaDB instead of
+    overwriting the file with their own partial view. Chunks written or
+    deleted by another worker are picked up by
+    ``KnowledgeRetriever.sync_keyword_index``.
+
+    All public methods are thread-safe; callers run them on the Chroma
+    executor so scoring never blocks the event loop.
+    """
+
+    FILTER_FIELDS = ("document_id", "subject")
+
+    def __init__(
+        self,
+        path: str | None = None,
+        k1: float = 1.5,
+        b: float = 0.75,
+        compact_ratio: float = 0.25,
+    ):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.compact_ratio = compact_ratio
+        self.read_only = False
+        self._owner: FileLock | None = None
+        self._lock = threading.RLock()
+        self._chunk_ids: list[str] = []
+        self._chunk_nums: dict[str, int] = {}
+        self._owners: list[str] = []
+        self._doc_chunks: dict[str, list[int]] = {}
+        self._subject_codes = array("I")
+        self._subject_names: list[str] = []
+        self._subject_ids: dict[str, int] = {}
+        self._lengths = array("I")
+        self._alive = bytearray()
+        self._postings: dict[str, tuple[array, array]] = {}
+        self._live_count = 0
+        self._total_length = 0
+        self._dirty = False
+        self._last_save = 0.0
+
+    def empty_copy(self) -> BM25Index:
+        """An empty index with the same settings and file ownership (for rebuilds)."""
+        copy = BM25Index(path=self.path, k1=self.k1, b=self.b, compact_ratio=self.compact_ratio)
+        copy.read_only, copy._owner = self.read_only, self._owner
+        return copy
+
+    # --- Updates ---
+
+    def _subject_code(self, subject: str) -> int:
+        code = self._subject_ids.get(subject)
+        if code is None:
+            code = self._subject_ids[subject] = len(self._subject_names)
+            self._subject_names.append(subject)
+        return code
+
+    def add(self, chunk_ids: list[str], texts: list[str], metadatas: list[dict[str, Any]]) -> None:
+        """Index chunks. Re-adding an existing chunk id replaces it."""
+        with self._lock:
+            for chunk_id, text, meta in zip(chunk_ids, texts, metadatas):
+                if chunk_id in self._chunk_nums:
+                    self._tombstone(self._chunk_nums.pop(chunk_id))
+                num = len(self._chunk_ids)
+                owner = str(meta.get("document_id", ""))
+                self._chunk_ids.append(chunk_id)
+                self._chunk_nums[chunk_id] = num
+                self._owners.append(owner)
+                self._doc_chunks.setdefault(owner, []).append(num)
+                self._subject_codes.append(self._subject_code(str(meta.get("subject", ""))))
+
+                counts: dict[str, int] = {}
+                tokens = tokenize(text)
+                for token in tokens:
+                    counts[token] = counts.get(token, 0) + 1
+                for term, tf in counts.items():
+                    postings = self._postings.get(term)
+                    if postings is None:
+                        postings = (array("I"), array("H"))
+                        self._postings[term] = postings
+                    postings[0].append(num)
+                    postings[1].append(min(tf, _MAX_TF))
+
+                self._lengths.append(len(tokens))
+                self._alive.append(1)
+                self._live_count += 1
+                self._total_length += len(tokens)
+            self._dirty = True
+
+    def remove_document(self, document_id: str) -> int:
+        """Tombstone every chunk of a document. Returns the number removed."""
+        removed = 0
+        with self._lock:
+            for num in self._doc_chunks.pop(document_id, []):
+                if self._alive[num]:
+                    self._chunk_nums.pop(self._chunk_ids[num], None)
+                    self._tombstone(num)
+                    removed += 1
+            if removed:
+                self._dirty = True
+                self._maybe_compact()
+        return removed
+
+    def remove_ids(self, chunk_ids: list[str]) -> int:
+        """Tombstone specific chunks. Returns the number removed."""
+        removed = 0
+        with self._lock:
+            for chunk_id in chunk_ids:
+                num = self._chunk_nums.pop(chunk_id, None)
+                if num is not None:
+                    self._tombstone(num)
+                    removed += 1
+            if removed:
+                self._dirty = True
+                self._maybe_compact()
+        return removed
+
+    def _tombstone(self, num: int) -> None:
+        if self._alive[num]:
+            self._alive[num] = 0
+            self._live_count -= 1
+            self._total_length -= self._lengths[num]
+
+    def _maybe_compact(self) -> None:
+        dead = len(self._chunk_ids) - self._live_count
+        if self._chunk_ids and dead / len(self._chunk_ids) > self.compact_ratio:
+            self.compact()
+
+    def compact(self) -> None:
+        """Drop tombstoned chunks and renumber postings."""
+        with self._lock:
+            remap = array("i", [-1]) * len(self._chunk_ids)
+            chunk_ids, owners, subjects, lengths = [], [], array("I"), array("I")
+            for num, alive in enumerate(self._alive):
+                if alive:
+                    remap[num] = len(chunk_ids)
+                    chunk_ids.append(self._chunk_ids[num])
+                    owners.append(self._owners[num])
+                    subjects.append(self._subject_codes[num])
+                    lengths.append(self._lengths[num])
+
+            postings: dict[str, tuple[array, array]] = {}
+            for term, (nums, tfs) in self._postings.items():
+                new_nums, new_tfs = array("I"), array("H")
+                for num, tf in zip(nums, tfs):
+                    mapped = remap[num]
+                    if mapped >= 0:
+                        new_nums.append(mapped)
+                        new_tfs.append(tf)
+                if new_nums:
+                    postings[term] = (new_nums, new_tfs)
+
+            self._chunk_ids = chunk_ids
+            self._chunk_nums = {cid: i for i, cid in enumerate(chunk_ids)}
+            self._owners = owners
+            self._doc_chunks = _group_by_owner(owners)
+            self._subject_codes = subjects
+            self._lengths = lengths
+            self._alive = bytearray(b"\x01") * len(chunk_ids)
+            self._postings = postings
+            self._dirty = True
+
+    # --- Search ---
+
+    def supports_filter(self, where: dict[str, Any] | None) -> bool:
+        """True if ``where`` only uses equality on fields this index tracks."""
+        if not where:
+            return True
+        return all(
+            key in self.FILTER_FIELDS and isinstance(value, (str, int, float, bool))
+            for key, value in where.items()
+        )
+
+    def search(
+        self, query: str, k: int = 10, where: dict[str, Any] | None = None
+    ) -> list[tuple[str, float]]:
+        """Return up to ``k`` (chunk_id, bm25_score) pairs, best first."""
+        terms = set(tokenize(query))
+        if not terms or k <= 0:
+            return []
+        with self._lock:
+            if not self._live_count:
+                return []
+            n = self._live_count
+            avgdl = self._total_length / n
+            subject = self._subject_ids.get(str(where["subject"]), -1) if where and "subject" in where else None
+            owned = None
+            if where and "document_id" in where:
+                owned = np.array(self._doc_chunks.get(str(where["document_id"]), []), dtype=np.uint32)
+
+            hit_nums, hit_scores = [], []
+            for term in terms:
+                postings = self._postings.get(term)
+                if postings is None:
+                    continue
+                nums = _as_numpy(postings[0], np.uint32)
+                live = _gather(self._alive, np.uint8, nums).astype(bool)
+                df = int(live.sum())
+                if subject is not None:
+                    live &= _gather(self._subject_codes, np.uint32, nums) == subject
+                if owned is not None:
+                    live &= np.isin(nums, owned)
+                if not live.any():
+                    continue
+                nums = nums[live]
+                tfs = _as_numpy(postings[1], np.uint16)[live].astype(np.float64)
+                lengths = _gather(self._lengths, np.uint32, nums)
+                idf = math.log(1.0 + (n - df + 0.5) / (df + 0.5))
+                norm = tfs + self.k1 * (1.0 - self.b + self.b * lengths / avgdl)
+                hit_nums.append(nums)
+                hit_scores.append(idf * tfs * (self.k1 + 1.0) / norm)
+
+            if not hit_nums:
+                return []
+            chunks, positions = np.unique(np.concatenate(hit_nums), return_inverse=True)
+            scores = np.bincount(positions, weights=np.concatenate(hit_scores))
+            best = np.argsort(-scores, kind="stable")[:k]
+            return [(self._chunk_ids[int(chunks[i])], float(scores[i])) for i in best]
+
+    def __len__(self) -> int:
+        return self._live_count
+
+    def chunk_ids(self) -> set[str]:
+        """IDs of all live (not tombstoned) chunks."""
+        with self._lock:
+            return set(self._chunk_nums)
+
+    # --- Persistence ---
+
+    def save(self, path: str | None = None) -> None:
+        """Write the index atomically (temp file + rename); a no-op when ``read_only``."""
+        path = path or self.path
+        if not path or self.read_only:
+            return
+        with self._lock:
+            if self._live_count < len(self._chunk_ids):
+                self.compact()
+            terms = list(self._postings)
+            header = json.dumps({
+                "k1": self.k1,
+                "b": self.b,
+                "chunk_ids": self._chunk_ids,
+                "owners": self._owners,
+                "subjects": [self._subject_names[code] for code in self._subject_codes],
+                "terms": terms,
+                "df": [len(self._postings[t][0]) for t in terms],
+            }).encode("utf-8")
+
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(_MAGIC)
+                f.write(struct.pack("<Q", len(header)))
+                f.write(header)
+                self._lengths.tofile(f)
+                for term in terms:
+                    nums, tfs = self._postings[term]
+                    nums.tofile(f)
+                    tfs.tofile(f)
+            os.replace(tmp_path, path)
+            self._dirty = False
+            self._last_save = time.monotonic()
+
+    def maybe_save(self, interval: float) -> bool:
+        """Save if there are unsaved changes and ``interval`` seconds have passed."""
+        if self._dirty and not self.read_only and time.monotonic() - self._last_save >= interval:
+            self.save()
+            return True
+        return False
+
+    def close(self) -> None:
+        """Give up ownership of the index file."""
+        if self._owner is not None:
+            self._owner.release()
+            self._owner = None
+
+    @classmethod
+    def load(cls, path: str, **kwargs: Any) -> BM25Index:
+        """Load an index from ``path``; returns an empty index if it does not exist.
+
+        The first process to load ``path`` becomes its writer. Others get an
+        empty ``read_only`` index, to be filled from ChromaDB
+        (``KnowledgeRetriever.rebuild_keyword_index``).
+        """
+        index = cls(path=path, **kwargs)
+        owner = FileLock(f"{path}.lock")
+        if not owner.acquire(blocking=False):
+            logger.info("BM25 index %s is written by another process; this one rebuilds its own", path)
+            index.read_only = True
+            return index
+        index._owner = owner
+        if not os.path.exists(path):
+            return index
+        try:
+            with open(path, "rb") as f:
+                if f.read(len(_MAGIC)) != _MAGIC:
+                    raise ValueError("not a BM25 index file")
+                (header_len,) = struct.unpack("<Q", f.read(8))
+                header = json.loads(f.read(header_len))
+                count = len(header["chunk_ids"])
+                lengths = array("I")
+                lengths.fromfile(f, count)
+                postings: dict[str, tuple[array, array]] = {}
+                for term, df in zip(header["terms"], header["df"]):
+                    nums, tfs = array("I"), array("H")
+                    nums.fromfile(f, df)
+                    tfs.fromfile(f, df)
+                    postings[term] = (nums, tfs)
+        except Exception:
+            logger.warning("Could not load BM25 index from %s; starting empty", path, exc_info=True)
+            return index
+
+        index.k1 = header["k1"]
+        index.b = header["b"]
+        index._chunk_ids = header["chunk_ids"]
+        index._chunk_nums = {cid: i for i, cid in enumerate(index._chunk_ids)}
+        index._owners = header["owners"]
+        index._doc_chunks = _group_by_owner(index._owners)
+        index._subject_codes = array("I", (index._subject_code(s) for s in header["subjects"]))
+        index._lengths = lengths
+        index._alive = bytearray(b"\x01") * count
+        index._postings = postings
+        index._live_count = count
+        index._total_length = sum(lengths)
+        index._last_save = time.monotonic()
+        return index
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            postings = sum(len(nums) for nums, _ in self._postings.values())
+            return {
+                "chunks": self._live_count,
+                "tombstoned": len(self._chunk_ids) - self._live_count,
+                "terms": len(self._postings),
+                "postings": postings,
+                "postings_bytes": postings * 6,
+                "dirty": self._dirty,
+                "read_only": self.read_only,
+            }
+
+
+def _group_by_owner(owners: list[str]) -> dict[str, list[int]]:
+    grouped: dict[str, list[int]] = {}
+    for num, owner in enumerate(owners):
+        grouped.setdefault(owner, []).append(num)
+    return grouped
+
+
+def _as_numpy(values: array | bytearray, dtype: type) -> np.ndarray:
+    # Copied: a view would keep the buffer exported and block later appends
+    return np.frombuffer(values, dtype=dtype).copy()
+
+
+def _gather(values: array | bytearray, dtype: type, positions: np.ndarray) -> np.ndarray:
+    return np.frombuffer(values, dtype=dtype)[positions]
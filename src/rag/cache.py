@@ -0,0 +1,208 @@
+"""Two-tier (in-process LRU + Redis) caches for the retrieval path."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache:
+    """Bounded in-process LRU with optional per-entry TTL."""
+
+    def __init__(self, max_entries: int = 1024, ttl: float | None = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: str) -> Any | None:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at and expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        expires_at = time.monotonic() + self.ttl if self.ttl else 0.0
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase and collapse whitespace so trivially different queries share a key."""
+    return " ".join(query.lower().split())
+
+
+def hash_key(*parts: Any) -> str:
+    """Build a stable cache key from JSON-serializable parts."""
+    raw = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+class TwoTierCache:
+    """In-process LRU in front of a shared Redis tier.
+
+    Redis failures are swallowed: the cache then behaves as a local LRU.
+    Values must be JSON-serializable.
+    """
+
+    def __init__(
+        self,
+        redis_url: str | None = None,
+        max_entries: int = 1024,
+        ttl: int = 300,
+        namespace: str = "cache",
+    ):
+        self.redis_url = redis_url
+        self.ttl = ttl
+        self.namespace = namespace
+        self._local = LRUCache(max_entries=max_entries, ttl=ttl)
+        self._redis = None
+        self.hits_local = 0
+        self.hits_redis = 0
+        self.misses = 0
+
+    async def _get_redis(self):
+        if self._redis is None and self.redis_url:
+            import redis.asyncio as aioredis
+
+            self._redis = aioredis.from_url(self.redis_url, decode_responses=True)
+        return self._redis
+
+    async def get(self, key: str) -> Any | None:
+        full_key = f"{self.namespace}:{key}"
+        value = self._local.get(full_key)
+        if value is not None:
+            self.hits_local += 1
+            return value
+
+        redis = await self._get_redis()
+        if redis is not None:
+            try:
+                raw = await redis.get(full_key)
+            except Exception:
+                logger.debug("Redis unavailable for %s cache read", self.namespace, exc_info=True)
+                raw = None
+            if raw:
+                value = json.loads(raw)
+                self._local.set(full_key, value)
+                self.hits_redis += 1
+                return value
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: Any) -> None:
+        full_key = f"{self.namespace}:{key}"
+        self._local.set(full_key, value)
+        redis = await self._get_redis()
+        if redis is not None:
+            try:
+                await redis.setex(full_key, self.ttl, json.dumps(value, default=str))
+            except Exception:
+                logger.debug("Redis unavailable for %s cache write", self.namespace, exc_info=True)
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits_local + self.hits_redis + self.misses
+        return {
+            "hits_local": self.hits_local,
+            "hits_redis": self.hits_redis,
+            "misses": self.misses,
+            "hit_rate": round((self.hits_local + self.hits_redis) / lookups, 4) if lookups else 0.0,
+            "local_entries": len(self._local),
+        }
+
+    async def close(self) -> None:
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+
+
+class RetrievalCache(TwoTierCache):
+    """Cache ``KnowledgeRetriever.retrieve`` results in an LRU backed by Redis.
+
+    Entries are scoped to a per-collection generation counter. Ingest and
+    delete bump the counter, which makes every earlier entry unreachable
+    without having to enumerate or delete keys. The generation is read from
+    Redis at most once per ``generation_ttl`` seconds so other workers pick up
+    bumps quickly without adding a round trip to every lookup.
+    """
+
+    def __init__(
+        self,
+        redis_url: str | None = None,
+        max_entries: int = 1024,
+        ttl: int = 300,
+        generation_ttl: float = 1.0,
+        namespace: str = "rag:retrieve",
+    ):
+        super().__init__(redis_url=redis_url, max_entries=max_entries, ttl=ttl, namespace=namespace)
+        self.generation_ttl = generation_ttl
+        self._generations: dict[str, tuple[float, int]] = {}
+        self.invalidations = 0
+
+    def _generation_key(self, collection: str) -> str:
+        return f"{self.namespace}:gen:{collection}"
+
+    async def generation(self, collection: str) -> int:
+        """Return the current generation for a collection."""
+        cached = self._generations.get(collection)
+        now = time.monotonic()
+        if cached and cached[0] > now:
+            return cached[1]
+        generation = cached[1] if cached else 0
+        redis = await self._get_redis()
+        if redis is not None:
+            try:
+                value = await redis.get(self._generation_key(collection))
+                generation = int(value) if value else 0
+            except Exception:
+                logger.debug("Redis unavailable for retrieval cache generation", exc_info=True)
+        self._generations[collection] = (now + self.generation_ttl, generation)
+        return generation
+
+    async def bump(self, collection: str) -> int:
+        """Invalidate all cached results for a collection."""
+        self.invalidations += 1
+        cached = self._generations.get(collection)
+        generation = (cached[1] if cached else 0) + 1
+        redis = await self._get_redis()
+        if redis is not None:
+            try:
+                generation = int(await redis.incr(self._generation_key(collection)))
+            except Exception:
+                logger.debug("Redis unavailable for retrieval cache bump", exc_info=True)
+        self._generations[collection] = (time.monotonic() + self.generation_ttl, generation)
+        return generation
+
+    def make_key(self, query: str, **params: Any) -> str:
+        return hash_key(normalize_query(query), params)
+
+    async def lookup(self, collection: str, key: str) -> dict[str, Any] | None:
+        """Return the cached result for ``key`` in the collection's current generation."""
+        generation = await self.generation(collection)
+        return await self.get(f"{collection}:{generation}:{key}")
+
+    async def store(self, collection: str, key: str, value: dict[str, Any]) -> None:
+        generation = await self.generation(collection)
+        await self.set(f"{collection}:{generation}:{key}", value)
+
+    def stats(self) -> dict[str, Any]:
+        return {**super().stats(), "invalidations": self.invalidations}
@@ -0,0 +1,57 @@
+"""Vector-store client construction for the HTTP, embedded and quantized modes."""
+
+from __future__ import annotations
+
+import os
+from typing import Any
+
+import chromadb
+
+from src.rag.quantized import QuantizedClient
+
+CHROMA_MODES = ("http", "persistent", "quantized")
+
+# One quantized client per directory, like Chroma's shared persistent system
+_quantized_clients: dict[str, QuantizedClient] = {}
+
+
+def create_chroma_client(
+    mode: str = "http",
+    host: str = "localhost",
+    port: int = 8100,
+    persist_path: str | None = None,
+    quantization: str = "int8",
+    rescore_factor: int = 4,
+) -> Any:
+    """Return a Chroma client for ``mode``.
+
+    - ``http``: ``HttpClient`` talking to a separate Chroma server
+    - ``persistent``: in-process ``PersistentClient`` storing data under
+      ``persist_path``; no network hop, for single-node deployments
+    - ``quantized``: in-process ``QuantizedClient`` under
+      ``{persist_path}/quantized`` keeping ``quantization`` (int8/float16)
+      vectors in RAM and re-scoring ``rescore_factor * k`` candidates with
+      the float32 vectors on disk
+
+    Chroma shares one persistent system per path (and quantized clients are
+    shared the same way), so the retriever and the memory manager can both
+    open the same directory in one process.
+    """
+    if mode == "http":
+        return chromadb.HttpClient(host=host, port=port)
+    if mode == "persistent":
+        if not persist_path:
+            raise ValueError("persist_path is required for the persistent Chroma mode")
+        os.makedirs(persist_path, exist_ok=True)
+        return chromadb.PersistentClient(path=persist_path)
+    if mode == "quantized":
+        if not persist_path:
+            raise ValueError("persist_path is required for the quantized Chroma mode")
+        path = os.path.abspath(os.path.join(persist_path, "quantized"))
+        client = _quantized_clients.get(path)
+        if client is None:
+            client = _quantized_clients[path] = QuantizedClient(
+                path, quantization=quantization, rescore_factor=rescore_factor
+            )
+        return client
+    raise ValueError(f"Unknown Chroma mode {mode!r}; expected one of {CHROMA_MODES}")
@@ -0,0 +1,182 @@
+"""Persistent content-addressed store of chunk embeddings."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from typing import Any
+
+import numpy as np
+
+from src.rag.locks import FileLock
+
+logger = logging.getLogger(__name__)
+
+_DIGEST_SIZE = 16
+
+
+def content_key(model_id: str, text: str) -> bytes:
+    """16-byte digest of (model id, chunk text)."""
+    return hashlib.blake2b(
+        model_id.encode("utf-8") + b"\0" + text.encode("utf-8"), digest_size=_DIGEST_SIZE
+    ).digest()
+
+
+class EmbeddingStore:
+    """Append-only float32 vector file plus a hash index, one directory per model.
+
+    Layout under ``{root}/{model}/``:
+    - ``vectors.f32``: rows of ``dim`` float32 values, read through ``np.memmap``
+    - ``keys.bin``: one 16-byte ``content_key`` per row, in row order
+    - ``meta.json``: model id and vector dimension
+
+    The key -> row index is rebuilt from ``keys.bin`` on open. Vectors are
+    written before their keys, so a crash mid-append leaves at most an
+    unindexed tail, which is truncated on the next open. Appends hold
+    ``append.lock``, so several processes can share a store: each first
+    indexes the rows others appended since it last looked. Methods are
+    thread-safe; callers run them on the embedding pool.
+    """
+
+    def __init__(self, root: str, model_id: str):
+        self.model_id = model_id
+        slug = re.sub(r"[^A-Za-z0-9._-]+", "_", model_id) or "default"
+        self.path = os.path.join(root, slug)
+        self._vectors_path = os.path.join(self.path, "vectors.f32")
+        self._keys_path = os.path.join(self.path, "keys.bin")
+        self._meta_path = os.path.join(self.path, "meta.json")
+        self._file_lock = FileLock(os.path.join(self.path, "append.lock"))
+        self._lock = threading.Lock()
+        self._index: dict[bytes, int] = {}
+        self._row_count = 0  # rows in the files; more than entries if processes raced on a text
+        self._dim: int | None = None
+        self._map: np.memmap | None = None
+        self.hits = 0
+        self.misses = 0
+        with self._file_lock:  # don't truncate another process's append in flight
+            self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self._meta_path):
+            return
+        try:
+            with open(self._meta_path) as f:
+                dim = int(json.load(f)["dim"])
+            raw = b""
+            if os.path.exists(self._keys_path):
+                with open(self._keys_path, "rb") as f:
+                    raw = f.read()
+            vector_bytes = (
+                os.path.getsize(self._vectors_path) if os.path.exists(self._vectors_path) else 0
+            )
+
+            # Keep only rows that have both a key and a complete vector
+            rows = min(len(raw) // _DIGEST_SIZE, vector_bytes // (4 * dim))
+            if rows * _DIGEST_SIZE != len(raw):
+                os.truncate(self._keys_path, rows * _DIGEST_SIZE)
+            if rows * dim * 4 != vector_bytes:
+                os.truncate(self._vectors_path, rows * dim * 4)
+        except (OSError, ValueError, KeyError):
+            logger.warning(
+                "Could not open embedding store at %s; starting empty", self.path, exc_info=True
+            )
+            return
+        self._dim = dim
+        self._index = {}
+        self._row_count = 0
+        self._add_rows(raw[: rows * _DIGEST_SIZE])
+
+    def _add_rows(self, raw: bytes) -> None:
+        for r in range(len(raw) // _DIGEST_SIZE):
+            self._index.setdefault(raw[r * _DIGEST_SIZE:(r + 1) * _DIGEST_SIZE], self._row_count + r)
+        self._row_count += len(raw) // _DIGEST_SIZE
+
+    def _rows(self) -> np.memmap:
+        """Memory map covering every indexed row (remapped after appends)."""
+        if self._map is None or len(self._map) < self._row_count:
+            self._map = np.memmap(
+                self._vectors_path, dtype=np.float32, mode="r", shape=(self._row_count, self._dim)
+            )
+        return self._map
+
+    def get_many(self, texts: list[str]) -> list[np.ndarray | None]:
+        """Return the stored vector for each text, or None when absent."""
+        with self._lock:
+            rows = [self._index.get(content_key(self.model_id, t)) for t in texts]
+            found = sum(r is not None for r in rows)
+            self.hits += found
+            self.misses += len(rows) - found
+            if not found:
+                return [None] * len(texts)
+            data = self._rows()
+            return [np.array(data[r]) if r is not None else None for r in rows]
+
+    def put_many(self, texts: list[str], vectors: Any) -> int:
+        """Append vectors for texts not stored yet. Returns the number written."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or len(vectors) != len(texts):
+            raise ValueError("vectors must be a (len(texts), dim) array")
+        with self._lock, self._file_lock:
+            if self._dim is None:
+                self._load()  # another process may have created the store
+            if self._dim is None:
+                with open(self._meta_path, "w") as f:
+                    json.dump({"model": self.model_id, "dim": int(vectors.shape[1])}, f)
+                self._dim = vectors.shape[1]
+            elif vectors.shape[1] != self._dim:
+                raise ValueError(f"expected {self._dim}-dim vectors, got {vectors.shape[1]}")
+            self._catch_up()
+
+            new_keys: dict[bytes, int] = {}
+            for i, text in enumerate(texts):
+                key = content_key(self.model_id, text)
+                if key not in self._index and key not in new_keys:
+                    new_keys[key] = i
+            if not new_keys:
+                return 0
+
+            new_rows = list(new_keys.values())
+            with open(self._vectors_path, "ab") as f:
+                f.write(np.ascontiguousarray(vectors[new_rows]).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            with open(self._keys_path, "ab") as f:
+                f.write(b"".join(new_keys))
+            for offset, key in enumerate(new_keys):
+                self._index[key] = self._row_count + offset
+            self._row_count += len(new_keys)
+            return len(new_keys)
+
+    def _catch_up(self) -> None:
+        """Index rows other processes appended; drop a crashed writer's key-less tail."""
+        known = self._row_count * _DIGEST_SIZE
+        if os.path.exists(self._keys_path) and os.path.getsize(self._keys_path) > known:
+            with open(self._keys_path, "rb") as f:
+                f.seek(known)
+                raw = f.read()
+            whole = len(raw) // _DIGEST_SIZE * _DIGEST_SIZE
+            if whole != len(raw):
+                os.truncate(self._keys_path, known + whole)
+            self._add_rows(raw[:whole])
+        vector_bytes = self._row_count * 4 * self._dim
+        if os.path.exists(self._vectors_path) and os.path.getsize(self._vectors_path) > vector_bytes:
+            os.truncate(self._vectors_path, vector_bytes)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "model": self.model_id,
+            "entries": len(self._index),
+            "dim": self._dim,
+            "bytes": self._row_count * (self._dim or 0) * 4,
+            "hits": self.hits,
+            "misses": self.misses,
+            "reuse_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
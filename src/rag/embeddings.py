@@ -0,0 +1,268 @@
+"""Micro-batched query embedding off the event loop."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, TypeVar
+
+import numpy as np
+
+from src.rag.cache import hash_key, normalize_query
+
+logger = logging.getLogger(__name__)
+
+EmbeddingFunction = Callable[[list[str]], Any]
+T = TypeVar("T")
+
+
+def default_embedding_function() -> EmbeddingFunction:
+    """ChromaDB's default embedder (the model collections use without an explicit one)."""
+    from chromadb.utils import embedding_functions
+
+    return embedding_functions.DefaultEmbeddingFunction()
+
+
+class EmbeddingCache:
+    """Bounded LRU of float32 embeddings stored in one preallocated slab.
+
+    Vectors live in rows of a ``(capacity, dim)`` float32 array sized from
+    ``max_bytes`` on the first insert; the key map only holds row numbers.
+    When full, the least recently used row is overwritten.
+    """
+
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._slab: np.ndarray | None = None
+        self._rows: OrderedDict[str, int] = OrderedDict()
+        self._next_row = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(model_id: str, text: str) -> str:
+        return hash_key(model_id, normalize_query(text))
+
+    def get(self, key: str) -> np.ndarray | None:
+        row = self._rows.get(key)
+        if row is None:
+            self.misses += 1
+            return None
+        self._rows.move_to_end(key)
+        self.hits += 1
+        return self._slab[row].copy()
+
+    def put(self, key: str, vector: Any) -> None:
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        if self._slab is None or self._slab.shape[1] != vector.shape[0]:
+            # First insert, or the model's dimension changed: (re)allocate
+            capacity = max(1, self.max_bytes // (vector.shape[0] * 4))
+            self._slab = np.empty((capacity, vector.shape[0]), dtype=np.float32)
+            self._rows.clear()
+            self._next_row = 0
+
+        row = self._rows.get(key)
+        if row is not None:
+            self._rows.move_to_end(key)
+        elif self._next_row < len(self._slab):
+            row = self._next_row
+            self._next_row += 1
+            self._rows[key] = row
+        else:
+            _, row = self._rows.popitem(last=False)
+            self.evictions += 1
+            self._rows[key] = row
+        self._slab[row] = vector
+
+    def clear(self) -> None:
+        self._rows.clear()
+        self._next_row = 0
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._rows),
+            "capacity": len(self._slab) if self._slab is not None else 0,
+            "bytes": self._slab.nbytes if self._slab is not None else 0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+
+class EmbeddingService:
+    """Embed texts on a worker pool, coalescing concurrent requests into batches.
+
+    Each ``embed`` call enqueues its texts. A collector task takes the first
+    waiting text, keeps collecting for up to ``max_wait_ms`` or until
+    ``max_batch_size`` texts are queued, then runs one embedding call on the
+    pool. Concurrent chats therefore share model invocations instead of
+    serializing on the event loop.
+
+    With an ``EmbeddingCache``, texts already embedded by the same model are
+    answered from the cache and never queued. Bulk jobs (ingest batches) go
+    through ``run`` on the same pool, with their own ``bulk_timeout``.
+    """
+
+    def __init__(
+        self,
+        embedding_function: EmbeddingFunction | None = None,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        max_workers: int = 1,
+        cache: EmbeddingCache | None = None,
+        model_id: str | None = None,
+        bulk_timeout: float | None = None,
+    ):
+        self._embedding_function = embedding_function
+        self.bulk_timeout = bulk_timeout
+        self.cache = cache
+        self._model_id = model_id
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="embed")
+        self._queue: asyncio.Queue[tuple[str, asyncio.Future]] | None = None
+        self._collector: asyncio.Task | None = None
+        self._batches: set[asyncio.Task] = set()
+        self._in_flight = 0
+        self.batches = 0
+        self.embedded = 0
+        self.max_batch_seen = 0
+        self.errors = 0
+        self._embed_ms_total = 0.0
+
+    @property
+    def embedding_function(self) -> EmbeddingFunction:
+        if self._embedding_function is None:
+            self._embedding_function = default_embedding_function()
+        return self._embedding_function
+
+    @property
+    def model_id(self) -> str:
+        if self._model_id is None:
+            fn = self.embedding_function
+            name = getattr(fn, "name", None)
+            try:
+                self._model_id = str(name() if callable(name) else name or type(fn).__name__)
+            except Exception:  # noqa: BLE001 - best effort: name() is optional on custom functions
+                self._model_id = type(fn).__name__
+        return self._model_id
+
+    async def embed(self, texts: list[str]) -> np.ndarray:
+        """Return a ``(len(texts), dim)`` float32 array, one row per text."""
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        rows: list[np.ndarray | None] = [None] * len(texts)
+        keys: list[str | None] = [None] * len(texts)
+        if self.cache is not None:
+            for i, text in enumerate(texts):
+                keys[i] = self.cache.make_key(self.model_id, text)
+                rows[i] = self.cache.get(keys[i])
+
+        missing = [i for i, row in enumerate(rows) if row is None]
+        if missing:
+            self._ensure_collector()
+            loop = asyncio.get_running_loop()
+            futures = []
+            for i in missing:
+                future = loop.create_future()
+                self._queue.put_nowait((texts[i], future))
+                futures.append(future)
+            for i, vector in zip(missing, await asyncio.gather(*futures)):
+                rows[i] = vector
+                if keys[i] is not None:
+                    self.cache.put(keys[i], vector)
+        return np.stack(rows)
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """Run blocking ``fn(*args)`` on the embedding pool within ``bulk_timeout``.
+
+        Raises ``TimeoutError`` past the deadline (the thread finishes its
+        call regardless).
+        """
+        future = asyncio.get_running_loop().run_in_executor(self._pool, fn, *args)
+        return await asyncio.wait_for(future, self.bulk_timeout)
+
+    def _ensure_collector(self) -> None:
+        if (
+            self._collector is None
+            or self._collector.done()
+            or self._collector.get_loop() is not asyncio.get_running_loop()
+        ):
+            self._queue = asyncio.Queue()
+            self._collector = asyncio.create_task(self._collect())
+
+    async def _collect(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait_ms / 1000
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except TimeoutError:
+                    break
+            # Run the batch without blocking collection of the next one
+            task = asyncio.create_task(self._run_batch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _run_batch(self, batch: list[tuple[str, asyncio.Future]]) -> None:
+        texts = [text for text, _ in batch]
+        self._in_flight += len(batch)
+        start = time.perf_counter()
+        try:
+            vectors = await asyncio.get_running_loop().run_in_executor(
+                self._pool, self.embedding_function, texts
+            )
+        except Exception as exc:
+            self.errors += 1
+            logger.warning("Embedding batch of %d failed", len(batch), exc_info=True)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        finally:
+            self._in_flight -= len(batch)
+        self._embed_ms_total += (time.perf_counter() - start) * 1000
+        self.batches += 1
+        self.embedded += len(batch)
+        self.max_batch_seen = max(self.max_batch_seen, len(batch))
+        for (_, future), vector in zip(batch, vectors):
+            if not future.done():
+                future.set_result(np.asarray(vector, dtype=np.float32))
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "in_flight": self._in_flight,
+            "batches": self.batches,
+            "embedded": self.embedded,
+            "avg_batch_size": round(self.embedded / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size": self.max_batch_seen,
+            "avg_batch_ms": round(self._embed_ms_total / self.batches, 2) if self.batches else 0.0,
+            "errors": self.errors,
+            "cache": self.cache.stats() if self.cache is not None else None,
+        }
+
+    async def close(self) -> None:
+        if self._collector is not None:
+            self._collector.cancel()
+            try:
+                await self._collector
+            except asyncio.CancelledError:
+                pass
+            self._collector = None
+        self._pool.shutdown(wait=False)
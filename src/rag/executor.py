@@ -0,0 +1,169 @@
+"""Bounded thread pool for blocking ChromaDB calls."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+
+class VectorStoreTimeout(TimeoutError):
+    """Raised when a vector store call does not finish within its deadline."""
+
+
+class ChromaExecutor:
+    """Run synchronous ChromaDB client calls off the event loop.
+
+    The chromadb ``HttpClient`` is blocking, so every call is dispatched to a
+    small dedicated thread pool. At most ``max_pending`` calls may be queued or
+    running at once; callers beyond that wait for a slot. A call that times
+    out keeps its slot until its thread actually finishes, so abandoned work
+    cannot pile up behind the pool. Each call returns its result together
+    with a timing breakdown that separates time spent waiting for a worker
+    from time spent inside the client call.
+
+    Reads use ``timeout``; writes (``run_write``) use ``write_timeout``,
+    None meaning no deadline, since an add/upsert embeds every chunk on the
+    client and a timed-out write may still commit.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 8,
+        max_pending: int = 64,
+        timeout: float = 10.0,
+        write_timeout: float | None = None,
+    ):
+        self.max_workers = max_workers
+        self.max_pending = max(max_pending, max_workers)
+        self.timeout = timeout
+        self.write_timeout = write_timeout
+        self._pool: ThreadPoolExecutor | None = None
+        self._slots: asyncio.Semaphore | None = None
+        self._calls = 0
+        self._timeouts = 0
+        self._errors = 0
+        self._abandoned = 0
+        self._in_flight = 0
+        self._queue_wait_total = 0.0
+        self._run_total = 0.0
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="chroma"
+            )
+        return self._pool
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+        return self._slots
+
+    async def run(
+        self,
+        fn: Callable[..., Any],
+        *args: Any,
+        timeout: float | None = None,
+        **kwargs: Any,
+    ) -> tuple[Any, dict[str, float]]:
+        """Run ``fn(*args, **kwargs)`` in the pool.
+
+        Returns:
+            (result, timing) where timing has ``queue_wait_ms`` and ``query_ms``.
+
+        Raises:
+            VectorStoreTimeout: If the call exceeds ``timeout`` (or the default).
+        """
+        return await self._run(fn, args, kwargs, self.timeout if timeout is None else timeout)
+
+    async def run_write(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> tuple[Any, dict[str, float]]:
+        """Like ``run`` for writes and ingest work, under ``write_timeout``."""
+        return await self._run(fn, args, kwargs, self.write_timeout)
+
+    async def _run(
+        self, fn: Callable[..., Any], args: tuple, kwargs: dict, deadline: float | None
+    ) -> tuple[Any, dict[str, float]]:
+        submitted = time.perf_counter()
+        started: list[float] = []
+
+        def _invoke():
+            started.append(time.perf_counter())
+            return fn(*args, **kwargs)
+
+        loop = asyncio.get_running_loop()
+        slots = self._get_slots()
+        await slots.acquire()
+        self._in_flight += 1
+        abandoned: list[bool] = []
+
+        def _release() -> None:
+            self._in_flight -= 1
+            if abandoned:
+                self._abandoned -= 1
+            slots.release()
+
+        try:
+            work = self._get_pool().submit(_invoke)
+        except BaseException:
+            _release()
+            raise
+
+        def _finished(_work) -> None:
+            # The slot is freed when the thread is done, not when the caller gives up
+            try:
+                loop.call_soon_threadsafe(_release)
+            except RuntimeError:  # loop already closed
+                pass
+
+        work.add_done_callback(_finished)
+        try:
+            result = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(work)), timeout=deadline)
+        except TimeoutError:
+            self._timeouts += 1
+            if not work.cancel():  # already running: it keeps its slot until it returns
+                self._abandoned += 1
+                abandoned.append(True)
+            raise VectorStoreTimeout(
+                f"Vector store call {getattr(fn, '__name__', fn)!r} "
+                f"exceeded {deadline:.1f}s"
+            ) from None
+        except Exception:
+            self._errors += 1
+            raise
+        finally:
+            finished = time.perf_counter()
+
+        start = started[0] if started else finished
+        queue_wait = start - submitted
+        run_time = finished - start
+        self._calls += 1
+        self._queue_wait_total += queue_wait
+        self._run_total += run_time
+        return result, {
+            "queue_wait_ms": round(queue_wait * 1000, 2),
+            "query_ms": round(run_time * 1000, 2),
+        }
+
+    def stats(self) -> dict[str, Any]:
+        """Return cumulative call counts and average timings."""
+        calls = self._calls or 1
+        return {
+            "calls": self._calls,
+            "timeouts": self._timeouts,
+            "errors": self._errors,
+            "avg_queue_wait_ms": round(self._queue_wait_total / calls * 1000, 2),
+            "avg_query_ms": round(self._run_total / calls * 1000, 2),
+            "in_flight": self._in_flight,
+            "abandoned": self._abandoned,
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "write_timeout": self.write_timeout,
+        }
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
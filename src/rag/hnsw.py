@@ -0,0 +1,101 @@
+"""Per-collection HNSW index parameters for Chroma collections."""
+
+from __future__ import annotations
+
+import logging
+from typing import Any
+
+from src.rag.sharding import SHARD_SEPARATOR
+
+logger = logging.getLogger(__name__)
+
+HNSW_PARAMS = ("M", "construction_ef", "search_ef")
+
+# Physical collections created by a rebuild are named
+# ``rebuild-{name}-{8 hex}`` and reached through an alias (src/rag/aliases.py);
+# they never start with a shard prefix, so shard listing ignores them.
+REBUILD_PREFIX = "rebuild-"
+
+
+class HNSWConfig:
+    """HNSW parameters with per-collection overrides.
+
+    ``overrides`` maps a collection name to parameters replacing the
+    defaults. A base collection name also covers its shards
+    (``educational_content`` applies to ``educational_content__math``);
+    an override for the exact shard name wins over the base one.
+
+    ``M`` and ``construction_ef`` are fixed when a collection is created,
+    so changing them needs a rebuild (``KnowledgeRetriever.rebuild``).
+    ``search_ef`` is written to existing collections when they are opened;
+    Chroma uses it once it next loads the index (e.g. after a restart),
+    while a rebuild applies it immediately.
+    """
+
+    def __init__(
+        self,
+        M: int = 16,
+        construction_ef: int = 100,
+        search_ef: int = 100,
+        overrides: dict[str, dict[str, int]] | None = None,
+    ):
+        self.defaults = {"M": M, "construction_ef": construction_ef, "search_ef": search_ef}
+        self.overrides = overrides or {}
+        for name, params in self.overrides.items():
+            unknown = set(params) - set(HNSW_PARAMS)
+            if unknown:
+                raise ValueError(f"Unknown HNSW parameters for {name}: {sorted(unknown)}")
+
+    def params_for(self, name: str) -> dict[str, int]:
+        """Effective parameters for collection ``name``."""
+        params = dict(self.defaults)
+        base = name.split(SHARD_SEPARATOR, 1)[0]
+        if base != name and base in self.overrides:
+            params.update(self.overrides[base])
+        params.update(self.overrides.get(name, {}))
+        return params
+
+    def metadata_for(self, name: str) -> dict[str, Any]:
+        """Collection metadata to create ``name`` with (cosine space plus HNSW params)."""
+        params = self.params_for(name)
+        return {"hnsw:space": "cosine", **{f"hnsw:{key}": value for key, value in params.items()}}
+
+    @staticmethod
+    def current(collection: Any) -> dict[str, int] | None:
+        """Parameters an existing collection was built with, if Chroma reports them."""
+        config = getattr(collection, "configuration_json", None)
+        hnsw = config.get("hnsw") if isinstance(config, dict) else None
+        if not isinstance(hnsw, dict):
+            return None
+        return {
+            "M": hnsw.get("max_neighbors"),
+            "construction_ef": hnsw.get("ef_construction"),
+            "search_ef": hnsw.get("ef_search"),
+        }
+
+    def apply_search_ef(self, collection: Any, name: str | None = None) -> bool:
+        """Store a changed ``search_ef`` on an existing collection (no rebuild needed).
+
+        ``name`` is the logical collection name when ``collection`` is
+        reached through an alias.
+        """
+        current = self.current(collection)
+        if current is None:
+            return False
+        wanted = self.params_for(name or collection.name)["search_ef"]
+        if current["search_ef"] == wanted:
+            return False
+        try:
+            collection.modify(configuration={"hnsw": {"ef_search": wanted}})
+        except Exception:
+            logger.warning("Could not set search_ef on %s", collection.name, exc_info=True)
+            return False
+        return True
+
+    def needs_rebuild(self, collection: Any, name: str | None = None) -> bool:
+        """True when ``M`` or ``construction_ef`` differ from the configured values."""
+        current = self.current(collection)
+        if current is None:
+            return False
+        wanted = self.params_for(name or collection.name)
+        return any(current[key] != wanted[key] for key in ("M", "construction_ef"))
@@ -0,0 +1,40 @@
+"""Deterministic, content-derived IDs for documents and chunks.
+
+Python's ``hash()`` is salted per process and ``uuid4`` is random, so both
+give a new ID every time the same content is ingested. These helpers derive
+IDs from the text itself, which makes re-ingesting idempotent under upsert.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import uuid
+
+# Fixed namespace for uuid5 document IDs; never change it or every ID moves.
+CONTENT_NAMESPACE = uuid.UUID("6f1c3a52-8d0e-5b7a-9c44-2e51d0a7b3f9")
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 hex digest of text with line endings and outer whitespace normalized."""
+    normalized = text.replace("\r\n", "\n").strip()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def document_id_for(text: str) -> str:
+    """Stable document ID (a UUID string) for a document's full text."""
+    return str(uuid.uuid5(CONTENT_NAMESPACE, content_hash(text)))
+
+
+def chunk_id(document_id: str, index: int) -> str:
+    """Chunk ID in the ``{document_id}_chunk_{i}`` scheme used across ingest paths."""
+    return f"{document_id}_chunk_{index}"
+
+
+def chunk_ids(document_id: str, count: int) -> list[str]:
+    """IDs of a document's ``count`` chunks: its manifest is just (document_id, count)."""
+    return [chunk_id(document_id, i) for i in range(count)]
+
+
+def content_chunk_id(text: str, prefix: str = "chunk") -> str:
+    """Stable ID for a standalone chunk that has no parent document."""
+    return f"{prefix}_{content_hash(text)[:32]}"
@@ -0,0 +1,71 @@
+"""Advisory file locks shared by the worker processes of one host."""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from typing import Self
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class FileLock:
+    """Exclusive ``flock`` on ``path`` (not re-entrant).
+
+    Serializes a critical section across the uvicorn workers and scripts of
+    one host; several hosts sharing a Chroma server need their own
+    coordination. Threads of one process queue on a thread lock first, and
+    ``release`` may be called from another thread than ``acquire`` (so it
+    can be taken on an executor and released on the event loop). Where
+    ``fcntl`` is unavailable the lock only covers the current process.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._thread_lock = threading.Lock()
+        self._fd: int | None = None
+        if fcntl is None:
+            logger.warning("fcntl unavailable; %s only locks within this process", path)
+
+    def acquire(self, blocking: bool = True) -> bool:
+        """Take the lock; with ``blocking=False`` return False instead of waiting."""
+        if not self._thread_lock.acquire(blocking):
+            return False
+        if fcntl is None:
+            return True
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(self._fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(self._fd)
+            self._fd = None
+            self._thread_lock.release()
+            return False
+        except BaseException:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+            self._thread_lock.release()
+            raise
+        return True
+
+    def release(self) -> None:
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        self._thread_lock.release()
+
+    def __enter__(self) -> Self:
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
@@ -0,0 +1,100 @@
+"""Maximal-marginal-relevance diversification for retrieval results."""
+
+from __future__ import annotations
+
+from typing import Any
+
+import numpy as np
+
+
+class MMRDiversifier:
+    """Pick a relevant but non-redundant top-k from an over-fetched candidate list.
+
+    Each step selects the candidate maximizing
+    ``lambda_mult * relevance - (1 - lambda_mult) * max_sim_to_selected``,
+    where similarity is cosine over the chunk embeddings. ``lambda_mult=1``
+    is plain relevance order; lower values favour diversity. At most
+    ``max_per_document`` chunks from one ``document_id`` are kept.
+    """
+
+    def __init__(
+        self,
+        lambda_mult: float = 0.7,
+        fetch_factor: int = 4,
+        max_per_document: int | None = 2,
+    ):
+        if not 0.0 <= lambda_mult <= 1.0:
+            raise ValueError("lambda_mult must be between 0 and 1")
+        self.lambda_mult = lambda_mult
+        self.fetch_factor = max(1, fetch_factor)
+        self.max_per_document = max_per_document or None
+
+    def fetch_k(self, k: int) -> int:
+        """Number of candidates to request from the vector store for a final ``k``."""
+        return k * self.fetch_factor
+
+    def select(
+        self,
+        relevance: np.ndarray,
+        embeddings: np.ndarray | None,
+        k: int,
+        groups: list[str] | None = None,
+    ) -> list[int]:
+        """Return indices of the chosen candidates, in selection order.
+
+        ``relevance`` is min-max normalized so ``lambda_mult`` means the same
+        for distance-based and fused scores. Without ``embeddings`` only the
+        per-document cap applies.
+        """
+        n = len(relevance)
+        if n == 0 or k <= 0:
+            return []
+        rel = np.asarray(relevance, dtype=np.float64)
+        span = rel.max() - rel.min()
+        rel = (rel - rel.min()) / span if span > 0 else np.ones(n)
+
+        if embeddings is not None and len(embeddings) == n:
+            vectors = np.asarray(embeddings, dtype=np.float32)
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.where(norms == 0, 1.0, norms)
+            sim = vectors @ vectors.T
+        else:
+            sim = np.zeros((n, n), dtype=np.float32)
+
+        available = np.ones(n, dtype=bool)
+        max_sim = np.zeros(n)
+        per_group: dict[str, int] = {}
+        selected: list[int] = []
+        while len(selected) < k and available.any():
+            scores = self.lambda_mult * rel - (1.0 - self.lambda_mult) * max_sim
+            scores[~available] = -np.inf
+            j = int(np.argmax(scores))
+            selected.append(j)
+            available[j] = False
+            max_sim = np.maximum(max_sim, sim[j])
+
+            if groups is not None and self.max_per_document and groups[j]:
+                per_group[groups[j]] = per_group.get(groups[j], 0) + 1
+                if per_group[groups[j]] >= self.max_per_document:
+                    available &= np.array([g != groups[j] for g in groups])
+        return selected
+
+    def diversify(
+        self,
+        sources: list[dict[str, Any]],
+        embeddings: dict[str, Any],
+        k: int,
+    ) -> list[dict[str, Any]]:
+        """Apply MMR to ranked retrieval sources (``rrf_score`` or ``_rank_score``)."""
+        if not sources:
+            return sources
+        relevance = np.fromiter(
+            (src.get("rrf_score", src.get("_rank_score", 0.0)) for src in sources),
+            dtype=np.float64,
+            count=len(sources),
+        )
+        vectors = None
+        if all(src["id"] in embeddings for src in sources):
+            vectors = np.stack([np.asarray(embeddings[src["id"]]) for src in sources])
+        groups = [str((src.get("metadata") or {}).get("document_id", "")) for src in sources]
+        return [sources[i] for i in self.select(relevance, vectors, k, groups)]
@@ -0,0 +1,166 @@
+"""Token-budgeted packing of retrieved chunks into prompt context."""
+
+from __future__ import annotations
+
+import math
+from typing import Any
+
+CHARS_PER_TOKEN = 4  # rough estimate for English text; no tokenizer dependency
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate the token count of ``text``."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+
+def overlap_length(left: str, right: str, min_overlap: int = 20, max_overlap: int = 1000) -> int:
+    """Length of the longest suffix of ``left`` that is a prefix of ``right``.
+
+    Overlaps shorter than ``min_overlap`` are ignored so that common short
+    endings ("the", ". ") are not mistaken for chunk overlap.
+    """
+    limit = min(len(left), len(right), max_overlap)
+    for size in range(limit, min_overlap - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+class _Block:
+    """A run of consecutive chunks from one document, rendered without overlap."""
+
+    def __init__(self, document_id: str, index: int, text: str):
+        self.document_id = document_id
+        self.pieces: list[tuple[int, str]] = [(index, text)]
+
+    @property
+    def start(self) -> int:
+        return self.pieces[0][0]
+
+    @property
+    def end(self) -> int:
+        return self.pieces[-1][0]
+
+    def render(self, min_overlap: int, max_overlap: int) -> str:
+        return _join_pieces(self.pieces, min_overlap, max_overlap)
+
+
+def _join_pieces(pieces: list[tuple[int, str]], min_overlap: int, max_overlap: int) -> str:
+    text = pieces[0][1]
+    for _, piece in pieces[1:]:
+        cut = overlap_length(text, piece, min_overlap, max_overlap)
+        text = text + piece[cut:] if cut else text + "\n" + piece
+    return text
+
+
+class ContextPacker:
+    """Pack ranked chunks into one context string under a token budget.
+
+    Chunks are taken in rank order. A chunk next to one already packed from
+    the same document (by ``document_id``/``chunk_index`` metadata) is merged
+    into that block with the shared overlap removed; exact duplicate texts
+    are dropped. A chunk that no longer fits the budget is skipped and later,
+    smaller ones may still fill the gap. The top chunk is truncated rather
+    than dropped, so the context is never empty.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 2000,
+        separator: str = "\n\n---\n\n",
+        min_overlap: int = 20,
+        max_overlap: int = 1000,
+    ):
+        self.max_tokens = max_tokens
+        self.separator = separator
+        self.min_overlap = min_overlap
+        self.max_overlap = max_overlap
+
+    def pack(self, sources: list[dict[str, Any]]) -> tuple[str, list[dict[str, Any]], dict[str, int]]:
+        """Return (context, packed sources in rank order, packing stats).
+
+        Each source needs ``content`` (or ``content_preview``) and may carry
+        ``metadata.document_id`` and ``metadata.chunk_index``.
+        """
+        texts = [src.get("content") or src.get("content_preview", "") or "" for src in sources]
+        raw_tokens = estimate_tokens(self.separator.join(texts))
+
+        blocks: list[_Block] = []
+        packed: list[dict[str, Any]] = []
+        seen: set[str] = set()
+        duplicates = merged = skipped = 0
+        used = 0
+
+        for src, text in zip(sources, texts):
+            if not text or text in seen:
+                duplicates += bool(text)
+                continue
+            seen.add(text)
+
+            meta = src.get("metadata") or {}
+            doc_id = str(meta.get("document_id", ""))
+            index = meta.get("chunk_index")
+            target = self._adjacent_block(blocks, doc_id, index)
+
+            if target is not None:
+                pieces = sorted(target.pieces + [(index, text)])
+                cost = estimate_tokens(
+                    _join_pieces(pieces, self.min_overlap, self.max_overlap)
+                ) - estimate_tokens(target.render(self.min_overlap, self.max_overlap))
+            else:
+                cost = estimate_tokens(text) + (estimate_tokens(self.separator) if blocks else 0)
+
+            if used + cost > self.max_tokens:
+                if blocks:
+                    skipped += 1
+                    continue
+                text = text[: self.max_tokens * CHARS_PER_TOKEN]
+
+            packed.append(src)
+            if target is not None:
+                target.pieces = pieces
+                merged += 1
+                self._join_neighbours(blocks, target)
+            else:
+                blocks.append(_Block(doc_id, index if isinstance(index, int) else -1, text))
+            used = estimate_tokens(self._render(blocks))
+
+        context = self._render(blocks)
+        packed_tokens = estimate_tokens(context)
+        stats = {
+            "budget_tokens": self.max_tokens,
+            "raw_tokens": raw_tokens,
+            "packed_tokens": packed_tokens,
+            "tokens_saved": max(raw_tokens - packed_tokens, 0),
+            "chunks_in": len(sources),
+            "chunks_packed": len(packed),
+            "merged": merged,
+            "duplicates": duplicates,
+            "skipped": skipped,
+        }
+        return context, packed, stats
+
+    def _render(self, blocks: list[_Block]) -> str:
+        return self.separator.join(b.render(self.min_overlap, self.max_overlap) for b in blocks)
+
+    @staticmethod
+    def _adjacent_block(blocks: list[_Block], doc_id: str, index: Any) -> _Block | None:
+        if not doc_id or not isinstance(index, int):
+            return None
+        for block in blocks:
+            if block.document_id == doc_id and block.start >= 0 and (
+                index == block.end + 1 or index == block.start - 1
+            ):
+                return block
+        return None
+
+    @staticmethod
+    def _join_neighbours(blocks: list[_Block], block: _Block) -> None:
+        """Fold another block of the same document into ``block`` if they now touch."""
+        for other in blocks:
+            if other is block or other.document_id != block.document_id or other.start < 0:
+                continue
+            if other.start == block.end + 1 or other.end == block.start - 1:
+                block.pieces = sorted(block.pieces + other.pieces)
+                blocks.remove(other)
+                return
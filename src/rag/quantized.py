@@ -0,0 +1,693 @@
+"""Embedded vector backend with quantized (int8/float16) vectors in RAM.
+
+Chroma keeps every vector as float32 in memory (4 bytes per dimension).
+This backend keeps only quantized codes resident and leaves the float32
+originals on disk, memory-mapped, for exact re-scoring of the top
+candidates:
+
+- ``int8``: one signed byte per dimension plus a float32 scale per vector
+  (~4x smaller than float32)
+- ``float16``: two bytes per dimension (2x smaller)
+
+``QuantizedClient`` / ``QuantizedCollection`` implement the subset of the
+Chroma client and collection API the retriever and memory manager use, so
+the backend is selected with ``CHROMA_MODE=quantized`` like the others.
+Search is exact over the codes (a blocked matrix product, no graph index),
+so query time grows linearly with the collection: it trades latency on
+large collections for ~4x less RAM, and HNSW parameters do not apply.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import shutil
+import sqlite3
+import threading
+from collections.abc import Callable
+from typing import Any
+
+import numpy as np
+
+QUANTIZATION_MODES = ("int8", "float16")
+
+_SCORE_BLOCK = 8192  # rows dequantized at a time while scoring
+_SQL_BATCH = 500  # bound parameters per IN (...) clause
+_COMPACT_MIN_ROWS = 1024  # smaller collections are never compacted automatically
+_OPERATORS = {"$eq": "=", "$ne": "!=", "$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length (zero rows are left as zeros)."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def quantize(vectors: np.ndarray, mode: str) -> tuple[np.ndarray, np.ndarray | None]:
+    """Quantize unit-length rows. Returns (codes, per-row scales or None)."""
+    if mode == "float16":
+        return vectors.astype(np.float16), None
+    if mode == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+        return codes, scales.astype(np.float32)
+    raise ValueError(f"Unknown quantization {mode!r}; expected one of {QUANTIZATION_MODES}")
+
+
+class QuantizedIndex:
+    """Cosine search over quantized vectors with float re-scoring.
+
+    Rows are addressed by position. Each query scores every live row
+    against the codes, keeps the best ``rescore_factor * k`` candidates and
+    ranks those by exact cosine similarity against the float vectors
+    returned by ``fetch``. ``rescore_factor=1`` skips the extra candidates
+    (ranking is still exact within them).
+    """
+
+    def __init__(self, mode: str = "int8", rescore_factor: int = 4):
+        if mode not in QUANTIZATION_MODES:
+            raise ValueError(f"Unknown quantization {mode!r}; expected one of {QUANTIZATION_MODES}")
+        self.mode = mode
+        self.rescore_factor = max(1, rescore_factor)
+        self.codes: np.ndarray | None = None
+        self.scales: np.ndarray | None = None
+        self.alive = np.zeros(0, dtype=bool)
+        self.size = 0  # high-water mark of used rows
+
+    def set_rows(self, rows: np.ndarray, vectors: np.ndarray) -> None:
+        """Store unit-length ``vectors`` at positions ``rows``, growing as needed."""
+        if not len(rows):
+            return
+        codes, scales = quantize(np.asarray(vectors, dtype=np.float32), self.mode)
+        needed = int(rows.max()) + 1
+        if self.codes is None:
+            self.codes = np.zeros((needed, codes.shape[1]), dtype=codes.dtype)
+            self.scales = np.ones(needed, dtype=np.float32) if scales is not None else None
+            self.alive = np.zeros(needed, dtype=bool)
+        elif needed > len(self.codes):
+            capacity = max(needed, 2 * len(self.codes))
+            self.codes = _grow(self.codes, capacity)
+            if self.scales is not None:
+                self.scales = _grow(self.scales, capacity, fill=1.0)
+            self.alive = _grow(self.alive, capacity)
+        self.codes[rows] = codes
+        if scales is not None:
+            self.scales[rows] = scales
+        self.alive[rows] = True
+        self.size = max(self.size, needed)
+
+    def remove_rows(self, rows: np.ndarray) -> None:
+        self.alive[rows[rows < len(self.alive)]] = False
+
+    def live_count(self) -> int:
+        return int(self.alive[: self.size].sum())
+
+    def nbytes(self) -> int:
+        """Resident bytes of the codes, scales and liveness mask."""
+        total = self.alive.nbytes
+        if self.codes is not None:
+            total += self.codes.nbytes
+        if self.scales is not None:
+            total += self.scales.nbytes
+        return total
+
+    def search(
+        self,
+        queries: np.ndarray,
+        k: int,
+        fetch: Callable[[np.ndarray], np.ndarray],
+        allowed: np.ndarray | None = None,
+    ) -> list[tuple[np.ndarray, np.ndarray]]:
+        """Return (rows, cosine similarities) per query, best first.
+
+        ``fetch(rows)`` returns the float vectors of ``rows`` (sorted
+        ascending); ``allowed`` optionally restricts the searchable rows.
+        """
+        empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32))
+        queries = normalize_rows(np.atleast_2d(np.asarray(queries, dtype=np.float32)))
+        if self.codes is None or not self.size or k <= 0:
+            return [empty for _ in queries]
+        mask = self.alive[: self.size].copy()
+        if allowed is not None:
+            mask &= allowed[: self.size]
+        live = int(mask.sum())
+        if not live:
+            return [empty for _ in queries]
+
+        scores = np.empty((len(queries), self.size), dtype=np.float32)
+        for start in range(0, self.size, _SCORE_BLOCK):
+            end = min(start + _SCORE_BLOCK, self.size)
+            block = self.codes[start:end].astype(np.float32) @ queries.T
+            if self.scales is not None:
+                block *= self.scales[start:end, None]
+            scores[:, start:end] = block.T
+        scores[:, ~mask] = -np.inf
+
+        n_candidates = min(k * self.rescore_factor, live)
+        results = []
+        for q, row_scores in zip(queries, scores):
+            candidates = np.argpartition(-row_scores, n_candidates - 1)[:n_candidates]
+            candidates = np.sort(candidates)
+            exact = normalize_rows(np.asarray(fetch(candidates), dtype=np.float32)) @ q
+            order = np.argsort(-exact, kind="stable")[:k]
+            results.append((candidates[order], exact[order]))
+        return results
+
+
+def _grow(array: np.ndarray, capacity: int, fill: Any = 0) -> np.ndarray:
+    grown = np.full((capacity, *array.shape[1:]), fill, dtype=array.dtype)
+    grown[: len(array)] = array
+    return grown
+
+
+def _where_sql(where: dict[str, Any] | None) -> tuple[str, list[Any]]:
+    """Translate a Chroma metadata filter into SQL over the JSON metadata column."""
+    if not where:
+        return "1", []
+    clauses: list[str] = []
+    params: list[Any] = []
+    for key, condition in where.items():
+        if key in ("$and", "$or"):
+            parts = [_where_sql(sub) for sub in condition]
+            joiner = " AND " if key == "$and" else " OR "
+            clauses.append("(" + joiner.join(sql for sql, _ in parts) + ")")
+            params.extend(p for _, sub_params in parts for p in sub_params)
+            continue
+        path = '$."' + key.replace('"', '""') + '"'
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for op, value in condition.items():
+            if op in ("$in", "$nin"):
+                placeholders = ", ".join("?" for _ in value) or "NULL"
+                negate = "NOT " if op == "$nin" else ""
+                clauses.append(f"json_extract(metadata, ?) {negate}IN ({placeholders})")
+                params.extend([path, *value])
+            elif op in _OPERATORS:
+                clauses.append(f"json_extract(metadata, ?) {_OPERATORS[op]} ?")
+                params.extend([path, value])
+            else:
+                raise ValueError(f"Unsupported filter operator {op!r}")
+    return "(" + " AND ".join(clauses) + ")", params
+
+
+class QuantizedCollection:
+    """One collection: SQLite for ids/documents/metadata, vectors.f32 on disk, codes in RAM.
+
+    Layout under ``{root}/{name}/``: ``chunks.sqlite`` (id -> row,
+    document, JSON metadata), ``vectors.f32`` (float32 rows, memory-mapped
+    for re-scoring and ``include=["embeddings"]``) and ``collection.json``
+    (dimension and collection metadata). Codes are rebuilt from
+    ``vectors.f32`` on open. Deleted rows are tombstoned; once they exceed
+    ``compact_ratio`` of the rows, ``delete`` rewrites the collection without
+    them (``compact``).
+    Upserts merge metadata like Chroma does; ``None`` values remove keys.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        name: str,
+        metadata: dict[str, Any] | None = None,
+        quantization: str = "int8",
+        rescore_factor: int = 4,
+        embedding_function: Callable[[list[str]], Any] | None = None,
+        on_rename: Callable[[str, QuantizedCollection], None] | None = None,
+        compact_ratio: float = 0.5,
+    ):
+        self.name = name
+        self.path = path
+        self._embedding_function = embedding_function
+        self._on_rename = on_rename
+        self.compact_ratio = compact_ratio
+        self._lock = threading.RLock()
+        self._index = QuantizedIndex(quantization, rescore_factor)
+        self._vectors_path = os.path.join(path, "vectors.f32")
+        self._config_path = os.path.join(path, "collection.json")
+        self._map: np.memmap | None = None
+        os.makedirs(path, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(path, "chunks.sqlite"), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            "id TEXT PRIMARY KEY, row INTEGER NOT NULL UNIQUE, document TEXT, metadata TEXT)"
+        )
+        self._db.execute("CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT)")
+        self._db.commit()
+        self.metadata = metadata or {}
+        self._dim: int | None = None
+        self._rows = 0
+        self._load()
+
+    # --- persistence ---
+
+    def _load(self) -> None:
+        if not os.path.exists(self._config_path):
+            self._save_config()
+            return
+        with open(self._config_path) as f:
+            config = json.load(f)
+        self.metadata = config.get("metadata") or self.metadata
+        self._dim = config.get("dim")
+        if self._db.execute("SELECT 1 FROM state WHERE key = 'compacting'").fetchone():
+            self._finish_compaction()
+        elif os.path.exists(self._compact_path):
+            os.remove(self._compact_path)  # compaction crashed before renumbering
+        if not self._dim or not os.path.exists(self._vectors_path):
+            return
+        # Rows past the last complete vector were never committed to SQLite
+        self._rows = os.path.getsize(self._vectors_path) // (4 * self._dim)
+        os.truncate(self._vectors_path, self._rows * 4 * self._dim)
+        live = self._live_rows()
+        self._index_rows(live[live < self._rows])
+
+    def _live_rows(self) -> np.ndarray:
+        return np.array(
+            [row for (row,) in self._db.execute("SELECT row FROM chunks ORDER BY row")],
+            dtype=np.int64,
+        )
+
+    def _index_rows(self, live: np.ndarray) -> None:
+        vectors = self._vectors()
+        for start in range(0, len(live), _SCORE_BLOCK):
+            rows = live[start:start + _SCORE_BLOCK]
+            self._index.set_rows(rows, normalize_rows(np.asarray(vectors[rows], dtype=np.float32)))
+
+    @property
+    def _compact_path(self) -> str:
+        return f"{self._vectors_path}.compact"
+
+    def _finish_compaction(self) -> None:
+        """Move the compacted vectors into place once SQLite holds the new row numbers."""
+        self._map = None
+        if os.path.exists(self._compact_path):
+            os.replace(self._compact_path, self._vectors_path)
+        self._db.execute("DELETE FROM state WHERE key = 'compacting'")
+        self._db.commit()
+
+    def _save_config(self) -> None:
+        # Replaced atomically: other processes re-read it (``reload_metadata``)
+        tmp_path = f"{self._config_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"name": self.name, "metadata": self.metadata, "dim": self._dim}, f)
+        os.replace(tmp_path, self._config_path)
+
+    def reload_metadata(self) -> None:
+        """Pick up metadata another process wrote (e.g. a collection alias flip)."""
+        with self._lock:
+            try:
+                with open(self._config_path) as f:
+                    self.metadata = json.load(f).get("metadata") or self.metadata
+            except FileNotFoundError:
+                pass
+
+    def _vectors(self) -> np.ndarray:
+        if self._map is None or len(self._map) < self._rows:
+            self._map = np.memmap(
+                self._vectors_path, dtype=np.float32, mode="r", shape=(self._rows, self._dim)
+            )
+        return self._map
+
+    def _write_vectors(self, rows: np.ndarray, vectors: np.ndarray) -> None:
+        with open(self._vectors_path, "r+b" if os.path.exists(self._vectors_path) else "wb") as f:
+            for row, vector in zip(rows, vectors):
+                f.seek(int(row) * 4 * self._dim)
+                f.write(vector.tobytes())
+        self._map = None
+
+    # --- helpers ---
+
+    def _embed(self, texts: list[str]) -> np.ndarray:
+        if self._embedding_function is None:
+            from src.rag.embeddings import default_embedding_function
+
+            self._embedding_function = default_embedding_function()
+        return np.asarray(self._embedding_function(texts), dtype=np.float32)
+
+    def _lookup(self, ids: list[str]) -> dict[str, tuple[int, str | None, dict[str, Any]]]:
+        found = {}
+        for start in range(0, len(ids), _SQL_BATCH):
+            batch = ids[start:start + _SQL_BATCH]
+            placeholders = ", ".join("?" for _ in batch)
+            for cid, row, doc, meta in self._db.execute(
+                f"SELECT id, row, document, metadata FROM chunks WHERE id IN ({placeholders})", batch
+            ):
+                found[cid] = (row, doc, json.loads(meta) if meta else {})
+        return found
+
+    def _by_rows(self, rows: list[int]) -> dict[int, tuple[str, str | None, dict[str, Any]]]:
+        found = {}
+        for start in range(0, len(rows), _SQL_BATCH):
+            batch = rows[start:start + _SQL_BATCH]
+            placeholders = ", ".join("?" for _ in batch)
+            for cid, row, doc, meta in self._db.execute(
+                f"SELECT id, row, document, metadata FROM chunks WHERE row IN ({placeholders})", batch
+            ):
+                found[row] = (cid, doc, json.loads(meta) if meta else {})
+        return found
+
+    def _rows_matching(self, where: dict[str, Any]) -> np.ndarray:
+        sql, params = _where_sql(where)
+        return np.array(
+            [row for (row,) in self._db.execute(f"SELECT row FROM chunks WHERE {sql}", params)],
+            dtype=np.int64,
+        )
+
+    @staticmethod
+    def _merge(old: dict[str, Any], new: dict[str, Any] | None) -> dict[str, Any]:
+        merged = {**old, **(new or {})}
+        return {key: value for key, value in merged.items() if value is not None}
+
+    # --- Chroma collection API ---
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def upsert(
+        self,
+        ids: list[str],
+        embeddings: Any = None,
+        metadatas: list[dict[str, Any] | None] | None = None,
+        documents: list[str] | None = None,
+        **_: Any,
+    ) -> None:
+        if embeddings is None:
+            embeddings = self._embed(documents or [])
+        vectors = np.ascontiguousarray(np.asarray(embeddings, dtype=np.float32))
+        if vectors.ndim != 2 or len(vectors) != len(ids):
+            raise ValueError("embeddings must be a (len(ids), dim) array")
+        # Later duplicates of an id win, as in Chroma
+        latest = {cid: i for i, cid in enumerate(ids)}
+        positions = list(latest.values())
+        with self._lock:
+            if self._dim is None:
+                self._dim = vectors.shape[1]
+                self._save_config()
+            elif vectors.shape[1] != self._dim:
+                raise ValueError(f"expected {self._dim}-dim embeddings, got {vectors.shape[1]}")
+
+            existing = self._lookup(list(latest))
+            rows = np.empty(len(positions), dtype=np.int64)
+            records = []
+            for j, i in enumerate(positions):
+                cid = ids[i]
+                if cid in existing:
+                    row, old_doc, old_meta = existing[cid]
+                else:
+                    row, old_doc, old_meta = self._rows, None, {}
+                    self._rows += 1
+                rows[j] = row
+                meta = self._merge(old_meta, metadatas[i] if metadatas else None)
+                doc = documents[i] if documents else old_doc
+                records.append((cid, int(row), doc, json.dumps(meta)))
+
+            # Vectors first: a crash leaves at most rows unknown to SQLite
+            self._write_vectors(rows, vectors[positions])
+            self._db.executemany(
+                "INSERT INTO chunks (id, row, document, metadata) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET document = excluded.document, "
+                "metadata = excluded.metadata",
+                records,
+            )
+            self._db.commit()
+            self._index.set_rows(rows, normalize_rows(vectors[positions]))
+
+    add = upsert
+
+    def update(
+        self,
+        ids: list[str],
+        embeddings: Any = None,
+        metadatas: list[dict[str, Any] | None] | None = None,
+        documents: list[str] | None = None,
+        **_: Any,
+    ) -> None:
+        with self._lock:
+            existing = self._lookup(list(ids))
+            known = [i for i, cid in enumerate(ids) if cid in existing]
+            if embeddings is not None and known:
+                vectors = np.asarray(embeddings, dtype=np.float32)[known]
+                rows = np.array([existing[ids[i]][0] for i in known], dtype=np.int64)
+                self._write_vectors(rows, vectors)
+                self._index.set_rows(rows, normalize_rows(vectors))
+            records = []
+            for i in known:
+                _, old_doc, old_meta = existing[ids[i]]
+                meta = self._merge(old_meta, metadatas[i] if metadatas else None)
+                doc = documents[i] if documents else old_doc
+                records.append((doc, json.dumps(meta), ids[i]))
+            self._db.executemany(
+                "UPDATE chunks SET document = ?, metadata = ? WHERE id = ?", records
+            )
+            self._db.commit()
+
+    def get(
+        self,
+        ids: list[str] | None = None,
+        where: dict[str, Any] | None = None,
+        limit: int | None = None,
+        offset: int | None = None,
+        include: list[str] | tuple[str, ...] = ("documents", "metadatas"),
+        **_: Any,
+    ) -> dict[str, Any]:
+        with self._lock:
+            sql, params = _where_sql(where)
+            if ids is not None:
+                found = self._lookup(list(ids))
+                matching = set(self._rows_matching(where).tolist()) if where else None
+                records = [
+                    (cid, *found[cid]) for cid in dict.fromkeys(ids)
+                    if cid in found and (matching is None or found[cid][0] in matching)
+                ]
+                records = records[offset or 0:][:limit] if limit is not None else records[offset or 0:]
+            else:
+                query = f"SELECT id, row, document, metadata FROM chunks WHERE {sql} ORDER BY row"
+                if limit is not None or offset:
+                    query += " LIMIT ? OFFSET ?"
+                    params = [*params, -1 if limit is None else limit, offset or 0]
+                records = [
+                    (cid, row, doc, json.loads(meta) if meta else {})
+                    for cid, row, doc, meta in self._db.execute(query, params)
+                ]
+            result: dict[str, Any] = {
+                "ids": [r[0] for r in records],
+                "documents": [r[2] for r in records] if "documents" in include else None,
+                "metadatas": [r[3] or None for r in records] if "metadatas" in include else None,
+                "embeddings": None,
+            }
+            if "embeddings" in include:
+                rows = np.array([r[1] for r in records], dtype=np.int64)
+                result["embeddings"] = (
+                    np.asarray(self._vectors()[rows]) if len(rows) else np.empty((0, self._dim or 0))
+                )
+            return result
+
+    def query(
+        self,
+        query_embeddings: Any = None,
+        query_texts: list[str] | None = None,
+        n_results: int = 10,
+        where: dict[str, Any] | None = None,
+        include: list[str] | tuple[str, ...] = ("documents", "metadatas", "distances"),
+        **_: Any,
+    ) -> dict[str, Any]:
+        if query_embeddings is None:
+            query_embeddings = self._embed(query_texts or [])
+        queries = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+        with self._lock:
+            allowed = None
+            if where:
+                allowed = np.zeros(self._index.size, dtype=bool)
+                allowed[self._rows_matching(where)] = True
+            vectors = self._vectors() if self._dim else None
+            hits = self._index.search(
+                queries, n_results, lambda rows: vectors[rows], allowed
+            )
+            records = self._by_rows(sorted({int(r) for rows, _ in hits for r in rows}))
+
+        result: dict[str, Any] = {"ids": [], "documents": None, "metadatas": None, "distances": None, "embeddings": None}
+        for field in ("documents", "metadatas", "distances", "embeddings"):
+            if field in include:
+                result[field] = []
+        for hit_rows, hit_sims in hits:
+            # Keep scores paired with their rows when a row has no record
+            found = [(int(r), float(s)) for r, s in zip(hit_rows, hit_sims) if int(r) in records]
+            rows = [r for r, _ in found]
+            result["ids"].append([records[r][0] for r in rows])
+            if result["documents"] is not None:
+                result["documents"].append([records[r][1] for r in rows])
+            if result["metadatas"] is not None:
+                result["metadatas"].append([records[r][2] or None for r in rows])
+            if result["distances"] is not None:
+                result["distances"].append([1.0 - s for _, s in found])
+            if result["embeddings"] is not None:
+                result["embeddings"].append(np.asarray(vectors[rows]) if rows else [])
+        return result
+
+    def delete(self, ids: list[str] | None = None, where: dict[str, Any] | None = None, **_: Any) -> None:
+        with self._lock:
+            if ids is not None:
+                rows = np.array([row for row, _, _ in self._lookup(list(ids)).values()], dtype=np.int64)
+                if where:
+                    rows = np.intersect1d(rows, self._rows_matching(where))
+            elif where:
+                rows = self._rows_matching(where)
+            else:
+                return
+            for start in range(0, len(rows), _SQL_BATCH):
+                batch = [int(r) for r in rows[start:start + _SQL_BATCH]]
+                placeholders = ", ".join("?" for _ in batch)
+                self._db.execute(f"DELETE FROM chunks WHERE row IN ({placeholders})", batch)
+            self._db.commit()
+            self._index.remove_rows(rows)
+            tombstones = self._rows - self._index.live_count()
+            if (
+                self.compact_ratio
+                and self._rows >= _COMPACT_MIN_ROWS
+                and tombstones > self.compact_ratio * self._rows
+            ):
+                self.compact()
+
+    def compact(self) -> int:
+        """Rewrite the collection without deleted rows. Returns the rows reclaimed.
+
+        Live vectors are copied to ``vectors.f32.compact``; the new row
+        numbers are committed to SQLite together with a ``compacting``
+        marker, so a crash before the file is moved into place is finished
+        on the next open.
+        """
+        with self._lock:
+            live = self._live_rows()
+            reclaimed = self._rows - len(live)
+            if not reclaimed or not self._dim:
+                return 0
+            vectors = self._vectors()
+            with open(self._compact_path, "wb") as f:
+                f.writelines(
+                    np.ascontiguousarray(vectors[live[start:start + _SCORE_BLOCK]]).tobytes()
+                    for start in range(0, len(live), _SCORE_BLOCK)
+                )
+            # Ascending order: a new number is never held by a row not yet renumbered
+            self._db.executemany(
+                "UPDATE chunks SET row = ? WHERE row = ?",
+                [(new, int(old)) for new, old in enumerate(live) if new != old],
+            )
+            self._db.execute("INSERT OR REPLACE INTO state (key, value) VALUES ('compacting', '1')")
+            self._db.commit()
+            self._finish_compaction()
+            self._rows = len(live)
+            self._index = QuantizedIndex(self._index.mode, self._index.rescore_factor)
+            self._index_rows(np.arange(self._rows, dtype=np.int64))
+            return reclaimed
+
+    def modify(self, name: str | None = None, metadata: dict[str, Any] | None = None, **_: Any) -> None:
+        """Rename the collection and/or replace its metadata."""
+        with self._lock:
+            if metadata is not None:
+                self.metadata = metadata
+            if name and name != self.name:
+                path = os.path.join(os.path.dirname(self.path), name)
+                if os.path.exists(path):
+                    raise ValueError(f"Collection {name} already exists")
+                self._db.close()
+                self._map = None
+                os.rename(self.path, path)
+                old_name, self.name, self.path = self.name, name, path
+                self._vectors_path = os.path.join(path, "vectors.f32")
+                self._config_path = os.path.join(path, "collection.json")
+                self._db = sqlite3.connect(os.path.join(path, "chunks.sqlite"), check_same_thread=False)
+                if self._on_rename is not None:
+                    self._on_rename(old_name, self)
+            self._save_config()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "quantization": self._index.mode,
+                "rescore_factor": self._index.rescore_factor,
+                "dim": self._dim,
+                "rows": self._rows,
+                "live": self._index.live_count(),
+                "tombstones": self._rows - self._index.live_count(),
+                "resident_bytes": self._index.nbytes(),
+                "float_bytes_on_disk": self._rows * (self._dim or 0) * 4,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._map = None
+            self._db.close()
+
+
+class QuantizedClient:
+    """Chroma-client stand-in serving ``QuantizedCollection`` directories under ``path``."""
+
+    def __init__(
+        self,
+        path: str,
+        quantization: str = "int8",
+        rescore_factor: int = 4,
+        embedding_function: Callable[[list[str]], Any] | None = None,
+    ):
+        if quantization not in QUANTIZATION_MODES:
+            raise ValueError(
+                f"Unknown quantization {quantization!r}; expected one of {QUANTIZATION_MODES}"
+            )
+        self.path = path
+        self.quantization = quantization
+        self.rescore_factor = rescore_factor
+        self._embedding_function = embedding_function
+        self._collections: dict[str, QuantizedCollection] = {}
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+    def _open(self, name: str, metadata: dict[str, Any] | None = None) -> QuantizedCollection:
+        if not re.fullmatch(r"[A-Za-z0-9][A-Za-z0-9._-]{1,510}[A-Za-z0-9]", name) or ".." in name:
+            raise ValueError(f"Invalid collection name {name!r}")
+        with self._lock:
+            collection = self._collections.get(name)
+            if collection is None:
+                collection = QuantizedCollection(
+                    os.path.join(self.path, name),
+                    name,
+                    metadata=metadata,
+                    quantization=self.quantization,
+                    rescore_factor=self.rescore_factor,
+                    embedding_function=self._embedding_function,
+                    on_rename=self._renamed,
+                )
+                self._collections[name] = collection
+            return collection
+
+    def _renamed(self, old_name: str, collection: QuantizedCollection) -> None:
+        with self._lock:
+            self._collections.pop(old_name, None)
+            self._collections[collection.name] = collection
+
+    def get_or_create_collection(
+        self, name: str, metadata: dict[str, Any] | None = None, **_: Any
+    ) -> QuantizedCollection:
+        return self._open(name, metadata)
+
+    def get_collection(self, name: str, **_: Any) -> QuantizedCollection:
+        if name not in self._collections and not os.path.isdir(os.path.join(self.path, name)):
+            raise ValueError(f"Collection {name} does not exist")
+        collection = self._open(name)
+        collection.reload_metadata()
+        return collection
+
+    def list_collections(self, **_: Any) -> list[QuantizedCollection]:
+        names = sorted(
+            entry for entry in os.listdir(self.path)
+            if os.path.exists(os.path.join(self.path, entry, "collection.json"))
+        )
+        return [self._open(name) for name in names]
+
+    def delete_collection(self, name: str) -> None:
+        with self._lock:
+            collection = self._collections.pop(name, None)
+        if collection is not None:
+            collection.close()
+        shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
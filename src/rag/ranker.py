@@ -1,14 +1,79 @@
-"""Result re-ranker combining semantic distance and keyword overlap."""
+"""Result re-ranker combining semantic distance, keyword overlap and metadata priors."""
+
+from __future__ import annotations
 
 import re
-from collections import Counter
+import time
+from collections.abc import Mapping
+from datetime import datetime
+from types import MappingProxyType
+from typing import Any, ClassVar
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r"\b[a-zA-Z]{2,}\b")
+
+# Prior trust in a chunk by where it came from (used by the authority feature).
+SOURCE_AUTHORITY: dict[str, float] = {
+    "arxiv": 0.9,
+    "pubmed": 0.9,
+    "wikipedia": 0.7,
+    "gutenberg": 0.6,
+    "github": 0.6,
+    "youtube": 0.5,
+    "crawl": 0.4,
+}
+DEFAULT_AUTHORITY = 0.8  # teacher uploads
 
 
 class ResultRanker:
-    """Re-rank retrieval results using hybrid semantic + keyword scoring."""
+    """Re-rank retrieval results with a vectorized hybrid score.
+
+    Features, each in [0, 1]:
+    - ``semantic``: ``1 - distance`` from the vector search
+    - ``keyword``: fraction of query terms found in the full chunk text
+    - ``recency``: exponential decay on ``published_at``/``created_at`` metadata
+    - ``authority``: ``authority`` metadata, else a prior by ``source_type``
+
+    The score is a weighted sum. Weights default to semantic/keyword only and
+    can be overridden per subject.
+    """
+
+    DEFAULT_WEIGHTS: ClassVar[Mapping[str, float]] = MappingProxyType({
+        "semantic": 0.7,
+        "keyword": 0.3,
+        "recency": 0.0,
+        "authority": 0.0,
+    })
+    FEATURES = ("semantic", "keyword", "recency", "authority")
+
+    def __init__(
+        self,
+        weights: dict[str, float] | None = None,
+        subject_weights: dict[str, dict[str, float]] | None = None,
+        recency_half_life_days: float = 365.0,
+    ):
+        self.weights = {**self.DEFAULT_WEIGHTS, **(weights or {})}
+        self.subject_weights = {
+            subject.lower(): {**self.weights, **w} for subject, w in (subject_weights or {}).items()
+        }
+        self.recency_half_life_days = recency_half_life_days
+
+    def weights_for(self, subject: str | None) -> dict[str, float]:
+        if subject:
+            return self.subject_weights.get(subject.lower(), self.weights)
+        return self.weights
+
+    def rank(
+        self, results: list[dict], query: str, subject: str | None = None
+    ) -> list[dict]:
+        """Score all results at once and return them best first.
 
-    def rank(self, results: list[dict], query: str) -> list[dict]:
-        """Re-rank results by combining semantic distance score with keyword overlap."""
+        Returns shallow copies with a ``_rank_score`` key added; the input
+        dicts (which may be shared with a cache) are not modified. The full
+        chunk text is read from ``content`` when present, else
+        ``content_preview``.
+        """
         if not results:
             return results
 
@@ -16,37 +81,90 @@ class ResultRanker:
         if not query_terms:
             return results
 
-        query_counter = Counter(query_terms)
+        weights = self.weights_for(subject)
+        scores = weights["semantic"] * self._semantic_scores(results)
+        scores += weights["keyword"] * self._keyword_scores(results, query_terms)
+        if weights.get("recency"):
+            scores += weights["recency"] * self._recency_scores(results)
+        if weights.get("authority"):
+            scores += weights["authority"] * self._authority_scores(results)
 
-        scored = []
-        for r in results:
-            # Semantic score: lower distance is better, convert to 0-1 similarity
-            distance = r.get("distance", 0.0)
-            semantic_score = max(0.0, 1.0 - distance)
+        order = np.argsort(-scores, kind="stable")
+        return [{**results[i], "_rank_score": float(scores[i])} for i in order]
 
-            # Keyword overlap score
-            content = r.get("content_preview", "") or ""
-            doc_terms = self._tokenize(content)
-            keyword_score = self._keyword_overlap(query_counter, doc_terms)
+    # --- Features ---
 
-            # Combined score: weighted average
-            combined = 0.7 * semantic_score + 0.3 * keyword_score
-            scored.append({**r, "_rank_score": combined})
+    @staticmethod
+    def _semantic_scores(results: list[dict]) -> np.ndarray:
+        distances = np.fromiter(
+            (r.get("distance", 0.0) or 0.0 for r in results), dtype=np.float64, count=len(results)
+        )
+        return np.clip(1.0 - distances, 0.0, None)
+
+    def _keyword_scores(self, results: list[dict], query_terms: list[str]) -> np.ndarray:
+        """Vectorized clipped term overlap: sum(min(doc_tf, query_tf)) / len(query)."""
+        vocab: dict[str, int] = {}
+        for term in query_terms:
+            vocab.setdefault(term, len(vocab))
+        query_tf = np.bincount([vocab[t] for t in query_terms], minlength=len(vocab))
+
+        # Match only query terms, in one pass over all texts joined by
+        # newlines (non-word characters, so word boundaries are unchanged);
+        # match offsets map back to their result
+        pattern = re.compile(
+            r"\b(?:" + "|".join(sorted(map(re.escape, vocab), key=len, reverse=True)) + r")\b"
+        )
+        texts = [(r.get("content") or r.get("content_preview", "") or "").lower() for r in results]
+        starts = np.cumsum([0] + [len(text) + 1 for text in texts[:-1]])
+        offsets: list[int] = []
+        cols: list[int] = []
+        for match in pattern.finditer("\n".join(texts)):
+            offsets.append(match.start())
+            cols.append(vocab[match.group()])
 
-        scored.sort(key=lambda x: x["_rank_score"], reverse=True)
-        return scored
+        doc_tf = np.zeros((len(results), len(vocab)), dtype=np.int32)
+        if offsets:
+            rows = np.searchsorted(starts, offsets, side="right") - 1
+            np.add.at(doc_tf, (rows, np.asarray(cols)), 1)
+        overlap = np.minimum(doc_tf, query_tf).sum(axis=1)
+        return np.minimum(overlap / len(query_terms), 1.0)
+
+    def _recency_scores(self, results: list[dict]) -> np.ndarray:
+        now = time.time()
+        ages = np.full(len(results), np.nan)
+        for i, r in enumerate(results):
+            ts = self._timestamp(r.get("metadata") or {})
+            if ts is not None:
+                ages[i] = max(now - ts, 0.0) / 86400.0
+        decay = np.exp2(-ages / self.recency_half_life_days)
+        return np.nan_to_num(decay, nan=0.5)
 
     @staticmethod
-    def _tokenize(text: str) -> list[str]:
-        """Extract lowercase words of 2+ chars."""
-        return re.findall(r"\b[a-zA-Z]{2,}\b", text.lower())
+    def _authority_scores(results: list[dict]) -> np.ndarray:
+        scores = np.empty(len(results))
+        for i, r in enumerate(results):
+            meta = r.get("metadata") or {}
+            value = meta.get("authority")
+            if isinstance(value, (int, float)):
+                scores[i] = value
+            else:
+                scores[i] = SOURCE_AUTHORITY.get(meta.get("source_type", ""), DEFAULT_AUTHORITY)
+        return np.clip(scores, 0.0, 1.0)
+
+    @staticmethod
+    def _timestamp(meta: dict[str, Any]) -> float | None:
+        for key in ("published_at", "created_at"):
+            value = meta.get(key)
+            if isinstance(value, (int, float)):
+                return float(value)
+            if isinstance(value, str) and value:
+                try:
+                    return datetime.fromisoformat(value).timestamp()
+                except ValueError:
+                    continue
+        return None
 
     @staticmethod
-    def _keyword_overlap(query_counter: Counter, doc_terms: list[str]) -> float:
-        """Compute keyword overlap ratio between query and document."""
-        if not doc_terms or not query_counter:
-            return 0.0
-        doc_counter = Counter(doc_terms)
-        overlap = sum((query_counter & doc_counter).values())
-        total = sum(query_counter.values())
-        return min(overlap / total, 1.0) if total > 0 else 0.0
+    def _tokenize(text: str) -> list[str]:
+        """Extract lowercase words of 2+ chars."""
+        return _TOKEN_RE.findall(text.lower())
@@ -1,32 +1,103 @@
+import asyncio
 import logging
 import pathlib
+import re
+import time
+import uuid
+from contextlib import asynccontextmanager
 
 import chromadb
+import numpy as np
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
+from src.rag import aliases
+from src.rag.bm25 import BM25Index, reciprocal_rank_fusion
+from src.rag.cache import LRUCache, RetrievalCache
+from src.rag.client import create_chroma_client
+from src.rag.embedding_store import EmbeddingStore
+from src.rag.embeddings import EmbeddingService
+from src.rag.executor import ChromaExecutor
+from src.rag.hnsw import REBUILD_PREFIX, HNSWConfig
+from src.rag.ids import chunk_id, chunk_ids, content_hash, document_id_for
+from src.rag.locks import FileLock
+from src.rag.mmr import MMRDiversifier
+from src.rag.packer import ContextPacker
+from src.rag.quantized import QuantizedCollection
 from src.rag.ranker import ResultRanker
 from src.rag.rewriter import QueryRewriter
+from src.rag.sharding import ShardRouter, merge_get_results, merge_query_results
+
+if TYPE_CHECKING:
+    from src.documents.metadata import DocumentMetadataResolver
 
 logger = logging.getLogger(__name__)
 
 
+@asynccontextmanager
+async def _no_lock():
+    yield
+
+
 class KnowledgeRetriever:
-    """RAG-based knowledge retrieval using ChromaDB."""
+    """RAG-based knowledge retrieval using ChromaDB.
+
+    ``chroma_mode`` selects a remote Chroma server (``"http"``), an
+    in-process store under ``chroma_persist_path`` (``"persistent"``) or the
+    in-process quantized store (``"quantized"``, see ``src.rag.quantized``).
+    With a ``shard_router``, chunks live in per-subject shard collections
+    instead of the single ``collection_name`` collection. ``hnsw`` sets the
+    index parameters collections are created with (see ``rebuild``).
+    ``write_lock_path`` names the file lock writers share with other
+    processes on the host (see ``_writing``).
+    """
 
     def __init__(
         self,
         chroma_host: str = "localhost",
         chroma_port: int = 8100,
         collection_name: str = "educational_content",
+        chroma_mode: str = "http",
+        chroma_persist_path: str | None = None,
+        chroma_quantization: str = "int8",
+        chroma_rescore_factor: int = 4,
         query_rewriter: QueryRewriter | None = None,
         result_ranker: ResultRanker | None = None,
+        executor: ChromaExecutor | None = None,
+        revalidate_interval: float = 60.0,
+        retry_backoff: float = 1.0,
+        retry_backoff_max: float = 30.0,
+        cache: RetrievalCache | None = None,
+        keyword_index: BM25Index | None = None,
+        keyword_save_interval: float = 30.0,
+        diversifier: MMRDiversifier | None = None,
+        context_packer: ContextPacker | None = None,
+        neighbor_window: int = 0,
+        neighbor_cache: LRUCache | None = None,
+        embedder: EmbeddingService | None = None,
+        embedding_store: EmbeddingStore | None = None,
+        shard_router: ShardRouter | None = None,
+        document_resolver: "DocumentMetadataResolver | None" = None,
+        hnsw: HNSWConfig | None = None,
+        write_lock_path: str | None = None,
     ):
         self.chroma_host = chroma_host
         self.chroma_port = chroma_port
         self.collection_name = collection_name
-        self._client: chromadb.HttpClient | None = None
+        self.chroma_mode = chroma_mode
+        self.chroma_persist_path = chroma_persist_path
+        self.chroma_quantization = chroma_quantization
+        self.chroma_rescore_factor = chroma_rescore_factor
+        self._client: chromadb.ClientAPI | None = None
         self._collection = None
+        self.revalidate_interval = revalidate_interval
+        self.retry_backoff = retry_backoff
+        self.retry_backoff_max = retry_backoff_max
+        self._initialized = False
+        self._revalidate_at = 0.0
+        self._retry_after = 0.0
+        self._consecutive_failures = 0
+        self._revalidations = 0
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=1000,
             chunk_overlap=200,
@@ -34,56 +105,279 @@ class KnowledgeRetriever:
         )
         self._rewriter = query_rewriter or QueryRewriter()
         self._ranker = result_ranker or ResultRanker()
+        self._executor = executor or ChromaExecutor()
+        self._cache = cache
+        self._bm25 = keyword_index
+        self.keyword_save_interval = keyword_save_interval
+        self._diversifier = diversifier
+        self._packer = context_packer
+        self.neighbor_window = neighbor_window
+        self._neighbor_cache = neighbor_cache
+        self._neighbor_hits = 0
+        self._neighbor_misses = 0
+        self._embedder = embedder
+        self._embedding_store = embedding_store if embedder is not None else None
+        self._router = shard_router
+        self._shards: dict[str, Any] = {}
+        self._shards_refresh_at = 0.0
+        self._documents = document_resolver
+        self._hnsw = hnsw or HNSWConfig()
+        if chroma_mode == "quantized" and (
+            self._hnsw.overrides or self._hnsw.defaults != HNSWConfig().defaults
+        ):
+            logger.warning(
+                "HNSW parameters are ignored with CHROMA_MODE=quantized (exact search, no graph index)"
+            )
+        self._write_lock = asyncio.Lock()
+        self._file_lock = FileLock(write_lock_path) if write_lock_path else None
+        self._mirrors: dict[str, Any] = {}
+        self._rebuilds = 0
 
     async def initialize(self):
-        self._client = chromadb.HttpClient(host=self.chroma_host, port=self.chroma_port)
-        self._collection = self._client.get_or_create_collection(
-            name=self.collection_name,
-            metadata={"hnsw:space": "cosine"},
+        self._initialized = True
+        await self._executor.run(self._connect)
+
+    def _connect(self) -> None:
+        self._client = create_chroma_client(
+            self.chroma_mode, self.chroma_host, self.chroma_port, self.chroma_persist_path,
+            self.chroma_quantization, self.chroma_rescore_factor,
         )
+        self._collection = self._open_collection(self.collection_name)
+        self._mark_healthy()
+
+    def _open_collection(self, name: str):
+        """Get or create logical collection ``name`` (through its alias) with its HNSW parameters."""
+        collection = self._client.get_or_create_collection(
+            name=aliases.resolve(self._client, name),
+            metadata=self._hnsw.metadata_for(name),
+        )
+        self._hnsw.apply_search_ef(collection, name)
+        return collection
 
     def _get_collection(self):
-        """Get collection, re-creating if the reference is stale."""
-        if self._collection is None and self._client is not None:
-            self._collection = self._client.get_or_create_collection(
-                name=self.collection_name,
-                metadata={"hnsw:space": "cosine"},
-            )
+        """Return the cached collection handle, re-validating only when due.
+
+        The handle is refreshed after ``revalidate_interval`` seconds or after a
+        call on it failed (see ``_invalidate_collection``). While ChromaDB is
+        unreachable, refresh attempts back off exponentially and ``None`` is
+        returned so callers degrade to empty results.
+        """
+        now = time.monotonic()
+        if self._collection is not None and now < self._revalidate_at:
+            return self._collection
+        if self._client is None and not self._initialized:
+            return self._collection
+        if now < self._retry_after:
+            return None
+
+        self._revalidations += 1
         try:
-            self._collection.count()
+            if self._client is None:
+                self._connect()
+            else:
+                self._collection = self._open_collection(self.collection_name)
+                self._mark_healthy()
         except Exception:
-            if self._client is not None:
-                logger.info("Re-creating ChromaDB collection reference (stale)")
-                self._collection = self._client.get_or_create_collection(
-                    name=self.collection_name,
-                    metadata={"hnsw:space": "cosine"},
-                )
+            self._consecutive_failures += 1
+            delay = min(
+                self.retry_backoff * 2 ** (self._consecutive_failures - 1),
+                self.retry_backoff_max,
+            )
+            self._retry_after = time.monotonic() + delay
+            self._collection = None
+            logger.warning(
+                "ChromaDB collection unavailable; retrying in %.1fs", delay, exc_info=True
+            )
+            return None
         return self._collection
 
-    def ingest_document(self, text: str, metadata: dict[str, Any] | None = None) -> int:
-        """Split text into chunks and add to collection. Returns number of chunks."""
+    async def _acquire_collection(self, timing: dict[str, float] | None = None):
+        """Return the collection, refreshing it on the executor only when due."""
+        if self._collection is not None and time.monotonic() < self._revalidate_at:
+            return self._collection
+        collection, call_timing = await self._executor.run(self._get_collection)
+        if timing is not None:
+            self._add_timing(timing, call_timing)
+        return collection
+
+    def _mark_healthy(self) -> None:
+        self._consecutive_failures = 0
+        self._retry_after = 0.0
+        self._revalidate_at = time.monotonic() + self.revalidate_interval
+
+    def _invalidate_collection(self) -> None:
+        """Force the next ``_get_collection`` call to refresh the handle."""
+        self._revalidate_at = 0.0
+        self._shards_refresh_at = 0.0
+
+    def _open_shard(self, name: str):
+        """Return the handle for shard collection ``name``, creating it if needed."""
+        collection = self._shards.get(name)
+        if collection is None:
+            collection = self._open_collection(name)
+            self._shards[name] = collection
+        return collection
+
+    def _list_shards(self) -> dict[str, Any]:
+        """Handles of every existing shard collection by shard name, re-listed when due."""
+        if time.monotonic() >= self._shards_refresh_at:
+            physical = {c.name: c for c in self._client.list_collections()}
+            alias_map = aliases.aliases(self._client)
+            names = {name for name in [*physical, *alias_map] if self._router.is_shard(name)}
+            self._shards = {}
+            for name in sorted(names):
+                shard = physical.get(alias_map.get(name, name))
+                if shard is not None:
+                    self._hnsw.apply_search_ef(shard, name)
+                    self._shards[name] = shard
+            self._shards_refresh_at = time.monotonic() + self.revalidate_interval
+        return self._shards
+
+    async def _named_collections(
+        self, collection, timing: dict[str, float] | None = None
+    ) -> dict[str, Any]:
+        """Every collection holding chunks by logical name: ``collection`` itself, or all shards."""
+        if self._router is None:
+            return {self.collection_name: collection}
+        shards = self._shards
+        if time.monotonic() >= self._shards_refresh_at:
+            shards, call_timing = await self._executor.run(self._list_shards)
+            if timing is not None:
+                self._add_timing(timing, call_timing)
+        return dict(shards)
+
+    async def _all_collections(self, collection, timing: dict[str, float] | None = None) -> list[Any]:
+        """Every collection holding chunks: ``collection`` itself, or all shards."""
+        return list((await self._named_collections(collection, timing)).values())
+
+    def _refresh_for_write(self):
+        """Re-resolve collection handles and rebuild mirrors; runs under the write locks."""
+        self._invalidate_collection()
+        collection = self._get_collection()
+        self._mirrors = {}
+        if collection is not None and self._client is not None:
+            if self._router is not None:
+                self._list_shards()
+            self._mirrors = {
+                name: self._client.get_collection(physical)
+                for name, physical in aliases.rebuilding(self._client).items()
+            }
+        return collection
+
+    @asynccontextmanager
+    async def _writing(self, timing: dict[str, float] | None = None):
+        """Hold the write locks and yield a freshly resolved collection (or None).
+
+        The asyncio lock serializes writers of this retriever; the file lock
+        (``write_lock_path``) serializes them with other processes on the
+        host. Handles are re-resolved inside, so writes never go to a
+        collection another process has just swapped out, and collections
+        being rebuilt are loaded as mirrors (see ``_with_mirror``).
+        """
+        async with self._write_lock:
+            if self._file_lock is not None:
+                await self._acquire_file_lock()
+            try:
+                collection, call_timing = await self._executor.run(self._refresh_for_write)
+                if timing is not None:
+                    self._add_timing(timing, call_timing)
+                yield collection
+            finally:
+                self._mirrors = {}
+                if self._file_lock is not None:
+                    self._file_lock.release()
+
+    async def _acquire_file_lock(self) -> None:
+        acquiring = asyncio.get_running_loop().run_in_executor(None, self._file_lock.acquire)
+        try:
+            await asyncio.shield(acquiring)
+        except asyncio.CancelledError:
+            # The thread still takes the lock; hand it back once it has
+            def release(future: asyncio.Future) -> None:
+                if not future.cancelled() and future.exception() is None:
+                    self._file_lock.release()
+
+            acquiring.add_done_callback(release)
+            raise
+
+    def _with_mirror(self, name: str, collection) -> list[Any]:
+        """``collection`` plus, while logical collection ``name`` is rebuilt, its new copy."""
+        mirror = self._mirrors.get(name)
+        return [collection] if mirror is None else [collection, mirror]
+
+    async def _search_targets(
+        self, collection, where: dict[str, Any], timing: dict[str, float] | None = None
+    ) -> tuple[list[Any], dict[str, Any] | None]:
+        """Collections to search for ``where`` and the filter to send them.
+
+        Unsharded, that is ``collection`` with ``where`` unchanged. Sharded, a
+        filter pinning the shard key goes to that one shard (without the
+        pinned condition); anything else fans out to every shard.
+        """
+        if self._router is None:
+            return [collection], where or None
+        shard, shard_where = self._router.route(where)
+        shards = await self._named_collections(collection, timing)
+        if shard is None:
+            return list(shards.values()), shard_where
+        return [shards[shard]] if shard in shards else [], shard_where
+
+    async def _query_collections(
+        self, collections: list[Any], timing: dict[str, float], **kwargs
+    ) -> dict[str, Any]:
+        """Run ``query`` on every collection concurrently and merge the rows by distance."""
+        if len(collections) == 1:
+            raw, call_timing = await self._executor.run(collections[0].query, **kwargs)
+            self._add_timing(timing, call_timing)
+            return raw
+        outputs = await asyncio.gather(
+            *(self._executor.run(c.query, **kwargs) for c in collections)
+        )
+        self._add_parallel_timing(timing, [call_timing for _, call_timing in outputs])
+        timing["shards"] = len(collections)
+        return merge_query_results([raw for raw, _ in outputs], kwargs["n_results"])
+
+    async def _get_from(
+        self, collections: list[Any], timing: dict[str, float], **kwargs
+    ) -> dict[str, Any]:
+        """Run ``get`` on every collection concurrently and concatenate the results."""
+        if len(collections) == 1:
+            got, call_timing = await self._executor.run(collections[0].get, **kwargs)
+            self._add_timing(timing, call_timing)
+            return got
+        outputs = await asyncio.gather(*(self._executor.run(c.get, **kwargs) for c in collections))
+        self._add_parallel_timing(timing, [call_timing for _, call_timing in outputs])
+        return merge_get_results([got for got, _ in outputs])
+
+    async def ingest_document(self, text: str, metadata: dict[str, Any] | None = None) -> int:
+        """Split text into chunks and store them with ``add_chunks``. Returns number of chunks.
+
+        Chunk IDs derive from the text (or ``metadata["document_id"]``), so
+        ingesting the same text again replaces rather than duplicates it.
+
+        Raises:
+            RuntimeError: If ChromaDB is unavailable.
+        """
         chunks = self.text_splitter.split_text(text)
         if not chunks:
             return 0
 
-        ids = [f"chunk_{hash(c)}_{i}" for i, c in enumerate(chunks)]
-        metadatas = [metadata or {} for _ in chunks]
+        document_id = (metadata or {}).get("document_id") or document_id_for(text)
+        ids = [chunk_id(document_id, i) for i in range(len(chunks))]
+        metadatas = [{**(metadata or {}), "document_id": document_id} for _ in chunks]
 
-        collection = self._get_collection()
-        collection.add(
-            documents=chunks,
-            metadatas=metadatas,
-            ids=ids,
-        )
+        if await self._acquire_collection() is None:
+            raise RuntimeError("ChromaDB is unavailable")
+        await self.add_chunks(ids, chunks, metadatas, document_id=document_id)
         return len(chunks)
 
-    def ingest_file(self, file_path: str, metadata: dict[str, Any] | None = None) -> int:
+    async def ingest_file(self, file_path: str, metadata: dict[str, Any] | None = None) -> int:
         """Read a file and ingest its contents. Returns number of chunks."""
         text = pathlib.Path(file_path).read_text(encoding="utf-8")
         file_metadata = {"source": file_path}
         if metadata:
             file_metadata.update(metadata)
-        return self.ingest_document(text, metadata=file_metadata)
+        return await self.ingest_document(text, metadata=file_metadata)
 
     async def retrieve(
         self,
@@ -92,19 +386,92 @@ class KnowledgeRetriever:
         filters: dict[str, Any] | None = None,
         k: int = 5,
         rewrite: bool = True,
+        use_cache: bool = True,
+        diversify: bool = True,
     ) -> dict[str, Any]:
-        """Retrieve relevant knowledge for a query with optional rewriting and re-ranking."""
-        collection = self._get_collection()
+        """Retrieve relevant knowledge for a query with optional rewriting and re-ranking.
+
+        All ChromaDB calls run on the retriever's executor; the returned
+        ``timing`` separates executor queue wait from vector query time.
+        Pass ``use_cache=False`` to skip the result cache (e.g. to measure a
+        cold query). When the retriever has a diversifier, ``diversify=False``
+        returns the plain ranked top-k instead of the MMR selection.
+        """
+        results = await self.retrieve_many(
+            [query],
+            subject=subject,
+            filters=filters,
+            k=k,
+            rewrite=rewrite,
+            use_cache=use_cache,
+            diversify=diversify,
+        )
+        return results[0]
+
+    async def retrieve_many(
+        self,
+        queries: list[str],
+        subject: str | None = None,
+        filters: dict[str, Any] | None = None,
+        k: int = 5,
+        rewrite: bool = True,
+        use_cache: bool = True,
+        diversify: bool = True,
+    ) -> list[dict[str, Any]]:
+        """Retrieve knowledge for several queries with a single vector search.
+
+        Cached queries are answered from the cache; the rest are rewritten
+        concurrently, embedded and searched in one ``collection.query`` call,
+        and each result list is re-ranked independently. With a diversifier,
+        each query over-fetches candidates (with embeddings) and MMR picks the
+        final ``k``. Returns one result
+        dict per query, in input order, shaped like ``retrieve``'s result.
+        """
+        diversifier = self._diversifier if diversify else None
+        results: list[dict[str, Any] | None] = [None] * len(queries)
+        cache_keys: list[str | None] = [None] * len(queries)
+        if self._cache is not None and use_cache:
+            for i, query in enumerate(queries):
+                cache_keys[i] = self._cache.make_key(
+                    query,
+                    subject=subject,
+                    filters=filters,
+                    k=k,
+                    rewrite=rewrite,
+                    diversify=diversifier is not None,
+                )
+                cached = await self._cache.lookup(self.collection_name, cache_keys[i])
+                if cached is not None:
+                    results[i] = {
+                        **cached,
+                        "cached": True,
+                        "timing": {"queue_wait_ms": 0.0, "query_ms": 0.0},
+                    }
+
+        pending = [i for i, r in enumerate(results) if r is None]
+        if not pending:
+            return results
+
+        timing = {"queue_wait_ms": 0.0, "query_ms": 0.0}
+        try:
+            collection = await self._acquire_collection(timing)
+        except Exception:
+            logger.warning("ChromaDB collection unavailable", exc_info=True)
+            collection = None
         if collection is None:
-            return {"context": "", "sources": [], "num_results": 0}
+            for i in pending:
+                results[i] = self._empty_result(timing)
+            return results
 
         # Query rewriting
-        search_query = query
+        search_queries = [queries[i] for i in pending]
         if rewrite:
             context = {}
             if subject:
                 context["subject"] = subject
-            search_query = await self._rewriter.rewrite(query, context)
+            search_queries = list(await asyncio.gather(*(
+                self._rewriter.rewrite(q, context, use_cache=use_cache) for q in search_queries
+            )))
 
         where_filter = {}
         if subject:
@@ -112,70 +479,1135 @@ class KnowledgeRetriever:
         if filters:
             where_filter.update(filters)
 
+        fetch_k = diversifier.fetch_k(k) if diversifier else k
+        include = ["documents", "metadatas", "distances"]
+        if diversifier:
+            include.append("embeddings")
         try:
-            results = collection.query(
-                query_texts=[search_query],
-                n_results=k,
-                where=where_filter if where_filter else None,
+            collections, search_where = await self._search_targets(collection, where_filter, timing)
+            if not collections:
+                # Sharded and the pinned shard does not exist yet: nothing to find
+                for i in pending:
+                    results[i] = self._empty_result(timing)
+                return results
+            query_input = await self._query_input(search_queries, timing)
+            raw = await self._query_collections(
+                collections,
+                timing,
+                **query_input,
+                n_results=fetch_k,
+                where=search_where,
+                include=include,
+            )
+        except Exception:
+            self._invalidate_collection()
+            logger.warning(
+                "ChromaDB query failed for %d queries (first: %s)",
+                len(search_queries), search_queries[0][:100], exc_info=True,
+            )
+            for i in pending:
+                results[i] = self._empty_result(timing)
+            return results
+        timing["batch_size"] = len(pending)
+
+        # Hybrid retrieval: BM25 candidates merged with reciprocal-rank fusion
+        keyword_hits: list[list[tuple[str, float]]] = [[] for _ in pending]
+        keyword_docs: dict[str, tuple[str, dict[str, Any], Any]] = {}
+        if self._bm25 is not None and self._bm25.supports_filter(where_filter):
+            try:
+                keyword_hits, keyword_docs = await self._keyword_search(
+                    collections, raw, search_queries, where_filter, fetch_k, timing, include
+                )
+            except Exception:
+                logger.warning("BM25 keyword search failed; using dense results only", exc_info=True)
+
+        selections = [
+            self._select_sources(
+                raw, pos, queries[i], k, subject, keyword_hits[pos], keyword_docs, diversifier
             )
+            for pos, i in enumerate(pending)
+        ]
+
+        # Small-to-big: pull in the neighbouring chunks of every hit
+        if self.neighbor_window > 0 and any(selections):
+            try:
+                selections = await self._expand_neighbors(collections, selections, timing)
+            except Exception:
+                logger.warning("Neighbour chunk fetch failed; using hits only", exc_info=True)
+
+        documents_meta = await self._resolve_documents(selections, timing)
+
+        for pos, i in enumerate(pending):
+            if selections[pos] is None:
+                results[i] = self._empty_result(timing)
+                continue
+            result = self._build_result(*selections[pos], dict(timing), documents_meta)
+            results[i] = result
+            if cache_keys[i] is not None and result["num_results"]:
+                await self._cache.store(self.collection_name, cache_keys[i], result)
+        return results
+
+    async def search_chunks(
+        self, query: str, n_results: int = 5, where: dict[str, Any] | None = None
+    ) -> dict[str, Any]:
+        """Nearest chunks for one query, searched in the collections ``where`` resolves to.
+
+        A plain vector search (no rewriting, ranking or caching) for callers
+        that format hits themselves; with a shard router it goes to the
+        pinned shard or fans out like ``retrieve``. Returns ``ids``,
+        ``documents``, ``metadatas`` and ``distances`` for the query.
+
+        Raises:
+            RuntimeError: If ChromaDB is unavailable.
+        """
+        fields = ("ids", "documents", "metadatas", "distances")
+        collection = await self._acquire_collection()
+        if collection is None:
+            raise RuntimeError("ChromaDB is unavailable")
+        timing: dict[str, float] = {}
+        collections, search_where = await self._search_targets(collection, where or {}, timing)
+        if not collections:
+            return {field: [] for field in fields}
+        raw = await self._query_collections(
+            collections,
+            timing,
+            **await self._query_input([query], timing),
+            n_results=n_results,
+            where=search_where,
+            include=["documents", "metadatas", "distances"],
+        )
+        return {field: (raw.get(field) or [[]])[0] for field in fields}
+
+    async def _query_input(
+        self, queries: list[str], timing: dict[str, float] | None = None
+    ) -> dict[str, Any]:
+        """Build the query argument for ``collection.query``.
+
+        With an embedding service, queries are embedded off the event loop
+        (micro-batched with other requests) and sent as ``query_embeddings``;
+        otherwise Chroma embeds ``query_texts`` itself. Falls back to
+        ``query_texts`` if embedding fails.
+        """
+        if self._embedder is None:
+            return {"query_texts": queries}
+        start = time.perf_counter()
+        try:
+            embeddings = await self._embedder.embed(queries)
         except Exception:
-            logger.warning("ChromaDB query failed for query: %s", search_query[:100], exc_info=True)
-            return {"context": "", "sources": [], "num_results": 0}
+            logger.warning("Query embedding failed; letting Chroma embed", exc_info=True)
+            return {"query_texts": queries}
+        if timing is not None:
+            timing["embed_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        return {"query_embeddings": embeddings}
 
-        if not results or not results.get("documents") or not results["documents"][0]:
-            return {"context": "", "sources": [], "num_results": 0}
+    async def _keyword_search(
+        self,
+        collections: list[Any],
+        raw: dict[str, Any],
+        queries: list[str],
+        where: dict[str, Any],
+        k: int,
+        timing: dict[str, float],
+        include: list[str],
+    ) -> tuple[list[list[tuple[str, float]]], dict[str, tuple[str, dict[str, Any], Any]]]:
+        """Run BM25 for each query and fetch keyword-only hits from Chroma in one call.
 
-        documents = results["documents"][0]
-        metadatas = results["metadatas"][0] if results.get("metadatas") else [{}] * len(documents)
-        distances = results["distances"][0] if results.get("distances") else [0.0] * len(documents)
+        Returns the hits per query and ``{chunk_id: (document, metadata,
+        embedding)}`` for hits that were not in the dense results; the
+        embedding is None unless ``include`` asks for it.
+        """
+        hits, call_timing = await self._executor.run(
+            lambda: [self._bm25.search(q, k=k, where=where or None) for q in queries]
+        )
+        self._add_timing(timing, call_timing)
 
+        dense_ids = {cid for row in (raw or {}).get("ids") or [] for cid in row}
+        missing = sorted({cid for row in hits for cid, _ in row if cid not in dense_ids})
+        docs: dict[str, tuple[str, dict[str, Any], Any]] = {}
+        if missing:
+            fetched = await self._get_from(
+                collections,
+                timing,
+                ids=missing,
+                include=[field for field in include if field != "distances"],
+            )
+            ids = fetched.get("ids") or []
+            embeddings = fetched.get("embeddings")
+            if embeddings is None:
+                embeddings = [None] * len(ids)
+            for cid, doc, meta, emb in zip(
+                ids,
+                fetched.get("documents") or [],
+                fetched.get("metadatas") or [],
+                embeddings,
+            ):
+                docs[cid] = (doc, meta or {}, emb)
+        return hits, docs
+
+    def _select_sources(
+        self,
+        raw: dict[str, Any] | None,
+        pos: int,
+        query: str,
+        k: int,
+        subject: str | None = None,
+        keyword_hits: list[tuple[str, float]] | None = None,
+        keyword_docs: dict[str, tuple[str, dict[str, Any], Any]] | None = None,
+        diversifier: MMRDiversifier | None = None,
+    ) -> tuple[list[dict[str, Any]], list[str]] | None:
+        """Rank (and fuse/diversify) row ``pos`` of a batched Chroma query.
+
+        Returns (sources, documents), or None if the row has no hits.
+        """
+        documents: list[str] = []
+        if raw and raw.get("documents") and len(raw["documents"]) > pos:
+            documents = raw["documents"][pos] or []
+        if not documents and not keyword_hits:
+            return None
+
+        metadatas = raw["metadatas"][pos] if documents and raw.get("metadatas") else [{}] * len(documents)
+        distances = raw["distances"][pos] if documents and raw.get("distances") else [0.0] * len(documents)
+        ids = raw["ids"][pos] if documents and raw.get("ids") else [f"_{pos}_{j}" for j in range(len(documents))]
+
+        texts = dict(zip(ids, documents))
+        vectors: dict[str, Any] = {}
+        if diversifier and documents and raw.get("embeddings") is not None:
+            vectors = dict(zip(ids, raw["embeddings"][pos]))
         sources = [
             {
+                "id": cid,
+                "content": doc,
                 "content_preview": doc[:200] + "..." if len(doc) > 200 else doc,
                 "metadata": meta,
                 "distance": dist,
             }
-            for doc, meta, dist in zip(documents, metadatas, distances)
+            for cid, doc, meta, dist in zip(ids, documents, metadatas, distances)
         ]
 
         # Re-rank results
-        sources = self._ranker.rank(sources, query)
+        sources = self._ranker.rank(sources, query, subject=subject)
+
+        if keyword_hits:
+            keyword_only = []
+            for cid, _ in keyword_hits:
+                if cid not in texts and cid in (keyword_docs or {}):
+                    doc, meta, emb = keyword_docs[cid]
+                    texts[cid] = doc
+                    if emb is not None:
+                        vectors[cid] = emb
+                    keyword_only.append({
+                        "id": cid,
+                        "content": doc,
+                        "content_preview": doc[:200] + "..." if len(doc) > 200 else doc,
+                        "metadata": meta,
+                        "distance": 1.0,  # not in the dense top-k; treat as dissimilar
+                    })
+            keyword_only = self._ranker.rank(keyword_only, query, subject=subject)
+            by_id = {src["id"]: src for src in sources + keyword_only}
+            fused = reciprocal_rank_fusion([
+                [src["id"] for src in sources],
+                [cid for cid, _ in keyword_hits if cid in by_id],
+            ])
+            sources = [{**by_id[cid], "rrf_score": round(score, 6)} for cid, score in fused]
+            if not diversifier:
+                sources = sources[:k]
+            documents = [texts[src["id"]] for src in sources]
+
+        # Diversify the over-fetched candidates down to k
+        if diversifier:
+            sources = diversifier.diversify(sources, vectors, k)
+            documents = [texts[src["id"]] for src in sources]
+        return sources, documents
+
+    async def _expand_neighbors(
+        self,
+        collections: list[Any],
+        selections: list[tuple[list[dict[str, Any]], list[str]] | None],
+        timing: dict[str, float],
+    ) -> list[tuple[list[dict[str, Any]], list[str]] | None]:
+        """Add the +/- ``neighbor_window`` chunks around every hit.
+
+        Neighbour IDs follow the ``{document_id}_chunk_{i}`` ingest scheme.
+        Hot neighbours come from the neighbour cache; the rest of every query
+        in the batch is fetched with one ``collection.get``.
+        """
+        wanted: dict[str, None] = {}
+        for selection in selections:
+            if selection is None:
+                continue
+            present = {src["id"] for src in selection[0]}
+            for src in selection[0]:
+                for cid in self._neighbor_ids(src):
+                    if cid not in present:
+                        wanted[cid] = None
+
+        fetched: dict[str, tuple[str, dict[str, Any]]] = {}
+        missing = []
+        for cid in wanted:
+            cached = self._neighbor_cache.get(cid) if self._neighbor_cache is not None else None
+            if cached is not None:
+                fetched[cid] = cached
+            else:
+                missing.append(cid)
+        self._neighbor_hits += len(fetched)
+        self._neighbor_misses += len(missing)
+
+        if missing:
+            got = await self._get_from(
+                collections, timing, ids=missing, include=["documents", "metadatas"]
+            )
+            for cid, doc, meta in zip(
+                got.get("ids") or [], got.get("documents") or [], got.get("metadatas") or []
+            ):
+                fetched[cid] = (doc, meta or {})
+                if self._neighbor_cache is not None:
+                    self._neighbor_cache.set(cid, fetched[cid])
+        timing["neighbors"] = len(fetched)
+
+        return [
+            self._attach_neighbors(*selection, fetched) if selection is not None else None
+            for selection in selections
+        ]
+
+    def _neighbor_ids(self, src: dict[str, Any]) -> list[str]:
+        meta = src.get("metadata") or {}
+        document_id = meta.get("document_id")
+        index = meta.get("chunk_index")
+        if not document_id or not isinstance(index, int):
+            return []
+        total = meta.get("total_chunks")
+        upper = index + self.neighbor_window
+        if isinstance(total, int):
+            upper = min(upper, total - 1)
+        return [
+            f"{document_id}_chunk_{i}"
+            for i in range(max(0, index - self.neighbor_window), upper + 1)
+            if i != index
+        ]
+
+    def _attach_neighbors(
+        self,
+        sources: list[dict[str, Any]],
+        documents: list[str],
+        fetched: dict[str, tuple[str, dict[str, Any]]],
+    ) -> tuple[list[dict[str, Any]], list[str]]:
+        """Append fetched neighbours after the hits; documents follow reading order."""
+        present = {src["id"] for src in sources}
+        neighbors: dict[str, list[dict[str, Any]]] = {}
+        for src in sources:
+            for cid in self._neighbor_ids(src):
+                if cid in fetched and cid not in present:
+                    present.add(cid)
+                    doc, meta = fetched[cid]
+                    neighbors.setdefault(src["id"], []).append({
+                        "id": cid,
+                        "content": doc,
+                        "content_preview": doc[:200] + "..." if len(doc) > 200 else doc,
+                        "metadata": meta,
+                        "distance": src.get("distance", 0.0),
+                        "neighbor_of": src["id"],
+                    })
+        if not neighbors:
+            return sources, documents
+
+        ordered = []
+        for src in sources:
+            group = [src] + neighbors.get(src["id"], [])
+            ordered.extend(sorted(group, key=lambda s: (s.get("metadata") or {}).get("chunk_index", 0)))
+        expanded = sources + [n for src in sources for n in neighbors.get(src["id"], [])]
+        return expanded, [s["content"] for s in ordered]
+
+    async def _resolve_documents(
+        self,
+        selections: list[tuple[list[dict[str, Any]], list[str]] | None],
+        timing: dict[str, float],
+    ) -> dict[str, dict[str, Any]]:
+        """Document-level metadata for every source in the batch, in one lookup.
+
+        Chunks only carry IDs and filter fields; titles and sources come from
+        the document resolver (Postgres). Empty without a resolver.
+        """
+        if self._documents is None:
+            return {}
+        document_ids = [
+            (src.get("metadata") or {}).get("document_id")
+            for selection in selections if selection is not None
+            for src in selection[0]
+        ]
+        start = time.perf_counter()
+        resolved = await self._documents.resolve([str(d) for d in document_ids if d])
+        timing["resolve_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        return resolved
+
+    def _build_result(
+        self,
+        sources: list[dict[str, Any]],
+        documents: list[str],
+        timing: dict[str, float],
+        documents_meta: dict[str, dict[str, Any]] | None = None,
+    ) -> dict[str, Any]:
+        """Pack the selected sources into a retrieval result with citations."""
+        # Pack into the token budget, merging adjacent chunks and dropping overlap
+        packing = None
+        if self._packer is not None:
+            context, sources, packing = self._packer.pack(sources)
+        else:
+            context = "\n\n---\n\n".join(documents)
 
         # Format source citations
-        citations = self._format_citations(sources)
+        citations = self._format_citations(sources, documents_meta)
 
-        return {
-            "context": "\n\n---\n\n".join(documents),
+        result = {
+            "context": context,
             "sources": sources,
             "citations": citations,
-            "num_results": len(documents),
+            "num_results": len(sources),
+            "timing": timing,
         }
+        if packing is not None:
+            result["packing"] = packing
+        return result
 
     @staticmethod
-    def _format_citations(sources: list[dict]) -> list[dict]:
-        """Format sources into structured citations."""
+    def _empty_result(timing: dict[str, float]) -> dict[str, Any]:
+        return {"context": "", "sources": [], "num_results": 0, "timing": dict(timing)}
+
+    @staticmethod
+    def _add_timing(total: dict[str, float], call: dict[str, float]) -> None:
+        """Accumulate one executor call's timing into a per-request total."""
+        for key, value in call.items():
+            total[key] = round(total.get(key, 0.0) + value, 2)
+
+    @staticmethod
+    def _add_parallel_timing(total: dict[str, float], calls: list[dict[str, float]]) -> None:
+        """Accumulate concurrent executor calls: the slowest call bounds each phase."""
+        for key in {key for call in calls for key in call}:
+            total[key] = round(total.get(key, 0.0) + max(call.get(key, 0.0) for call in calls), 2)
+
+    @staticmethod
+    def _format_citations(
+        sources: list[dict], documents_meta: dict[str, dict[str, Any]] | None = None
+    ) -> list[dict]:
+        """Format sources into structured citations.
+
+        Title and source come from ``documents_meta`` (keyed by document ID),
+        falling back to the chunk's own metadata for chunks stored before
+        chunk metadata was slimmed.
+        """
         citations = []
         for i, src in enumerate(sources, 1):
             meta = src.get("metadata", {})
+            document = (documents_meta or {}).get(meta.get("document_id", ""), {})
             citations.append({
                 "index": i,
                 "preview": src.get("content_preview", ""),
-                "source": meta.get("source", "unknown"),
+                "source": document.get("source") or meta.get("source", "unknown"),
+                "title": document.get("title") or meta.get("title", ""),
                 "document_id": meta.get("document_id", ""),
                 "relevance_score": src.get("_rank_score", 1.0 - src.get("distance", 0.0)),
             })
         return citations
 
-    def delete_document_chunks(self, document_id: str) -> None:
-        """Delete all chunks for a given document_id from the collection."""
-        collection = self._get_collection()
+    async def add_chunks(
+        self,
+        ids: list[str],
+        documents: list[str],
+        metadatas: list[dict[str, Any]],
+        document_id: str | None = None,
+    ) -> dict[str, float]:
+        """Upsert pre-chunked documents into the collection off the event loop.
+
+        Writes are upserts, so re-ingesting content with the same
+        (content-derived) chunk IDs is idempotent. With ``document_id``, chunks
+        of that document that are not in ``ids`` (left over from an earlier,
+        longer version) are deleted.
+
+        With an embedding store, chunks whose text was embedded before (by
+        the same model) reuse the stored vector and only new chunks are
+        embedded; ``embeddings_reused``/``embeddings_computed`` are added to
+        the result. Returns the executor timing for the write (empty if no
+        collection).
+
+        With a shard router, each chunk is written to its shard collection
+        and stale chunks are looked up in every shard.
+        """
+        timing = {"queue_wait_ms": 0.0, "query_ms": 0.0}
+        collection = await self._acquire_collection(timing)
+        if collection is None or not ids:
+            return timing
+        embeddings = None
+        if self._embedding_store is not None:
+            embeddings, reused = await self._embed_chunks(documents, timing)
+            timing["embeddings_reused"] = reused
+            timing["embeddings_computed"] = len(documents) - reused
+        # Shared with other processes and with rebuild(), which swaps collections
+        async with self._writing(timing) as collection:
+            if collection is None:
+                return timing
+            try:
+                if self._router is None:
+                    targets = [(self.collection_name, collection, list(range(len(ids))))]
+                else:
+                    targets = []
+                    for name, positions in self._router.group(metadatas).items():
+                        shard, call_timing = await self._executor.run(self._open_shard, name)
+                        self._add_timing(timing, call_timing)
+                        targets.append((name, shard, positions))
+                for name, target, positions in targets:
+                    extra = {"embeddings": embeddings[positions]} if embeddings is not None else {}
+                    for handle in self._with_mirror(name, target):
+                        _, call_timing = await self._executor.run_write(
+                            handle.upsert,
+                            documents=[documents[p] for p in positions],
+                            metadatas=[metadatas[p] for p in positions],
+                            ids=[ids[p] for p in positions],
+                            **extra,
+                        )
+                        self._add_timing(timing, call_timing)
+                stale: list[str] = []
+                if document_id:
+                    keep = set(ids)
+                    for name, target in (await self._named_collections(collection, timing)).items():
+                        existing, call_timing = await self._executor.run(
+                            target.get, where={"document_id": document_id}, include=[]
+                        )
+                        self._add_timing(timing, call_timing)
+                        target_stale = [cid for cid in existing.get("ids") or [] if cid not in keep]
+                        if target_stale:
+                            for handle in self._with_mirror(name, target):
+                                await self._executor.run_write(handle.delete, ids=target_stale)
+                            stale.extend(target_stale)
+            except Exception:
+                self._invalidate_collection()
+                raise
+        if self._bm25 is not None:
+            await self._executor.run_write(self._bm25.add, ids, documents, metadatas)
+            if stale:
+                await self._executor.run_write(self._bm25.remove_ids, stale)
+            await self._save_keyword_index()
+        await self._bump_cache_generation()
+        return timing
+
+    async def _embed_chunks(
+        self, documents: list[str], timing: dict[str, float], batch_size: int = 256
+    ) -> tuple[np.ndarray, int]:
+        """Embed chunk texts through the embedding store. Returns (vectors, reused)."""
+        store = self._embedding_store
+        vectors: list[np.ndarray] = []
+        reused = 0
+
+        def embed_batch(batch: list[str]) -> tuple[list[np.ndarray], int]:
+            stored = store.get_many(batch)
+            missing = [i for i, v in enumerate(stored) if v is None]
+            if missing:
+                texts = [batch[i] for i in missing]
+                fresh = np.asarray(self._embedder.embedding_function(texts), dtype=np.float32)
+                store.put_many(texts, fresh)
+                for i, vector in zip(missing, fresh):
+                    stored[i] = vector
+            return stored, len(batch) - len(missing)
+
+        # On the embedding pool: a slow model must not hold Chroma workers
+        started = time.perf_counter()
+        for start in range(0, len(documents), batch_size):
+            batch_vectors, batch_reused = await self._embedder.run(
+                embed_batch, documents[start:start + batch_size]
+            )
+            vectors.extend(batch_vectors)
+            reused += batch_reused
+        self._add_timing(timing, {"embed_ms": (time.perf_counter() - started) * 1000})
+        return np.stack(vectors), reused
+
+    async def delete_document_chunks(self, document_id: str, chunk_count: int | None = None) -> None:
+        """Delete all chunks for a given document_id from the collection.
+
+        With ``chunk_count`` (recorded on the document row at ingest) the
+        chunks are deleted by ID; otherwise by a ``document_id`` filter.
+        """
+        await self.delete_documents({document_id: chunk_count})
+
+    async def delete_documents(
+        self, documents: dict[str, int | None], batch_size: int = 500
+    ) -> dict[str, Any]:
+        """Delete the chunks of several documents.
+
+        ``documents`` maps document_id -> chunk count, the manifest recorded
+        at ingest. Chunk IDs follow the ``{document_id}_chunk_{i}`` scheme,
+        so documents with a count are deleted by ID in batches of
+        ``batch_size``, with no metadata scan. Documents without a count
+        fall back to a ``where={"document_id": ...}`` delete. Failures are
+        logged, not raised.
+        """
+        ids = [cid for doc_id, count in documents.items() if count for cid in chunk_ids(doc_id, count)]
+        unknown = [doc_id for doc_id, count in documents.items() if not count]
+        report = {"documents": len(documents), "by_id": len(ids), "by_filter": len(unknown)}
+        try:
+            collection = await self._acquire_collection()
+            if collection is None:
+                return {**report, "deleted": False}
+            async with self._writing() as collection:
+                if collection is None:
+                    return {**report, "deleted": False}
+                targets = [
+                    handle
+                    for name, target in (await self._named_collections(collection)).items()
+                    for handle in self._with_mirror(name, target)
+                ]
+                for start in range(0, len(ids), batch_size):
+                    batch = ids[start:start + batch_size]
+                    for target in targets:
+                        await self._executor.run_write(target.delete, ids=batch)
+                for doc_id in unknown:
+                    for target in targets:
+                        await self._executor.run_write(target.delete, where={"document_id": doc_id})
+            if self._bm25 is not None:
+                if ids:
+                    await self._executor.run_write(self._bm25.remove_ids, ids)
+                for doc_id in unknown:
+                    await self._executor.run_write(self._bm25.remove_document, doc_id)
+                await self._save_keyword_index()
+            await self._bump_cache_generation()
+        except Exception:
+            self._invalidate_collection()
+            logger.warning(
+                "Failed to delete chunks for %d documents from ChromaDB", len(documents), exc_info=True
+            )
+            return {**report, "deleted": False}
+        return {**report, "deleted": True}
+
+    async def scan_documents(self, batch_size: int = 1000) -> dict[str, int | None]:
+        """Map every ``document_id`` in the vector store to its chunk count.
+
+        The count is ``max(chunk_index) + 1``, i.e. the ID range to delete;
+        None when a document has a chunk without a ``chunk_index``. Chunks
+        without a ``document_id`` are not included.
+        """
+        collection = await self._acquire_collection()
+        if collection is None:
+            return {}
+        documents: dict[str, int | None] = {}
+        for target in await self._all_collections(collection):
+            offset = 0
+            while True:
+                page, _ = await self._executor.run(
+                    target.get, limit=batch_size, offset=offset, include=["metadatas"]
+                )
+                ids = page.get("ids") or []
+                if not ids:
+                    break
+                for meta in page.get("metadatas") or []:
+                    doc_id = (meta or {}).get("document_id")
+                    if not doc_id:
+                        continue
+                    index = meta.get("chunk_index")
+                    if doc_id in documents and documents[doc_id] is None:
+                        continue
+                    if isinstance(index, int):
+                        documents[doc_id] = max(documents.get(doc_id) or 0, index + 1)
+                    else:
+                        documents[doc_id] = None
+                offset += len(ids)
+        return documents
+
+    async def deduplicate(self, dry_run: bool = True, batch_size: int = 1000) -> dict[str, Any]:
+        """Find chunks with identical text and (unless ``dry_run``) delete the extras.
+
+        Pages through the whole collection keeping only (id, text hash) per
+        chunk. In each group of identical chunks the first one seen is kept.
+        Returns a report with counts and a few example groups.
+        """
+        collection = await self._acquire_collection()
+        if collection is None:
+            return {"scanned": 0, "duplicate_groups": 0, "duplicates": 0, "removed": 0}
+
+        named = list((await self._named_collections(collection)).items())
+        groups: dict[str, list[tuple[int, str]]] = {}
+        scanned = 0
+        for position, (_, target) in enumerate(named):
+            offset = 0
+            while True:
+                page, _ = await self._executor.run(
+                    target.get, limit=batch_size, offset=offset, include=["documents"]
+                )
+                ids = page.get("ids") or []
+                if not ids:
+                    break
+                for cid, doc in zip(ids, page.get("documents") or []):
+                    groups.setdefault(content_hash(doc or ""), []).append((position, cid))
+                scanned += len(ids)
+                offset += len(ids)
+
+        duplicate_groups = [members for members in groups.values() if len(members) > 1]
+        extras = [member for members in duplicate_groups for member in members[1:]]
+        removed = 0
+        if extras and not dry_run:
+            async with self._writing() as collection:
+                current = await self._named_collections(collection) if collection is not None else {}
+                for position, (name, _) in enumerate(named):
+                    target = current.get(name)
+                    if target is None:
+                        continue
+                    target_extras = [cid for pos, cid in extras if pos == position]
+                    for start in range(0, len(target_extras), batch_size):
+                        batch = target_extras[start:start + batch_size]
+                        for handle in self._with_mirror(name, target):
+                            await self._executor.run_write(handle.delete, ids=batch)
+                        removed += len(batch)
+            if self._bm25 is not None:
+                await self._executor.run_write(self._bm25.remove_ids, [cid for _, cid in extras])
+                await self._save_keyword_index(force=True)
+            await self._bump_cache_generation()
+            logger.info("Removed %d duplicate chunks from %s", removed, self.collection_name)
+
+        return {
+            "scanned": scanned,
+            "unique": len(groups),
+            "duplicate_groups": len(duplicate_groups),
+            "duplicates": len(extras),
+            "removed": removed,
+            "dry_run": dry_run,
+            "examples": [
+                {"keep": members[0][1], "remove": [cid for _, cid in members[1:]]}
+                for members in duplicate_groups[:10]
+            ],
+        }
+
+    async def prune_metadata(
+        self, keep: tuple[str, ...] | list[str], dry_run: bool = True, batch_size: int = 500
+    ) -> dict[str, Any]:
+        """Drop every chunk metadata key not in ``keep``.
+
+        Chroma merges metadata on upsert, so re-ingesting does not remove
+        keys stored by older versions; this sets them to None via
+        ``update``, which deletes them. Returns counts of scanned and
+        changed chunks and of the keys removed.
+        """
+        collection = await self._acquire_collection()
         if collection is None:
+            return {"scanned": 0, "changed": 0, "keys_removed": {}, "dry_run": dry_run}
+        keep_set = set(keep)
+        scanned = changed = 0
+        removed: dict[str, int] = {}
+        for name, target in (await self._named_collections(collection)).items():
+            offset = 0
+            while True:
+                page, _ = await self._executor.run(
+                    target.get, limit=batch_size, offset=offset, include=["metadatas"]
+                )
+                ids = page.get("ids") or []
+                if not ids:
+                    break
+                update_ids, updates = [], []
+                for cid, meta in zip(ids, page.get("metadatas") or [{}] * len(ids)):
+                    extra = [key for key in meta or {} if key not in keep_set]
+                    if extra:
+                        update_ids.append(cid)
+                        updates.append(dict.fromkeys(extra))
+                        for key in extra:
+                            removed[key] = removed.get(key, 0) + 1
+                if update_ids and not dry_run:
+                    async with self._writing() as current:
+                        if current is None:
+                            raise RuntimeError("ChromaDB is unavailable")
+                        target = (await self._named_collections(current)).get(name, target)
+                        for handle in self._with_mirror(name, target):
+                            await self._executor.run_write(handle.update, ids=update_ids, metadatas=updates)
+                scanned += len(ids)
+                changed += len(update_ids)
+                offset += len(ids)
+        if changed and not dry_run:
+            await self._bump_cache_generation()
+        return {
+            "scanned": scanned,
+            "changed": changed,
+            "keys_removed": dict(sorted(removed.items(), key=lambda item: -item[1])),
+            "dry_run": dry_run,
+        }
+
+    async def rebuild_keyword_index(self, batch_size: int = 1000) -> int:
+        """Rebuild the BM25 index from the documents stored in ChromaDB.
+
+        Used when hybrid retrieval is enabled on an existing collection, after
+        the index file was lost, and by workers that do not own the index
+        file (``BM25Index.read_only``). Returns the number of chunks indexed.
+        """
+        if self._bm25 is None:
+            return 0
+        collection = await self._acquire_collection()
+        if collection is None:
+            return 0
+        fresh = self._bm25.empty_copy()
+        for target in await self._all_collections(collection):
+            offset = 0
+            while True:
+                page, _ = await self._executor.run(
+                    target.get,
+                    limit=batch_size,
+                    offset=offset,
+                    include=["documents", "metadatas"],
+                )
+                ids = page.get("ids") or []
+                if not ids:
+                    break
+                await self._executor.run_write(
+                    fresh.add,
+                    ids,
+                    page.get("documents") or [],
+                    page.get("metadatas") or [{}] * len(ids),
+                )
+                offset += len(ids)
+        self._bm25 = fresh
+        await self._executor.run_write(fresh.save)
+        logger.info("Rebuilt BM25 index with %d chunks", len(fresh))
+        return len(fresh)
+
+    async def sync_keyword_index(self, batch_size: int = 1000) -> dict[str, int]:
+        """Bring the BM25 index in line with the chunk IDs stored in ChromaDB.
+
+        Each worker's index only sees its own writes; this adds chunks other
+        workers ingested and drops the ones they deleted. Only IDs are
+        scanned; documents are fetched for the missing chunks alone.
+        """
+        if self._bm25 is None:
+            return {"added": 0, "removed": 0}
+        collection = await self._acquire_collection()
+        if collection is None:
+            return {"added": 0, "removed": 0}
+        index = self._bm25
+        # Taken before the scan: a chunk written meanwhile is at worst re-added
+        known, _ = await self._executor.run(index.chunk_ids)
+        stored: set[str] = set()
+        added = 0
+        for target in await self._all_collections(collection):
+            ids = await self._chunk_ids_of(target, batch_size)
+            stored.update(ids)
+            missing = sorted(ids - known)
+            for start in range(0, len(missing), batch_size):
+                page, _ = await self._executor.run(
+                    target.get,
+                    ids=missing[start:start + batch_size],
+                    include=["documents", "metadatas"],
+                )
+                page_ids = page.get("ids") or []
+                await self._executor.run_write(
+                    index.add,
+                    page_ids,
+                    page.get("documents") or [],
+                    page.get("metadatas") or [{}] * len(page_ids),
+                )
+                added += len(page_ids)
+        removed, _ = await self._executor.run_write(index.remove_ids, sorted(known - stored))
+        if added or removed:
+            logger.info("Synced BM25 index with ChromaDB: %d chunks added, %d removed", added, removed)
+            await self._save_keyword_index()
+        return {"added": added, "removed": removed}
+
+    async def sync_keyword_index_forever(self, interval: float) -> None:
+        """Run ``sync_keyword_index`` every ``interval`` seconds until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.sync_keyword_index()
+            except Exception:
+                logger.warning("BM25 index sync failed", exc_info=True)
+
+    async def count(self) -> int:
+        """Number of chunks stored (summed over shards when sharded)."""
+        collection = await self._acquire_collection()
+        if collection is None:
+            return 0
+        total = 0
+        for target in await self._all_collections(collection):
+            count, _ = await self._executor.run(target.count)
+            total += count
+        return total
+
+    async def reshard(
+        self, source: str | None = None, batch_size: int = 500, delete_source: bool = False
+    ) -> dict[str, Any]:
+        """Copy every chunk of an unsharded collection into its shard collection.
+
+        ``source`` defaults to ``collection_name``, the pre-sharding
+        collection. Stored vectors are copied as-is, so nothing is
+        re-embedded, and chunk IDs are kept, so the BM25 index stays valid.
+        Writes are upserts, which makes an interrupted run safe to repeat.
+        With ``delete_source`` the source collection is dropped afterwards.
+        """
+        if self._router is None:
+            raise ValueError("resharding requires a shard router")
+        if await self._acquire_collection() is None:
+            raise RuntimeError("ChromaDB is unavailable")
+        source_name = source or self.collection_name
+        if self._router.is_shard(source_name):
+            raise ValueError(f"{source_name} is already a shard collection")
+        source_physical, _ = await self._executor.run(aliases.resolve, self._client, source_name)
+        source_collection, _ = await self._executor.run(self._client.get_collection, source_physical)
+
+        copied: dict[str, int] = {}
+        offset = 0
+        while True:
+            page, _ = await self._executor.run(
+                source_collection.get,
+                limit=batch_size,
+                offset=offset,
+                include=["documents", "metadatas", "embeddings"],
+            )
+            ids = page.get("ids") or []
+            if not ids:
+                break
+            documents = page.get("documents") or [""] * len(ids)
+            metadatas = page.get("metadatas") or [None] * len(ids)
+            embeddings = np.asarray(page["embeddings"], dtype=np.float32)
+            for name, positions in self._router.group(metadatas).items():
+                shard, _ = await self._executor.run(self._open_shard, name)
+                await self._executor.run_write(
+                    shard.upsert,
+                    ids=[ids[p] for p in positions],
+                    documents=[documents[p] for p in positions],
+                    metadatas=[metadatas[p] for p in positions],
+                    embeddings=embeddings[positions],
+                )
+                copied[name] = copied.get(name, 0) + len(positions)
+            offset += len(ids)
+            logger.info("Resharded %d chunks from %s", offset, source_name)
+
+        if delete_source:
+            await self._executor.run_write(self._client.delete_collection, source_physical)
+            if source_physical != source_name:
+                await self._executor.run_write(aliases.point, self._client, source_name, source_name)
+            if source_name == self.collection_name:
+                self._collection = None
+                self._invalidate_collection()
+        self._shards_refresh_at = 0.0
+        await self._bump_cache_generation()
+        return {
+            "source": source_name,
+            "copied": sum(copied.values()),
+            "shards": dict(sorted(copied.items())),
+            "source_deleted": delete_source,
+        }
+
+    async def rebuild(self, names: list[str] | None = None, batch_size: int = 500) -> dict[str, Any]:
+        """Rebuild collections with the configured HNSW parameters and swap them in.
+
+        Each collection (default: every collection holding chunks) is copied
+        with its stored vectors into a new ``rebuild-{name}-{id}`` collection
+        created with the current ``HNSWConfig`` parameters. Deleted entries
+        are not copied, so this also compacts a collection after heavy
+        deletes.
+
+        While copying, the collection is marked as rebuilding (see
+        ``src.rag.aliases``): writers holding the write locks mirror their
+        writes into the copy, and each copied batch is taken under the same
+        locks so it cannot overwrite a newer mirrored write. A final pass
+        under the locks adds chunks the paged copy missed and removes ones
+        deleted meanwhile; then the collection's alias is pointed at the
+        copy in one write and the old collection is dropped. Chunk IDs are
+        kept, so the BM25 index and embedding store stay valid.
+        """
+        collection = await self._acquire_collection()
+        if collection is None:
+            raise RuntimeError("ChromaDB is unavailable")
+        if names is None:
+            names = list(await self._named_collections(collection))
+        report = {}
+        for name in names:
+            report[name] = await self._rebuild_one(name, batch_size)
+            logger.info("Rebuilt collection %s: %s", name, report[name])
+        self._rebuilds += 1
+        await self._bump_cache_generation()
+        return {"collections": report}
+
+    async def _rebuild_one(self, name: str, batch_size: int) -> dict[str, Any]:
+        started = time.perf_counter()
+        temp = f"{REBUILD_PREFIX}{name}-{uuid.uuid4().hex[:8]}"
+        async with self._writing():
+            (source_name, source, target), _ = await self._executor.run_write(
+                self._start_rebuild, name, temp
+            )
+        try:
+            copied = await self._copy_chunks(source, target, batch_size, locked=True)
+            async with self._writing():
+                source_ids = await self._chunk_ids_of(source, batch_size)
+                target_ids = await self._chunk_ids_of(target, batch_size)
+                missing = sorted(source_ids - target_ids)
+                extra = sorted(target_ids - source_ids)
+                caught_up = await self._copy_chunks(source, target, batch_size, ids=missing)
+                for start in range(0, len(extra), batch_size):
+                    await self._executor.run_write(target.delete, ids=extra[start:start + batch_size])
+                await self._executor.run_write(self._finish_rebuild, name, source_name, temp)
+                if name == self.collection_name:
+                    self._collection = target
+                else:
+                    self._shards[name] = target
+        except Exception:
+            async with self._writing():
+                await self._executor.run_write(self._abandon_rebuild, name, temp)
+            raise
+        return {
+            "chunks": len(source_ids),
+            "copied": copied + caught_up,
+            "caught_up": caught_up,
+            "removed": len(extra),
+            "collection": temp,
+            "hnsw": self._hnsw.params_for(name),
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+
+    async def _copy_chunks(
+        self, source, target, batch_size: int, ids: list[str] | None = None, locked: bool = False
+    ) -> int:
+        """Copy chunks with their stored vectors (all, or just ``ids``). Returns the count.
+
+        With ``locked``, each batch is read and written under the write locks.
+        """
+        include = ["documents", "metadatas", "embeddings"]
+        copied = offset = 0
+        while True:
+            if ids is not None and offset >= len(ids):
+                break
+            async with self._writing() if locked else _no_lock():
+                if ids is None:
+                    page, _ = await self._executor.run(
+                        source.get, limit=batch_size, offset=offset, include=include
+                    )
+                else:
+                    page, _ = await self._executor.run(
+                        source.get, ids=ids[offset:offset + batch_size], include=include
+                    )
+                page_ids = page.get("ids") or []
+                if page_ids:
+                    await self._executor.run_write(
+                        target.upsert,
+                        ids=page_ids,
+                        documents=page.get("documents") or [""] * len(page_ids),
+                        metadatas=page.get("metadatas") or [None] * len(page_ids),
+                        embeddings=np.asarray(page["embeddings"], dtype=np.float32),
+                    )
+            if not page_ids:
+                if ids is None:
+                    break
+                offset += batch_size
+                continue
+            copied += len(page_ids)
+            offset += len(page_ids) if ids is None else batch_size
+        return copied
+
+    async def _chunk_ids_of(self, collection, batch_size: int) -> set[str]:
+        ids: set[str] = set()
+        offset = 0
+        while True:
+            page, _ = await self._executor.run(
+                collection.get, limit=batch_size, offset=offset, include=[]
+            )
+            page_ids = page.get("ids") or []
+            if not page_ids:
+                return ids
+            ids.update(page_ids)
+            offset += len(page_ids)
+
+    def _start_rebuild(self, name: str, temp: str) -> tuple[str, Any, Any]:
+        """Create ``temp`` and start mirroring writes to ``name`` into it; under the write locks."""
+        source_name = aliases.resolve(self._client, name)
+        source = self._client.get_collection(source_name)
+        unfinished = aliases.rebuilding(self._client).get(name)
+        if unfinished:
+            logger.warning("Discarding unfinished rebuild %s of collection %s", unfinished, name)
+        pattern = re.compile(re.escape(f"{REBUILD_PREFIX}{name}-") + "[0-9a-f]{8}")
+        for collection in self._client.list_collections():
+            if collection.name != source_name and pattern.fullmatch(collection.name):
+                self._client.delete_collection(collection.name)
+        target = self._client.get_or_create_collection(name=temp, metadata=self._hnsw.metadata_for(name))
+        aliases.mark_rebuilding(self._client, name, temp)
+        return source_name, source, target
+
+    def _finish_rebuild(self, name: str, source_name: str, temp: str) -> None:
+        """Point ``name`` at ``temp`` and drop the old collection; under the write locks."""
+        if aliases.resolve(self._client, name) != source_name:
+            raise RuntimeError(f"Collection {name} was swapped during the rebuild")
+        if aliases.rebuilding(self._client).get(name) != temp:
+            raise RuntimeError(f"Rebuild of collection {name} was taken over by another run")
+        aliases.point(self._client, name, temp)
+        self._client.delete_collection(source_name)
+
+    def _abandon_rebuild(self, name: str, temp: str) -> None:
+        """Stop mirroring writes into ``temp`` and drop it, unless it went live."""
+        if aliases.rebuilding(self._client).get(name) == temp:
+            aliases.mark_rebuilding(self._client, name, None)
+        live = aliases.resolve(self._client, name) == temp
+        if not live and temp in {c.name for c in self._client.list_collections()}:
+            self._client.delete_collection(temp)
+
+    async def _save_keyword_index(self, force: bool = False) -> None:
+        if self._bm25 is None or not self._bm25.path:
             return
         try:
-            collection.delete(where={"document_id": document_id})
+            if force:
+                await self._executor.run_write(self._bm25.save)
+            else:
+                await self._executor.run_write(self._bm25.maybe_save, self.keyword_save_interval)
         except Exception:
-            logger.warning("Failed to delete chunks for document %s from ChromaDB", document_id, exc_info=True)
+            logger.warning("Failed to persist BM25 index", exc_info=True)
+
+    async def _bump_cache_generation(self) -> None:
+        """Invalidate cached results and neighbour chunks after a write."""
+        if self._cache is not None:
+            await self._cache.bump(self.collection_name)
+        if self._neighbor_cache is not None:
+            self._neighbor_cache.clear()
+        if self._documents is not None:
+            self._documents.clear()
+
+    def stats(self) -> dict[str, Any]:
+        """Return runtime statistics for the retrieval path."""
+        return {
+            "executor": self._executor.stats(),
+            "cache": self._cache.stats() if self._cache is not None else None,
+            "rewriter": self._rewriter.stats(),
+            "keyword_index": self._bm25.stats() if self._bm25 is not None else None,
+            "embedder": self._embedder.stats() if self._embedder is not None else None,
+            "embedding_store": (
+                self._embedding_store.stats() if self._embedding_store is not None else None
+            ),
+            "neighbors": {
+                "window": self.neighbor_window,
+                "cache_entries": len(self._neighbor_cache) if self._neighbor_cache is not None else 0,
+                "cache_hits": self._neighbor_hits,
+                "cache_misses": self._neighbor_misses,
+            },
+            "document_resolver": self._documents.stats() if self._documents is not None else None,
+            "shards": (
+                {
+                    "key": self._router.shard_key,
+                    "collections": sorted(self._shards),
+                }
+                if self._router is not None else None
+            ),
+            "collection": {
+                "revalidations": self._revalidations,
+                "consecutive_failures": self._consecutive_failures,
+                "backing_off": time.monotonic() < self._retry_after,
+                "mode": self.chroma_mode,
+                "hnsw": {
+                    "defaults": self._hnsw.defaults,
+                    "overrides": self._hnsw.overrides,
+                    "rebuilds": self._rebuilds,
+                },
+                "quantized": (
+                    self._collection.stats()
+                    if isinstance(self._collection, QuantizedCollection) else None
+                ),
+            },
+        }
 
     def close(self):
+        if self._bm25 is not None and self._bm25.path:
+            try:
+                self._bm25.save()
+            except Exception:
+                logger.warning("Failed to persist BM25 index on shutdown", exc_info=True)
+            self._bm25.close()
+        self._executor.shutdown()
         self._client = None
         self._collection = None
+        self._shards = {}
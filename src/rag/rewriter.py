@@ -1,26 +1,85 @@
 """Query rewriter for RAG enhancement."""
 
+from __future__ import annotations
+
+import asyncio
+import logging
 from typing import Any
 
+from src.rag.cache import TwoTierCache, hash_key, normalize_query
+
+logger = logging.getLogger(__name__)
+
 
 class QueryRewriter:
-    """Expand and improve search queries for better retrieval."""
+    """Expand and improve search queries for better retrieval.
 
-    def __init__(self, llm: Any | None = None):
+    Rewrites are memoized in an optional ``TwoTierCache`` keyed on
+    (query, subject, grade_level, model). With ``deadline_ms`` set, a rewrite
+    that takes longer falls back to the original query; the late answer is
+    still written to the cache so the next identical query gets it.
+    """
+
+    def __init__(
+        self,
+        llm: Any | None = None,
+        cache: TwoTierCache | None = None,
+        deadline_ms: int | None = None,
+    ):
         self.llm = llm
+        self.cache = cache
+        self.deadline_ms = deadline_ms or None
+        self.deadline_misses = 0
+        self._pending: set[asyncio.Task] = set()
 
-    async def rewrite(self, query: str, context: dict | None = None) -> str:
+    async def rewrite(
+        self, query: str, context: dict | None = None, use_cache: bool = True
+    ) -> str:
         """Rewrite query with synonyms or decomposition. Falls back to original if no LLM."""
         if self.llm is None:
             return query
 
+        context = context or {}
+        key = hash_key(
+            normalize_query(query),
+            context.get("subject"),
+            context.get("grade_level"),
+            self._model_id(),
+        )
+        if self.cache is not None and use_cache:
+            cached = await self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        task = asyncio.ensure_future(self._rewrite_with_llm(query, context))
+        if self.deadline_ms is None:
+            rewritten = await task
+        else:
+            try:
+                rewritten = await asyncio.wait_for(
+                    asyncio.shield(task), timeout=self.deadline_ms / 1000
+                )
+            except TimeoutError:
+                self.deadline_misses += 1
+                late = asyncio.ensure_future(self._store_late(task, key))
+                self._pending.add(late)
+                late.add_done_callback(self._pending.discard)
+                return query
+
+        if rewritten is None:
+            return query
+        if self.cache is not None:
+            await self.cache.set(key, rewritten)
+        return rewritten
+
+    async def _rewrite_with_llm(self, query: str, context: dict) -> str | None:
+        """Run the LLM rewrite. Returns None on failure so errors are never cached."""
         try:
             ctx_str = ""
-            if context:
-                if context.get("subject"):
-                    ctx_str += f" Subject: {context['subject']}."
-                if context.get("grade_level"):
-                    ctx_str += f" Grade level: {context['grade_level']}."
+            if context.get("subject"):
+                ctx_str += f" Subject: {context['subject']}."
+            if context.get("grade_level"):
+                ctx_str += f" Grade level: {context['grade_level']}."
 
             prompt = (
                 "Rewrite this educational search query to improve retrieval. "
@@ -30,6 +89,27 @@ class QueryRewriter:
             )
             response = await self.llm.ainvoke(prompt)
             content = response.content if hasattr(response, "content") else str(response)
-            return content.strip() or query
+            return content.strip() or None
         except Exception:
-            return query
+            logger.warning("LLM query rewrite failed; using the original query", exc_info=True)
+            return None
+
+    async def _store_late(self, task: asyncio.Task, key: str) -> None:
+        """Cache a rewrite that finished after the deadline."""
+        rewritten = await task  # never raises: failures come back as None
+        if rewritten and self.cache is not None:
+            await self.cache.set(key, rewritten)
+
+    def _model_id(self) -> str:
+        return str(
+            getattr(self.llm, "model", None)
+            or getattr(self.llm, "model_name", None)
+            or type(self.llm).__name__
+        )
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "cache": self.cache.stats() if self.cache is not None else None,
+            "deadline_ms": self.deadline_ms,
+            "deadline_misses": self.deadline_misses,
+        }
@@ -0,0 +1,113 @@
+"""Routing of chunks and queries to per-subject (or per-grade) collections."""
+
+from __future__ import annotations
+
+import re
+from typing import Any
+
+SHARD_SEPARATOR = "__"
+
+
+class ShardRouter:
+    """Map a metadata field (``subject`` by default) to its own Chroma collection.
+
+    Shard collections are named ``{base}__{value}``, e.g.
+    ``educational_content__math``; chunks without the field go to
+    ``{base}__{default_shard}``. A query whose filter pins the field to one
+    value is answered by that shard alone, without the ``where`` clause on
+    it; any other query fans out to every shard and the results are merged.
+    """
+
+    def __init__(
+        self,
+        base_name: str = "educational_content",
+        shard_key: str = "subject",
+        default_shard: str = "general",
+    ):
+        self.base_name = base_name
+        self.shard_key = shard_key
+        self.default_shard = default_shard
+
+    @property
+    def prefix(self) -> str:
+        return f"{self.base_name}{SHARD_SEPARATOR}"
+
+    def collection_name(self, value: Any) -> str:
+        """Collection name for a shard key value (``None`` -> default shard)."""
+        slug = ""
+        if value is not None:
+            # Chroma names: [a-zA-Z0-9._-], alphanumeric at both ends, no ".."
+            slug = re.sub(r"[^a-z0-9._-]+", "_", str(value).strip().lower())
+            slug = re.sub(r"\.{2,}", ".", slug).strip("._-")
+        return f"{self.prefix}{slug or self.default_shard}"
+
+    def shard_for(self, metadata: dict[str, Any] | None) -> str:
+        """Collection a chunk with ``metadata`` is stored in."""
+        value = (metadata or {}).get(self.shard_key)
+        return self.collection_name(value if value not in ("", None) else None)
+
+    def is_shard(self, name: str) -> bool:
+        return name.startswith(self.prefix) and len(name) > len(self.prefix)
+
+    def group(self, metadatas: list[dict[str, Any]]) -> dict[str, list[int]]:
+        """Positions of ``metadatas`` grouped by target collection, in input order."""
+        groups: dict[str, list[int]] = {}
+        for i, meta in enumerate(metadatas):
+            groups.setdefault(self.shard_for(meta), []).append(i)
+        return groups
+
+    def route(self, where: dict[str, Any] | None) -> tuple[str | None, dict[str, Any] | None]:
+        """Return (shard collection or None for fan-out, where clause for that search).
+
+        Only an equality on the shard key (``{key: value}`` or
+        ``{key: {"$eq": value}}``) pins a single shard; the pinned condition is
+        dropped from the filter since every chunk in the shard satisfies it.
+        """
+        if not where or self.shard_key not in where:
+            return None, where or None
+        value = where[self.shard_key]
+        if isinstance(value, dict):
+            if set(value) != {"$eq"}:
+                return None, where
+            value = value["$eq"]
+        if not isinstance(value, str):
+            return None, where
+        rest = {key: cond for key, cond in where.items() if key != self.shard_key}
+        return self.collection_name(value), rest or None
+
+
+def merge_query_results(results: list[dict[str, Any]], n_results: int) -> dict[str, Any]:
+    """Merge batched ``collection.query`` results from several shards.
+
+    Row ``i`` of the output holds the ``n_results`` nearest hits for query
+    ``i`` over all shards, closest first. Distances are comparable because
+    every shard uses the same embedding model and space.
+    """
+    fields = [
+        field
+        for field in ("ids", "documents", "metadatas", "distances", "embeddings")
+        if results and all(r.get(field) is not None for r in results)
+    ]
+    num_queries = max((len(r.get("ids") or []) for r in results), default=0)
+    merged: dict[str, Any] = {field: [] for field in fields}
+    for q in range(num_queries):
+        hits = []
+        for r in results:
+            if q >= len(r.get("ids") or []):
+                continue
+            for j in range(len(r["ids"][q])):
+                hits.append({field: r[field][q][j] for field in fields})
+        hits.sort(key=lambda hit: hit.get("distances", 0.0))
+        for field in fields:
+            merged[field].append([hit[field] for hit in hits[:n_results]])
+    return merged
+
+
+def merge_get_results(results: list[dict[str, Any]]) -> dict[str, Any]:
+    """Concatenate ``collection.get`` results from several shards."""
+    fields = [
+        field
+        for field in ("ids", "documents", "metadatas", "embeddings")
+        if results and all(r.get(field) is not None for r in results)
+    ]
+    return {field: [value for r in results for value in r[field]] for field in fields}
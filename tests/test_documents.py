@@ -11,6 +11,8 @@ import pytest
 
 from src.documents.chunker import SemanticChunker
 from src.documents.enricher import ContentEnricher
+from src.documents.metadata import DocumentMetadataResolver
+from src.documents.reconciler import OrphanReconciler
 from src.documents.parsers.text import TextParser
 from src.documents.processor import DocumentProcessor
 from src.models.document import Document
@@ -127,6 +129,43 @@ class TestQueryRewriter:
         result = await rewriter.rewrite("explain gravity", context={"subject": "physics"})
         assert result == "explain gravity"
 
+    @pytest.mark.asyncio
+    async def test_rewrite_is_memoized(self):
+        """Repeated queries should be served from the rewrite cache."""
+        from src.rag.cache import TwoTierCache
+
+        llm = MagicMock()
+        llm.model = "test-model"
+        llm.ainvoke = AsyncMock(return_value=MagicMock(content="photosynthesis light reactions"))
+        rewriter = QueryRewriter(llm=llm, cache=TwoTierCache())
+
+        first = await rewriter.rewrite("What is photosynthesis?", {"subject": "biology"})
+        second = await rewriter.rewrite("what is  photosynthesis?", {"subject": "biology"})
+
+        assert first == second == "photosynthesis light reactions"
+        assert llm.ainvoke.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_deadline_falls_back_and_caches_late_rewrite(self):
+        """A slow rewrite returns the original query but fills the cache for next time."""
+        import asyncio
+
+        from src.rag.cache import TwoTierCache
+
+        async def slow_invoke(prompt):
+            await asyncio.sleep(0.05)
+            return MagicMock(content="expanded gravity query")
+
+        llm = MagicMock()
+        llm.model = "test-model"
+        llm.ainvoke = slow_invoke
+        rewriter = QueryRewriter(llm=llm, cache=TwoTierCache(), deadline_ms=5)
+
+        assert await rewriter.rewrite("gravity") == "gravity"
+        assert rewriter.deadline_misses == 1
+        await asyncio.sleep(0.1)
+        assert await rewriter.rewrite("gravity") == "expanded gravity query"
+
 
 # --- Result Ranker tests ---
 
@@ -148,6 +187,46 @@ class TestResultRanker:
         ranker = ResultRanker()
         assert ranker.rank([], "test query") == []
 
+    def test_rank_scores_full_content(self):
+        """Keyword overlap should use the full chunk text, not the truncated preview."""
+        ranker = ResultRanker()
+        long_text = "Introduction. " * 30 + "Osmosis moves water across membranes."
+        results = [
+            {"content_preview": "Unrelated", "distance": 0.3},
+            {"content": long_text, "content_preview": long_text[:200], "distance": 0.35},
+        ]
+        ranked = ranker.rank(results, "osmosis water membranes")
+        assert ranked[0]["content"] == long_text
+        assert ranked[0]["_rank_score"] > ranked[1]["_rank_score"]
+
+    def test_rank_subject_weights(self):
+        """Per-subject weights should override the defaults."""
+        ranker = ResultRanker(subject_weights={"history": {"semantic": 0.2, "keyword": 0.2, "authority": 0.6}})
+        results = [
+            {"content_preview": "treaty of versailles", "distance": 0.2,
+             "metadata": {"source_type": "crawl"}},
+            {"content_preview": "treaty of versailles", "distance": 0.3,
+             "metadata": {"source_type": "wikipedia"}},
+        ]
+        assert ranker.rank(results, "versailles")[0]["metadata"]["source_type"] == "crawl"
+        ranked = ranker.rank(results, "versailles", subject="History")
+        assert ranked[0]["metadata"]["source_type"] == "wikipedia"
+
+    def test_rank_leaves_input_unmodified(self):
+        """Ranking returns scored copies; cached result dicts must not change."""
+        ranker = ResultRanker()
+        results = [
+            {"content": "osmosis moves water", "distance": 0.4},
+            {"content": "water water osmosis", "distance": 0.2},
+            {"content": "", "distance": 0.1},
+        ]
+        ranked = ranker.rank(results, "osmosis water")
+        assert all("_rank_score" not in r for r in results)
+        assert [r["content"] for r in ranked] == ["water water osmosis", "osmosis moves water", ""]
+        assert ranker.DEFAULT_WEIGHTS["keyword"] == 0.3
+        with pytest.raises(TypeError):
+            ranker.DEFAULT_WEIGHTS["keyword"] = 1.0
+
 
 # --- Document Model test ---
 
@@ -166,19 +245,78 @@ class TestDocumentModel:
         assert hasattr(Document, "chunk_count")
         assert hasattr(Document, "status")
         assert hasattr(Document, "metadata_")
+        assert hasattr(Document, "vector_document_id")
         assert hasattr(Document, "uploaded_by")
         assert hasattr(Document, "created_at")
         assert hasattr(Document, "processed_at")
         assert Document.__tablename__ == "documents"
 
 
+class TestChunkMetadata:
+    def test_clean_metadata_keeps_ids_and_filter_fields(self):
+        meta = {
+            "document_id": "d1", "chunk_index": 3, "total_chunks": 9, "subject": "math",
+            "title": "Algebra", "source": "/uploads/a.pdf", "key_terms": ["x", "y"],
+            "summary": "long summary", "llm_analysis": "{...}",
+        }
+        assert DocumentProcessor._clean_metadata(meta) == {
+            "document_id": "d1", "chunk_index": 3, "total_chunks": 9, "subject": "math",
+        }
+
+    @pytest.mark.asyncio
+    async def test_resolver_batches_and_caches(self):
+        session = AsyncMock()
+        rows = MagicMock()
+        rows.all.return_value = [
+            ("d1", "Algebra", "a.pdf", "math", "9", {"source": "/uploads/a.pdf", "summary": "s"}),
+        ]
+        session.execute.return_value = rows
+        factory = MagicMock()
+        factory.return_value.__aenter__.return_value = session
+        resolver = DocumentMetadataResolver(factory)
+
+        first = await resolver.resolve(["d1", "d2", "d1"])
+        second = await resolver.resolve(["d1", "d2"])
+
+        assert first == second
+        assert first["d1"]["title"] == "Algebra"
+        assert first["d1"]["source"] == "/uploads/a.pdf"
+        assert "d2" not in first
+        session.execute.assert_awaited_once()
+
+
+
+class TestOrphanReconciler:
+    @pytest.mark.asyncio
+    async def test_orphans_are_deleted_only_after_two_runs(self):
+        retriever = MagicMock()
+        retriever.scan_documents = AsyncMock(return_value={"live": 2, "gone": 3})
+        retriever.delete_documents = AsyncMock(return_value={"deleted": True})
+        session = AsyncMock()
+        rows = MagicMock()
+        rows.scalars.return_value.all.return_value = ["live"]
+        session.execute.return_value = rows
+        factory = MagicMock()
+        factory.return_value.__aenter__.return_value = session
+        reconciler = OrphanReconciler(retriever, factory, delete=True)
+
+        first = await reconciler.run_once()
+        assert (first["orphans"], first["deleted"]) == (1, 0)
+        retriever.delete_documents.assert_not_awaited()
+
+        second = await reconciler.run_once()
+        assert second["deleted"] == 1
+        retriever.delete_documents.assert_awaited_once_with({"gone": 3}, batch_size=1000)
+
+
 # --- API Endpoint tests ---
 
 
 class TestUploadEndpoint:
     @pytest.mark.asyncio
-    async def test_upload_endpoint(self):
+    async def test_upload_endpoint(self, tmp_path, monkeypatch):
         """POST /upload should accept a file and return document info."""
+        monkeypatch.setattr("src.api.routers.content.UPLOAD_DIR", str(tmp_path))
         from contextlib import asynccontextmanager
         from httpx import ASGITransport, AsyncClient
 
@@ -237,6 +375,7 @@ class TestUploadEndpoint:
             assert "document_id" in data
             assert data["status"] in ("completed", "failed", "processing")
             assert data["filename"] == "test.txt"
+            assert [p.name.endswith("_test.txt") for p in tmp_path.iterdir()] == [True]
 
         app.dependency_overrides.clear()
 
@@ -1,11 +1,14 @@
 """Tests for LLM factory and models endpoint."""
 
+import asyncio
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from httpx import ASGITransport, AsyncClient
 
-from src.llm.factory import LLMFactory
+from src.llm.factory import LLMFactory, LLMPool
+from src.llm.registry import ProviderRegistry, RoutedLLM
+from src.llm.scheduler import LLMScheduler, ScheduledLLM
 
 
 # ---------------------------------------------------------------------------
@@ -95,6 +98,308 @@ class TestLLMFactory:
             mock_create.assert_called_once_with("phi3:mini", 0.7, 4096)
 
 
+# ---------------------------------------------------------------------------
+# Client pool tests
+# ---------------------------------------------------------------------------
+
+
+class TestLLMPool:
+    """Tests for LLMFactory.get() and the LLMPool it draws from."""
+
+    @pytest.fixture(autouse=True)
+    def fresh_pool(self):
+        LLMFactory._pool = LLMPool(max_size=2)
+        LLMFactory._scheduler = LLMScheduler()
+        yield
+        LLMFactory._pool = None
+        LLMFactory._scheduler = None
+
+    @patch("src.llm.factory.settings")
+    def test_get_reuses_model_for_same_key(self, mock_settings):
+        mock_settings.LLM_PROVIDER = "ollama"
+        mock_settings.OLLAMA_MODEL = "llama3.2:3b"
+
+        with patch("src.llm.factory.LLMFactory._create_ollama") as mock_create:
+            mock_create.side_effect = lambda *args: MagicMock()
+            first = LLMFactory.get()
+            second = LLMFactory.get(provider="ollama", model="llama3.2:3b")
+            other = LLMFactory.get(temperature=0.0)
+
+        assert isinstance(first, ScheduledLLM)
+        assert first.llm is second.llm
+        assert other.llm is not first.llm
+        assert mock_create.call_count == 2
+        assert LLMFactory.pool().stats()["hits"] == 1
+
+    @patch("src.llm.factory.settings")
+    def test_assessment_generator_is_scheduled_as_background(self, mock_settings):
+        mock_settings.LLM_PROVIDER = "ollama"
+        mock_settings.OLLAMA_MODEL = "llama3.2:3b"
+
+        from src.agents.assessment import AssessmentAgent
+
+        with patch("src.llm.factory.LLMFactory._create_ollama") as mock_create:
+            mock_create.side_effect = lambda *args: MagicMock()
+            agent = AssessmentAgent()
+
+        assert isinstance(agent.generator.llm, ScheduledLLM)
+        assert agent.generator.llm.priority == "background"
+        assert agent.grader.llm.priority == "grading"
+        assert agent.generator.llm.llm is agent.llm.llm  # same pooled client
+        assert mock_create.call_count == 1
+
+    @patch("src.llm.factory.settings")
+    def test_pool_evicts_least_recently_used(self, mock_settings):
+        mock_settings.LLM_PROVIDER = "ollama"
+        mock_settings.OLLAMA_MODEL = "llama3.2:3b"
+
+        with patch("src.llm.factory.LLMFactory._create_ollama") as mock_create:
+            mock_create.side_effect = lambda *args: MagicMock()
+            a = LLMFactory.get(model="a").llm
+            LLMFactory.get(model="b")
+            assert LLMFactory.get(model="a").llm is a  # "b" is now least recent
+            LLMFactory.get(model="c")
+            assert LLMFactory.get(model="a").llm is a
+            LLMFactory.get(model="b")
+
+        assert len(LLMFactory.pool()) == 2
+        assert LLMFactory.pool().stats()["evictions"] == 2
+        assert mock_create.call_count == 4
+
+    def test_get_unsupported_provider(self):
+        with pytest.raises(ValueError, match="Unsupported LLM provider"):
+            LLMFactory.get(provider="unsupported")
+
+
+class _RateLimited(Exception):
+    status_code = 429
+
+    def __init__(self):
+        super().__init__("429 Too Many Requests")
+        self.response = MagicMock(headers={"retry-after": "0"})
+
+
+class TestLLMScheduler:
+    """Tests for LLMScheduler admission, budgets and backoff."""
+
+    async def test_queued_calls_start_by_priority(self):
+        scheduler = LLMScheduler(concurrency={"ollama": 1})
+        held = await scheduler.acquire("ollama", "interactive", 10)
+        started: list[str] = []
+
+        async def call(priority):
+            entry = await scheduler.acquire("ollama", priority, 10)
+            started.append(priority)
+            scheduler.release("ollama", entry)
+
+        tasks = [asyncio.create_task(call(p)) for p in ("background", "grading", "interactive")]
+        await asyncio.sleep(0)
+        assert scheduler.stats()["ollama"]["queued"] == {"interactive": 1, "grading": 1, "background": 1}
+
+        scheduler.release("ollama", held)
+        await asyncio.gather(*tasks)
+        assert started == ["interactive", "grading", "background"]
+
+    async def test_concurrency_limit(self):
+        scheduler = LLMScheduler(concurrency={"anthropic": 2})
+        running = peak = 0
+
+        async def call():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return "ok"
+
+        results = await asyncio.gather(
+            *(scheduler.run("anthropic", "grading", 10, call) for _ in range(6))
+        )
+        assert results == ["ok"] * 6
+        assert peak == 2
+        assert scheduler.stats()["anthropic"]["completed"]["grading"] == 6
+
+    async def test_token_budget_waits_for_settled_usage(self):
+        scheduler = LLMScheduler(concurrency={"openai": 4}, tokens_per_minute={"openai": 100})
+        first = await scheduler.acquire("openai", "interactive", 80)
+        second = asyncio.create_task(scheduler.acquire("openai", "interactive", 50))
+        await asyncio.sleep(0)
+        assert not second.done()
+
+        # The call used fewer tokens than reserved, which frees budget
+        scheduler.release("openai", first, tokens_used=20)
+        entry = await asyncio.wait_for(second, 1)
+        scheduler.release("openai", entry)
+        assert scheduler.stats()["openai"]["tokens_last_minute"] == 70
+
+    async def test_rate_limit_backs_off_and_retries(self):
+        scheduler = LLMScheduler(max_retries=2)
+        attempts = 0
+
+        async def call():
+            nonlocal attempts
+            attempts += 1
+            if attempts == 1:
+                raise _RateLimited()
+            return "ok"
+
+        assert await scheduler.run("anthropic", "interactive", 10, call) == "ok"
+        stats = scheduler.stats()["anthropic"]
+        assert attempts == 2
+        assert stats["rate_limited"] == 1
+        assert stats["active"] == 0
+
+    async def test_other_errors_are_not_retried(self):
+        scheduler = LLMScheduler()
+        call = AsyncMock(side_effect=RuntimeError("boom"))
+
+        with pytest.raises(RuntimeError):
+            await scheduler.run("ollama", "interactive", 10, call)
+        assert call.await_count == 1
+        assert scheduler.stats()["ollama"]["active"] == 0
+
+    async def test_scheduled_llm_settles_reported_usage(self):
+        scheduler = LLMScheduler(tokens_per_minute={"ollama": 10_000})
+        model = MagicMock()
+        model.ainvoke = AsyncMock(return_value=MagicMock(content="hi", usage_metadata={"total_tokens": 42}))
+        model.model = "llama3.2:3b"
+        llm = ScheduledLLM(model, "ollama", "background", 4096, scheduler)
+
+        response = await llm.ainvoke("Hello")
+
+        assert response.content == "hi"
+        assert llm.model == "llama3.2:3b"
+        assert scheduler.stats()["ollama"]["tokens_last_minute"] == 42
+
+    def test_unknown_priority(self):
+        with pytest.raises(ValueError, match="Unknown LLM priority"):
+            ScheduledLLM(MagicMock(), "ollama", "urgent", 10, LLMScheduler())
+
+
+def _model(reply: str, delay: float = 0.0, error: Exception | None = None):
+    async def ainvoke(input, *args, **kwargs):
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return MagicMock(content=reply)
+
+    model = MagicMock()
+    model.ainvoke = ainvoke
+    return model
+
+
+class TestProviderRegistry:
+    """Tests for ProviderRegistry ranking and RoutedLLM failover / hedging."""
+
+    def test_ranked_prefers_fast_healthy_providers(self):
+        registry = ProviderRegistry()
+        for _ in range(10):
+            registry.record("ollama", 900.0, ok=True)
+            registry.record("anthropic", 300.0, ok=True)
+            registry.record("openai", 100.0, ok=False)
+
+        assert registry.ranked(["ollama", "anthropic", "openai"]) == ["anthropic", "ollama", "openai"]
+
+        registry.health("anthropic").available = False
+        assert registry.ranked(["ollama", "anthropic", "openai"]) == ["ollama", "openai", "anthropic"]
+
+    def test_unmeasured_providers_keep_configured_order(self):
+        registry = ProviderRegistry()
+        assert registry.ranked(["openai", "ollama"]) == ["openai", "ollama"]
+
+    async def test_fails_over_to_next_provider(self):
+        registry = ProviderRegistry()
+        registry._stale = lambda: False
+        models = {"ollama": _model("", error=ConnectionError("down")), "anthropic": _model("from anthropic")}
+        llm = RoutedLLM(registry, ["ollama", "anthropic"], models.__getitem__)
+
+        response = await llm.ainvoke("Hi")
+
+        assert response.content == "from anthropic"
+        assert registry.health("ollama").error_rate == 1.0
+        assert registry.stats()["failovers"] == 1
+        assert registry.ranked(["ollama", "anthropic"]) == ["anthropic", "ollama"]
+
+    async def test_hedges_slow_primary(self):
+        registry = ProviderRegistry(hedge_after_ms=20)
+        registry._stale = lambda: False
+        models = {"ollama": _model("slow", delay=1.0), "anthropic": _model("fast", delay=0.01)}
+        llm = RoutedLLM(registry, ["ollama", "anthropic"], models.__getitem__)
+
+        response = await asyncio.wait_for(llm.ainvoke("Hi"), 0.5)
+
+        assert response.content == "fast"
+        assert registry.stats()["hedges"] == 1
+        assert registry.stats()["hedge_wins"] == 1
+        # The cancelled primary counts as a slow success, not an error
+        assert registry.health("ollama").error_rate == 0.0
+        assert registry.health("ollama").percentile(0.5) >= 20
+
+    async def test_provider_losing_hedges_is_demoted(self):
+        registry = ProviderRegistry(hedge_after_ms=20)
+        registry._stale = lambda: False
+        for _ in range(5):
+            registry.record("ollama", 1.0, ok=True)  # stale, optimistic samples
+        models = {"ollama": _model("slow", delay=1.0), "anthropic": _model("fast", delay=0.005)}
+        llm = RoutedLLM(registry, ["ollama", "anthropic"], models.__getitem__)
+
+        for _ in range(10):
+            if registry.ranked(["ollama", "anthropic"])[0] == "anthropic":
+                break
+            assert (await asyncio.wait_for(llm.ainvoke("Hi"), 0.5)).content == "fast"
+
+        assert registry.ranked(["ollama", "anthropic"]) == ["anthropic", "ollama"]
+        assert (await llm.ainvoke("Hi")).content == "fast"
+        assert registry.stats()["hedges"] <= 10
+
+    async def test_fast_primary_is_not_hedged(self):
+        registry = ProviderRegistry(hedge_after_ms=200)
+        registry._stale = lambda: False
+        backup = _model("backup")
+        models = {"ollama": _model("primary"), "anthropic": backup}
+        llm = RoutedLLM(registry, ["ollama", "anthropic"], models.__getitem__)
+
+        assert (await llm.ainvoke("Hi")).content == "primary"
+        assert registry.stats()["hedges"] == 0
+
+    async def test_stream_fails_over_before_first_chunk(self):
+        async def broken(input):
+            raise ConnectionError("down")
+            yield  # pragma: no cover
+
+        async def working(input):
+            yield MagicMock(content="ok")
+
+        registry = ProviderRegistry()
+        registry._stale = lambda: False
+        models = {"ollama": MagicMock(astream=broken), "openai": MagicMock(astream=working)}
+        llm = RoutedLLM(registry, ["ollama", "openai"], models.__getitem__)
+
+        chunks = [chunk.content async for chunk in llm.astream("Hi")]
+
+        assert chunks == ["ok"]
+        assert registry.health("ollama").error_rate == 1.0
+
+    @patch("src.llm.registry.httpx.AsyncClient")
+    async def test_discovery_is_cached(self, mock_client_cls):
+        client = MagicMock()
+        client.get = AsyncMock(return_value=MagicMock(
+            status_code=200, json=lambda: {"models": [{"name": "llama3.2:3b"}]}
+        ))
+        mock_client_cls.return_value.__aenter__ = AsyncMock(return_value=client)
+        mock_client_cls.return_value.__aexit__ = AsyncMock(return_value=False)
+        registry = ProviderRegistry(ttl_seconds=60)
+
+        first = await registry.discover()
+        await registry.discover()
+
+        assert client.get.await_count == 1
+        ollama = next(entry for entry in first if entry["provider"] == "ollama")
+        assert ollama["available"] is True
+        assert ollama["models"] == ["llama3.2:3b"]
+        assert "health" in ollama
+
+
 # ---------------------------------------------------------------------------
 # Internal _create_* tests (verify actual LLM construction)
 # ---------------------------------------------------------------------------
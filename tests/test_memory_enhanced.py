@@ -202,6 +202,24 @@ class TestStudentContextBuilder:
         assert len(ctx["struggle_points"]) == 1
         assert ctx["struggle_points"][0]["topic"] == "Calculus"
         assert ctx["knowledge_gaps"] == []
+        assert "degraded" not in ctx
+
+    async def test_failed_knowledge_gap_lookup_is_reported(self):
+        """A failing Chroma lookup should leave the other tiers intact and be listed as degraded."""
+        memory = AsyncMock()
+        memory.get_session_context = AsyncMock(return_value=None)
+        memory.get_conversation_history = AsyncMock(return_value=[])
+        memory.get_student_history = AsyncMock(return_value=[])
+        memory.get_student_mastery = AsyncMock(return_value=[{"topic": "Algebra", "mastery_score": 45.0}])
+        memory.get_struggle_points = AsyncMock(return_value=[])
+        memory.search_knowledge = AsyncMock(side_effect=ConnectionError("chroma down"))
+
+        builder = StudentContextBuilder(memory_manager=memory)
+        ctx = await builder.build_context(student_id="stu-1", session_id="sess-1")
+
+        assert ctx["knowledge_gaps"] == []
+        assert ctx["mastery_scores"][0]["topic"] == "Algebra"
+        assert ctx["degraded"] == ["knowledge_gaps"]
 
 
 # === Profile Endpoint Tests ===
@@ -0,0 +1,1367 @@
+"""Tests for the retrieval path: executor, caching, and retriever internals."""
+
+import asyncio
+import threading
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+import numpy as np
+import pytest
+
+from src.documents.chunker import SemanticChunker
+from src.memory.manager import MemoryManager
+from src.rag import aliases
+from src.rag.bm25 import BM25Index, reciprocal_rank_fusion
+from src.rag.cache import LRUCache, RetrievalCache
+from src.rag.client import create_chroma_client
+from src.rag.embedding_store import EmbeddingStore
+from src.rag.embeddings import EmbeddingCache, EmbeddingService
+from src.rag.executor import ChromaExecutor, VectorStoreTimeout
+from src.rag.hnsw import HNSWConfig
+from src.rag.ids import chunk_id, content_chunk_id, document_id_for
+from src.rag.locks import FileLock
+from src.rag.mmr import MMRDiversifier
+from src.rag.packer import ContextPacker, estimate_tokens
+from src.rag.quantized import QuantizedClient, QuantizedIndex, normalize_rows
+from src.rag.retriever import KnowledgeRetriever
+from src.rag.sharding import ShardRouter, merge_query_results
+
+
+def _query_result(docs: list[str], metas: list[dict] | None = None, dists: list[float] | None = None):
+    return {
+        "ids": [[f"id_{i}" for i in range(len(docs))]],
+        "documents": [docs],
+        "metadatas": [metas or [{} for _ in docs]],
+        "distances": [dists or [0.1 * (i + 1) for i in range(len(docs))]],
+    }
+
+
+def _make_retriever(collection: MagicMock | None = None, **kwargs) -> KnowledgeRetriever:
+    retriever = KnowledgeRetriever(**kwargs)
+    collection = collection or MagicMock()
+    retriever._client = MagicMock()
+    retriever._client.get_or_create_collection.return_value = collection
+    retriever._collection = collection
+    return retriever
+
+
+# --- ChromaExecutor ---
+
+
+class TestChromaExecutor:
+    async def test_run_returns_result_and_timing(self):
+        executor = ChromaExecutor(max_workers=2)
+        result, timing = await executor.run(lambda x: x * 2, 21)
+        assert result == 42
+        assert set(timing) == {"queue_wait_ms", "query_ms"}
+        assert executor.stats()["calls"] == 1
+        executor.shutdown()
+
+    async def test_run_executes_off_event_loop_thread(self):
+        executor = ChromaExecutor(max_workers=1)
+        loop_thread = threading.get_ident()
+        worker_thread, _ = await executor.run(threading.get_ident)
+        assert worker_thread != loop_thread
+        executor.shutdown()
+
+    async def test_run_times_out(self):
+        executor = ChromaExecutor(max_workers=1, timeout=0.05)
+        with pytest.raises(VectorStoreTimeout):
+            await executor.run(time.sleep, 0.5)
+        assert executor.stats()["timeouts"] == 1
+        executor.shutdown()
+
+    async def test_timed_out_call_keeps_its_slot_until_done(self):
+        executor = ChromaExecutor(max_workers=1, max_pending=1, timeout=0.05)
+        with pytest.raises(VectorStoreTimeout):
+            await executor.run(time.sleep, 0.3)
+        assert executor.stats()["in_flight"] == 1
+        assert executor.stats()["abandoned"] == 1
+
+        # The next call waits for the abandoned thread instead of queueing behind it
+        _, timing = await executor.run(lambda: None, timeout=1.0)
+        assert timing["queue_wait_ms"] >= 100
+        assert executor.stats()["in_flight"] == 0
+        assert executor.stats()["abandoned"] == 0
+        executor.shutdown()
+
+    async def test_writes_use_write_timeout(self):
+        executor = ChromaExecutor(max_workers=1, timeout=0.05)
+        result, _ = await executor.run_write(lambda: time.sleep(0.15) or "written")
+        assert result == "written"
+        executor.shutdown()
+
+
+# --- KnowledgeRetriever ---
+
+
+class TestRetrieverAsyncPath:
+    async def test_retrieve_reports_timing(self):
+        collection = MagicMock()
+        collection.query.return_value = _query_result(["Photosynthesis converts light."])
+        retriever = _make_retriever(collection)
+
+        result = await retriever.retrieve("photosynthesis", rewrite=False)
+
+        assert result["num_results"] == 1
+        assert "queue_wait_ms" in result["timing"]
+        assert "query_ms" in result["timing"]
+        collection.query.assert_called_once()
+
+    async def test_retrieve_timeout_returns_empty(self):
+        collection = MagicMock()
+        collection.query.side_effect = lambda **_: time.sleep(0.5)
+        retriever = _make_retriever(collection, executor=ChromaExecutor(timeout=0.05))
+
+        result = await retriever.retrieve("slow query", rewrite=False)
+
+        assert result["num_results"] == 0
+        assert result["sources"] == []
+
+    async def test_add_and_delete_chunks_use_executor(self):
+        collection = MagicMock()
+        retriever = _make_retriever(collection)
+
+        await retriever.add_chunks(ids=["a"], documents=["text"], metadatas=[{"document_id": "d"}])
+        await retriever.delete_document_chunks("d")
+
+        collection.upsert.assert_called_once()
+        collection.delete.assert_called_once_with(where={"document_id": "d"})
+        assert retriever.stats()["executor"]["calls"] >= 2
+
+
+class TestCollectionLiveness:
+    async def test_cached_handle_skips_count(self):
+        collection = MagicMock()
+        collection.query.return_value = _query_result(["Cells divide by mitosis."])
+        retriever = _make_retriever(collection)
+
+        for _ in range(3):
+            await retriever.retrieve("mitosis", rewrite=False)
+
+        collection.count.assert_not_called()
+        assert retriever._client.get_or_create_collection.call_count == 1
+        assert collection.query.call_count == 3
+
+    async def test_failure_forces_revalidation(self):
+        collection = MagicMock()
+        collection.query.side_effect = [RuntimeError("stale"), _query_result(["ok"])]
+        retriever = _make_retriever(collection)
+
+        await retriever.retrieve("first", rewrite=False)
+        await retriever.retrieve("second", rewrite=False)
+
+        assert retriever._client.get_or_create_collection.call_count == 2
+
+    def test_backoff_when_chroma_down(self):
+        retriever = _make_retriever(retry_backoff=60.0)
+        retriever._client.get_or_create_collection.side_effect = ConnectionError("down")
+        retriever._invalidate_collection()
+
+        assert retriever._get_collection() is None
+        assert retriever._get_collection() is None
+        assert retriever._client.get_or_create_collection.call_count == 1
+        assert retriever.stats()["collection"]["backing_off"] is True
+
+
+# --- Retrieval cache ---
+
+
+class TestRetrievalCache:
+    def test_lru_evicts_oldest(self):
+        cache = LRUCache(max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+
+    async def test_repeat_query_hits_cache(self):
+        collection = MagicMock()
+        collection.query.return_value = _query_result(["Newton's first law."])
+        cache = RetrievalCache()
+        retriever = _make_retriever(collection, cache=cache)
+
+        first = await retriever.retrieve("Newton  first LAW", rewrite=False)
+        second = await retriever.retrieve("newton first law", rewrite=False)
+
+        assert collection.query.call_count == 1
+        assert second["cached"] is True
+        assert second["context"] == first["context"]
+        assert cache.stats()["hits_local"] == 1
+        assert cache.stats()["misses"] == 1
+
+    async def test_ingest_invalidates_cache(self):
+        collection = MagicMock()
+        collection.query.return_value = _query_result(["Old content."])
+        retriever = _make_retriever(collection, cache=RetrievalCache())
+
+        await retriever.retrieve("content", rewrite=False)
+        await retriever.add_chunks(ids=["x"], documents=["New content."], metadatas=[{}])
+        await retriever.retrieve("content", rewrite=False)
+
+        assert collection.query.call_count == 2
+
+    async def test_bypass_flag_skips_cache(self):
+        collection = MagicMock()
+        collection.query.return_value = _query_result(["Cold query."])
+        retriever = _make_retriever(collection, cache=RetrievalCache())
+
+        await retriever.retrieve("cold", rewrite=False)
+        result = await retriever.retrieve("cold", rewrite=False, use_cache=False)
+
+        assert collection.query.call_count == 2
+        assert "cached" not in result
+
+
+# --- Batched retrieval ---
+
+
+class TestRetrieveMany:
+    async def test_single_round_trip_for_batch(self):
+        collection = MagicMock()
+        collection.query.return_value = {
+            "documents": [["Mitosis splits cells."], ["Gravity pulls masses together."]],
+            "metadatas": [[{}], [{}]],
+            "distances": [[0.2], [0.3]],
+        }
+        retriever = _make_retriever(collection)
+
+        results = await retriever.retrieve_many(["mitosis", "gravity"], rewrite=False)
+
+        collection.query.assert_called_once()
+        assert collection.query.call_args.kwargs["query_texts"] == ["mitosis", "gravity"]
+        assert [r["num_results"] for r in results] == [1, 1]
+        assert "Gravity" in results[1]["context"]
+        assert results[0]["timing"]["batch_size"] == 2
+
+    async def test_cached_queries_are_not_resent(self):
+        collection = MagicMock()
+        collection.query.side_effect = [
+            _query_result(["Cached answer."]),
+            _query_result(["Fresh answer."]),
+        ]
+        retriever = _make_retriever(collection, cache=RetrievalCache())
+
+        await retriever.retrieve("cached question", rewrite=False)
+        results = await retriever.retrieve_many(["cached question", "new question"], rewrite=False)
+
+        assert collection.query.call_args.kwargs["query_texts"] == ["new question"]
+        assert results[0]["cached"] is True
+        assert results[1]["context"] == "Fresh answer."
+
+
+# --- BM25 keyword index ---
+
+
+def _bm25_fixture(path=None) -> BM25Index:
+    index = BM25Index(path=path)
+    index.add(
+        ["d1_chunk_0", "d1_chunk_1", "d2_chunk_0"],
+        [
+            "Mitochondria are the powerhouse of the cell.",
+            "Ribosomes synthesize proteins from amino acids.",
+            "The mitochondria produce ATP through cellular respiration.",
+        ],
+        [
+            {"document_id": "d1", "subject": "biology"},
+            {"document_id": "d1", "subject": "biology"},
+            {"document_id": "d2", "subject": "chemistry"},
+        ],
+    )
+    return index
+
+
+class TestBM25Index:
+    def test_search_ranks_term_matches(self):
+        index = _bm25_fixture()
+        hits = index.search("mitochondria ATP", k=5)
+        assert [cid for cid, _ in hits] == ["d2_chunk_0", "d1_chunk_0"]
+
+    def test_subject_filter(self):
+        index = _bm25_fixture()
+        hits = index.search("mitochondria", k=5, where={"subject": "biology"})
+        assert [cid for cid, _ in hits] == ["d1_chunk_0"]
+        assert not index.supports_filter({"grade_level": "10th"})
+
+    def test_remove_document_and_persist(self, tmp_path):
+        path = str(tmp_path / "bm25.idx")
+        index = _bm25_fixture(path)
+        assert index.remove_document("d1") == 2
+        index.save()
+
+        loaded = BM25Index.load(path)
+        assert len(loaded) == 1
+        assert [cid for cid, _ in loaded.search("mitochondria")] == ["d2_chunk_0"]
+
+    def test_tombstones_do_not_count_toward_document_frequency(self):
+        index = _bm25_fixture()
+        fresh = BM25Index()
+        fresh.add(
+            ["d2_chunk_0"],
+            ["The mitochondria produce ATP through cellular respiration."],
+            [{"document_id": "d2", "subject": "chemistry"}],
+        )
+        index.compact_ratio = 1.0  # keep the tombstones
+        index.remove_document("d1")
+
+        assert index.stats()["tombstoned"] == 2
+        assert index.search("mitochondria") == pytest.approx(fresh.search("mitochondria"))
+
+    def test_document_filter(self):
+        index = _bm25_fixture()
+        hits = index.search("mitochondria ribosomes", k=5, where={"document_id": "d1"})
+        assert sorted(cid for cid, _ in hits) == ["d1_chunk_0", "d1_chunk_1"]
+        assert index.search("mitochondria", where={"subject": "physics"}) == []
+
+    def test_only_the_first_loader_writes_the_file(self, tmp_path):
+        path = str(tmp_path / "bm25.idx")
+        writer = BM25Index.load(path)
+        other = BM25Index.load(path)
+        assert not writer.read_only and other.read_only
+
+        other.add(["x"], ["other worker"], [{}])
+        other.save()
+        assert not (tmp_path / "bm25.idx").exists()
+        writer.add(["y"], ["owning worker"], [{}])
+        writer.save()
+        writer.close()
+
+        reloaded = BM25Index.load(path)
+        assert not reloaded.read_only
+        assert [cid for cid, _ in reloaded.search("worker")] == ["y"]
+        reloaded.close()
+
+    async def test_sync_picks_up_other_workers_writes(self):
+        index = _bm25_fixture()  # d1_chunk_0, d1_chunk_1, d2_chunk_0
+        collection = MagicMock()
+
+        def get(ids=None, limit=None, offset=0, include=None):
+            if ids is not None:
+                return {
+                    "ids": ids,
+                    "documents": ["Chloroplasts capture light energy."],
+                    "metadatas": [{"document_id": "d3", "subject": "biology"}],
+                }
+            stored = ["d1_chunk_0", "d1_chunk_1", "d3_chunk_0"]  # d2 deleted elsewhere
+            return {"ids": stored[offset:offset + limit]}
+
+        collection.get.side_effect = get
+        retriever = _make_retriever(collection, keyword_index=index)
+
+        assert await retriever.sync_keyword_index(batch_size=2) == {"added": 1, "removed": 1}
+        assert index.chunk_ids() == {"d1_chunk_0", "d1_chunk_1", "d3_chunk_0"}
+        assert [cid for cid, _ in index.search("chloroplasts")] == ["d3_chunk_0"]
+        assert await retriever.sync_keyword_index(batch_size=2) == {"added": 0, "removed": 0}
+
+    def test_reciprocal_rank_fusion(self):
+        fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "a"]])
+        assert [cid for cid, _ in fused] == ["a", "c", "b"]
+
+    async def test_hybrid_retrieve_adds_keyword_only_hits(self):
+        collection = MagicMock()
+        collection.query.return_value = {
+            "ids": [["d1_chunk_1"]],
+            "documents": [["Ribosomes synthesize proteins from amino acids."]],
+            "metadatas": [[{"document_id": "d1"}]],
+            "distances": [[0.4]],
+        }
+        collection.get.return_value = {
+            "ids": ["d2_chunk_0"],
+            "documents": ["The mitochondria produce ATP through cellular respiration."],
+            "metadatas": [{"document_id": "d2"}],
+        }
+        retriever = _make_retriever(collection, keyword_index=_bm25_fixture())
+
+        result = await retriever.retrieve("ATP production", k=2, rewrite=False)
+
+        ids = [src["id"] for src in result["sources"]]
+        assert "d2_chunk_0" in ids
+        assert all("rrf_score" in src for src in result["sources"])
+        assert collection.get.call_args.kwargs["ids"] == ["d2_chunk_0"]
+
+
+# --- MMR diversification ---
+
+
+class TestMMRDiversifier:
+    def test_near_duplicates_are_skipped(self):
+        relevance = np.array([0.9, 0.89, 0.5])
+        embeddings = np.array([[1.0, 0.0], [0.99, 0.01], [0.0, 1.0]])
+        picked = MMRDiversifier(lambda_mult=0.5).select(relevance, embeddings, k=2)
+        assert picked == [0, 2]
+
+    def test_lambda_one_is_relevance_order(self):
+        relevance = np.array([0.9, 0.89, 0.5])
+        embeddings = np.array([[1.0, 0.0], [0.99, 0.01], [0.0, 1.0]])
+        picked = MMRDiversifier(lambda_mult=1.0).select(relevance, embeddings, k=2)
+        assert picked == [0, 1]
+
+    def test_same_document_cap(self):
+        relevance = np.array([0.9, 0.8, 0.7, 0.6])
+        picked = MMRDiversifier(lambda_mult=1.0, max_per_document=1).select(
+            relevance, None, k=3, groups=["a", "a", "b", "b"]
+        )
+        assert picked == [0, 2]
+
+    async def test_retrieve_over_fetches_and_diversifies(self):
+        collection = MagicMock()
+        collection.query.return_value = {
+            "ids": [["d1_chunk_0", "d1_chunk_1", "d2_chunk_0", "d3_chunk_0"]],
+            "documents": [[
+                "Osmosis moves water across a membrane.",
+                "Osmosis moves water across a cell membrane.",
+                "Diffusion spreads particles from high to low concentration.",
+                "Active transport uses energy.",
+            ]],
+            "metadatas": [[
+                {"document_id": "d1"}, {"document_id": "d1"},
+                {"document_id": "d2"}, {"document_id": "d3"},
+            ]],
+            "distances": [[0.10, 0.11, 0.30, 0.60]],
+            "embeddings": [np.array([[1.0, 0.0], [0.99, 0.05], [0.2, 0.9], [0.0, 1.0]])],
+        }
+        retriever = _make_retriever(
+            collection, diversifier=MMRDiversifier(lambda_mult=0.5, fetch_factor=2)
+        )
+
+        result = await retriever.retrieve("osmosis", k=2, rewrite=False)
+
+        kwargs = collection.query.call_args.kwargs
+        assert kwargs["n_results"] == 4
+        assert "embeddings" in kwargs["include"]
+        assert [src["id"] for src in result["sources"]] == ["d1_chunk_0", "d2_chunk_0"]
+        assert result["num_results"] == 2
+
+        await retriever.retrieve("osmosis", k=2, rewrite=False, diversify=False)
+        assert collection.query.call_args.kwargs["n_results"] == 2
+        assert "embeddings" not in collection.query.call_args.kwargs["include"]
+
+
+# --- Context packing ---
+
+
+def _chunk_sources(text: str, document_id: str = "doc1") -> list[dict]:
+    chunks = SemanticChunker(chunk_size=300, chunk_overlap=80).chunk(
+        text, {"document_id": document_id}
+    )
+    return [
+        {"id": f"{document_id}_chunk_{i}", "content": c["content"], "metadata": c["metadata"]}
+        for i, c in enumerate(chunks)
+    ]
+
+
+_PARAGRAPHS = "\n\n".join(
+    f"Paragraph {i} explains step {i} of cellular respiration in the mitochondria, "
+    f"where glucose is broken down and ATP is produced for the cell."
+    for i in range(8)
+)
+
+
+class TestContextPacker:
+    def test_adjacent_chunks_merge_without_overlap(self):
+        sources = _chunk_sources(_PARAGRAPHS)[:3]
+        assert sources[1]["content"][:80] in sources[0]["content"]  # chunker overlap
+
+        context, packed, stats = ContextPacker(max_tokens=10_000).pack([sources[1], sources[0], sources[2]])
+
+        assert len(packed) == 3
+        assert stats["merged"] == 2
+        assert "---" not in context
+        for i in range(3):
+            assert context.count(f"Paragraph {i} explains") <= 1
+        assert stats["tokens_saved"] > 0
+        assert stats["packed_tokens"] == estimate_tokens(context)
+
+    def test_duplicates_dropped_and_budget_respected(self):
+        sources = _chunk_sources(_PARAGRAPHS)
+        other = _chunk_sources(_PARAGRAPHS.replace("mitochondria", "chloroplast"), "doc2")
+        ranked = [sources[0], dict(sources[0], id="copy"), other[3], sources[5]]
+
+        context, packed, stats = ContextPacker(max_tokens=120).pack(ranked)
+
+        assert stats["duplicates"] == 1
+        assert estimate_tokens(context) <= 120
+        assert packed[0] is ranked[0]
+        assert stats["skipped"] >= 1
+
+    def test_top_chunk_truncated_when_over_budget(self):
+        context, packed, _ = ContextPacker(max_tokens=10).pack(
+            [{"content": "x" * 400, "metadata": {}}]
+        )
+        assert len(packed) == 1
+        assert estimate_tokens(context) <= 10
+
+    async def test_retrieve_reports_packing(self):
+        sources = _chunk_sources(_PARAGRAPHS)[:2]
+        collection = MagicMock()
+        collection.query.return_value = {
+            "ids": [[s["id"] for s in sources]],
+            "documents": [[s["content"] for s in sources]],
+            "metadatas": [[s["metadata"] for s in sources]],
+            "distances": [[0.1, 0.2]],
+        }
+        retriever = _make_retriever(collection, context_packer=ContextPacker())
+
+        result = await retriever.retrieve("cellular respiration", rewrite=False)
+
+        assert result["packing"]["merged"] == 1
+        assert result["packing"]["tokens_saved"] > 0
+        assert "---" not in result["context"]
+
+
+# --- Neighbour expansion ---
+
+
+class TestNeighborExpansion:
+    def _collection(self) -> MagicMock:
+        collection = MagicMock()
+        collection.query.return_value = {
+            "ids": [["d1_chunk_2"]],
+            "documents": [["Middle chunk about osmosis."]],
+            "metadatas": [[{"document_id": "d1", "chunk_index": 2, "total_chunks": 4}]],
+            "distances": [[0.1]],
+        }
+        collection.get.return_value = {
+            "ids": ["d1_chunk_1", "d1_chunk_3"],
+            "documents": ["Chunk before.", "Chunk after."],
+            "metadatas": [
+                {"document_id": "d1", "chunk_index": 1, "total_chunks": 4},
+                {"document_id": "d1", "chunk_index": 3, "total_chunks": 4},
+            ],
+        }
+        return collection
+
+    async def test_hits_expanded_with_one_batched_get(self):
+        collection = self._collection()
+        retriever = _make_retriever(collection, neighbor_window=1)
+
+        result = await retriever.retrieve("osmosis", rewrite=False)
+
+        collection.get.assert_called_once()
+        assert collection.get.call_args.kwargs["ids"] == ["d1_chunk_1", "d1_chunk_3"]
+        assert [s["id"] for s in result["sources"]] == ["d1_chunk_2", "d1_chunk_1", "d1_chunk_3"]
+        assert result["sources"][1]["neighbor_of"] == "d1_chunk_2"
+        assert result["context"].index("Chunk before.") < result["context"].index("Middle chunk")
+
+    def test_neighbor_window_respects_document_bounds(self):
+        retriever = KnowledgeRetriever(neighbor_window=2)
+        src = {"metadata": {"document_id": "d1", "chunk_index": 0, "total_chunks": 2}}
+        assert retriever._neighbor_ids(src) == ["d1_chunk_1"]
+
+    async def test_hot_neighbors_served_from_cache(self):
+        collection = self._collection()
+        retriever = _make_retriever(collection, neighbor_window=1, neighbor_cache=LRUCache())
+
+        await retriever.retrieve("osmosis", rewrite=False)
+        await retriever.retrieve("osmosis again", rewrite=False)
+
+        collection.get.assert_called_once()
+        assert retriever.stats()["neighbors"]["cache_hits"] == 2
+
+        await retriever.add_chunks(["x"], ["new"], [{}])
+        await retriever.retrieve("osmosis", rewrite=False)
+        assert collection.get.call_count == 2
+
+
+# --- Embedding service ---
+
+
+class _CountingEmbedder:
+    def __init__(self):
+        self.calls: list[list[str]] = []
+
+    def __call__(self, texts: list[str]) -> list[list[float]]:
+        self.calls.append(list(texts))
+        return [[float(len(t)), 1.0] for t in texts]
+
+
+class TestEmbeddingService:
+    async def test_concurrent_requests_share_a_batch(self):
+        fn = _CountingEmbedder()
+        service = EmbeddingService(embedding_function=fn, max_wait_ms=20)
+
+        results = await asyncio.gather(*(service.embed([f"q{'x' * i}"]) for i in range(5)))
+
+        assert [r[0][0] for r in results] == [1.0, 2.0, 3.0, 4.0, 5.0]
+        assert len(fn.calls) == 1
+        stats = service.stats()
+        assert stats["batches"] == 1
+        assert stats["max_batch_size"] == 5
+        assert stats["queue_depth"] == 0
+        await service.close()
+
+    async def test_batch_size_cap(self):
+        fn = _CountingEmbedder()
+        service = EmbeddingService(embedding_function=fn, max_batch_size=2, max_wait_ms=50)
+        await service.embed(["a1", "a2", "a3", "a4", "a5"])
+        assert [len(c) for c in fn.calls] == [2, 2, 1]
+        await service.close()
+
+    async def test_retriever_sends_query_embeddings(self):
+        collection = MagicMock()
+        collection.query.return_value = _query_result(["Osmosis."])
+        service = EmbeddingService(embedding_function=_CountingEmbedder())
+        retriever = _make_retriever(collection, embedder=service)
+
+        result = await retriever.retrieve("osmosis", rewrite=False)
+
+        kwargs = collection.query.call_args.kwargs
+        assert kwargs["query_embeddings"].tolist() == [[7.0, 1.0]]
+        assert "query_texts" not in kwargs
+        assert "embed_ms" in result["timing"]
+        await service.close()
+
+    async def test_embedding_failure_falls_back_to_query_texts(self):
+        def broken(texts):
+            raise RuntimeError("model missing")
+
+        collection = MagicMock()
+        collection.query.return_value = _query_result(["Osmosis."])
+        service = EmbeddingService(embedding_function=broken)
+        retriever = _make_retriever(collection, embedder=service)
+
+        await retriever.retrieve("osmosis", rewrite=False)
+
+        assert collection.query.call_args.kwargs["query_texts"] == ["osmosis"]
+        assert service.stats()["errors"] == 1
+        await service.close()
+
+
+# --- Query-embedding cache ---
+
+
+class TestEmbeddingCache:
+    def test_slab_lru_eviction(self):
+        cache = EmbeddingCache(max_bytes=2 * 3 * 4)  # room for two 3-dim vectors
+        cache.put("a", [1, 2, 3])
+        cache.put("b", [4, 5, 6])
+        cache.get("a")
+        cache.put("c", [7, 8, 9])
+
+        assert cache.get("b") is None
+        assert cache.get("a").tolist() == [1.0, 2.0, 3.0]
+        assert cache.get("c").dtype == np.float32
+        stats = cache.stats()
+        assert stats["capacity"] == 2
+        assert stats["bytes"] == 24
+        assert stats["evictions"] == 1
+
+    async def test_repeat_queries_skip_the_model(self):
+        fn = _CountingEmbedder()
+        service = EmbeddingService(embedding_function=fn, cache=EmbeddingCache(), model_id="m1")
+
+        await service.embed(["Photosynthesis"])
+        vectors = await service.embed(["photosynthesis ", "mitosis"])
+
+        assert fn.calls == [["Photosynthesis"], ["mitosis"]]
+        assert vectors.shape == (2, 2)
+        assert service.stats()["cache"]["hit_rate"] == round(1 / 3, 4)
+        await service.close()
+
+    def test_cache_keyed_on_model(self):
+        cache = EmbeddingCache()
+        cache.put(cache.make_key("m1", "osmosis"), [1.0])
+        assert cache.get(cache.make_key("m2", "osmosis")) is None
+
+    async def test_memory_search_uses_cached_embedding(self):
+        fn = _CountingEmbedder()
+        service = EmbeddingService(embedding_function=fn, cache=EmbeddingCache(), model_id="m1")
+        memory = MemoryManager(redis_url="redis://unused", embedder=service)
+        memory._chroma = MagicMock()
+        collection = memory._chroma.get_or_create_collection.return_value
+        collection.query.return_value = _query_result(["Osmosis."])
+
+        await memory.search_knowledge("osmosis")
+        results = await memory.search_knowledge("Osmosis")
+
+        assert len(fn.calls) == 1
+        assert "query_embeddings" in collection.query.call_args.kwargs
+        assert results[0]["document"] == "Osmosis."
+        await service.close()
+
+    async def test_memory_search_falls_back_to_text_and_raises_store_errors(self):
+        embedder = MagicMock()
+        embedder.embed = AsyncMock(side_effect=RuntimeError("model unavailable"))
+        memory = MemoryManager(redis_url="redis://unused", embedder=embedder)
+        memory._chroma = MagicMock()
+        collection = memory._chroma.get_or_create_collection.return_value
+        collection.query.return_value = _query_result(["Osmosis."])
+
+        results = await memory.search_knowledge("osmosis")
+        assert collection.query.call_args.kwargs["query_texts"] == ["osmosis"]
+        assert results[0]["document"] == "Osmosis."
+
+        collection.query.side_effect = RuntimeError("chroma down")
+        with pytest.raises(RuntimeError, match="chroma down"):
+            await memory.search_knowledge("osmosis")
+
+
+# --- Content-addressed embedding store ---
+
+
+class TestEmbeddingServiceBulk:
+    async def test_bulk_jobs_use_their_own_deadline(self):
+        service = EmbeddingService(embedding_function=_CountingEmbedder(), bulk_timeout=0.05)
+
+        assert await service.run(sum, [1, 2]) == 3
+        with pytest.raises(TimeoutError):
+            await service.run(time.sleep, 0.3)
+        await service.close()
+
+
+class TestEmbeddingStore:
+    def test_persists_and_reloads(self, tmp_path):
+        store = EmbeddingStore(str(tmp_path), model_id="m1")
+        assert store.put_many(["alpha", "beta", "alpha"], [[1, 0], [0, 1], [1, 0]]) == 2
+
+        reopened = EmbeddingStore(str(tmp_path), model_id="m1")
+        found = reopened.get_many(["beta", "gamma"])
+        assert found[0].tolist() == [0.0, 1.0]
+        assert found[1] is None
+        assert reopened.stats()["reuse_ratio"] == 0.5
+        assert EmbeddingStore(str(tmp_path), model_id="m2").get_many(["beta"]) == [None]
+
+    def test_unindexed_tail_is_truncated(self, tmp_path):
+        store = EmbeddingStore(str(tmp_path), model_id="m1")
+        store.put_many(["alpha"], [[1.0, 2.0]])
+        with open(store._vectors_path, "ab") as f:  # simulate a crash before keys were written
+            f.write(b"\0" * 8)
+
+        reopened = EmbeddingStore(str(tmp_path), model_id="m1")
+        reopened.put_many(["beta"], [[3.0, 4.0]])
+        assert reopened.get_many(["beta"])[0].tolist() == [3.0, 4.0]
+
+    def test_stores_sharing_a_directory_see_each_others_rows(self, tmp_path):
+        first = EmbeddingStore(str(tmp_path), model_id="m1")
+        second = EmbeddingStore(str(tmp_path), model_id="m1")  # another worker
+        first.put_many(["alpha"], [[1.0, 0.0]])
+        second.put_many(["beta", "alpha"], [[0.0, 1.0], [9.0, 9.0]])
+        first.put_many(["gamma"], [[0.5, 0.5]])
+
+        assert len(second) == 2
+        assert second.get_many(["alpha", "beta"])[0].tolist() == [1.0, 0.0]
+        assert first.get_many(["beta", "gamma"])[0].tolist() == [0.0, 1.0]
+        reopened = EmbeddingStore(str(tmp_path), model_id="m1")
+        assert [v.tolist() for v in reopened.get_many(["alpha", "beta", "gamma"])] == [
+            [1.0, 0.0], [0.0, 1.0], [0.5, 0.5],
+        ]
+
+    async def test_add_chunks_embeds_only_new_text(self, tmp_path):
+        fn = _CountingEmbedder()
+        collection = MagicMock()
+        retriever = _make_retriever(
+            collection,
+            embedder=EmbeddingService(embedding_function=fn),
+            embedding_store=EmbeddingStore(str(tmp_path), model_id="m1"),
+        )
+
+        await retriever.add_chunks(["a_0", "a_1"], ["one", "two"], [{}, {}])
+        timing = await retriever.add_chunks(["b_0", "b_1"], ["two", "three"], [{}, {}])
+
+        assert fn.calls == [["one", "two"], ["three"]]
+        assert timing["embeddings_reused"] == 1
+        assert timing["embeddings_computed"] == 1
+        assert "embed_ms" in timing
+        sent = collection.upsert.call_args.kwargs["embeddings"]
+        assert sent.tolist() == [[3.0, 1.0], [5.0, 1.0]]
+
+
+# --- Deterministic IDs and deduplication ---
+
+
+class TestIdempotentIngest:
+    def test_ids_are_content_derived(self):
+        assert document_id_for("Photosynthesis text.") == document_id_for("Photosynthesis text.\r\n")
+        assert document_id_for("Photosynthesis text.") != document_id_for("Respiration text.")
+        assert chunk_id("d1", 3) == "d1_chunk_3"
+        assert content_chunk_id("abc") == content_chunk_id("abc")
+
+    async def test_ingest_document_upserts_stable_ids(self):
+        collection = MagicMock()
+        retriever = _make_retriever(collection)
+
+        await retriever.ingest_document("Cells divide by mitosis.")
+        first_ids = collection.upsert.call_args.kwargs["ids"]
+        await retriever.ingest_document("Cells divide by mitosis.")
+
+        assert collection.upsert.call_args.kwargs["ids"] == first_ids
+        collection.add.assert_not_called()
+
+    async def test_ingest_document_goes_through_add_chunks(self, tmp_path):
+        collection = MagicMock()
+        collection.get.return_value = {"ids": []}
+        keyword_index = BM25Index()
+        retriever = _make_retriever(
+            collection,
+            embedder=EmbeddingService(embedding_function=_CountingEmbedder()),
+            embedding_store=EmbeddingStore(str(tmp_path), model_id="m1"),
+            keyword_index=keyword_index,
+        )
+
+        count = await retriever.ingest_document("Cells divide by mitosis.", {"document_id": "bio"})
+
+        assert count == 1
+        assert collection.upsert.call_args.kwargs["embeddings"].shape == (1, 2)
+        assert [cid for cid, _ in keyword_index.search("mitosis")] == ["bio_chunk_0"]
+        assert len(retriever._embedding_store) == 1
+
+    async def test_ingest_document_raises_without_a_collection(self):
+        retriever = KnowledgeRetriever()
+        retriever._initialized = True
+        retriever._retry_after = time.monotonic() + 60  # backing off after a failure
+
+        with pytest.raises(RuntimeError, match="unavailable"):
+            await retriever.ingest_document("Cells divide by mitosis.")
+
+    async def test_add_chunks_prunes_stale_chunks_of_document(self):
+        collection = MagicMock()
+        collection.get.return_value = {"ids": ["d1_chunk_0", "d1_chunk_1", "d1_chunk_2"]}
+        retriever = _make_retriever(collection)
+
+        await retriever.add_chunks(
+            ids=["d1_chunk_0", "d1_chunk_1"],
+            documents=["a", "b"],
+            metadatas=[{"document_id": "d1"}] * 2,
+            document_id="d1",
+        )
+
+        collection.delete.assert_called_once_with(ids=["d1_chunk_2"])
+
+    async def test_store_knowledge_dedupes_and_upserts(self):
+        memory = MemoryManager(redis_url="redis://unused")
+        memory._chroma = MagicMock()
+        collection = memory._chroma.get_or_create_collection.return_value
+
+        await memory.store_knowledge(["same", "same", "other"], [{"n": 1}, {"n": 2}, {"n": 3}])
+
+        kwargs = collection.upsert.call_args.kwargs
+        assert kwargs["documents"] == ["same", "other"]
+        assert kwargs["metadatas"] == [{"n": 1}, {"n": 3}]
+        assert len(set(kwargs["ids"])) == 2
+
+    async def test_deduplicate_reports_then_removes(self):
+        collection = MagicMock()
+        collection.get.side_effect = lambda **kw: (
+            {"ids": ["a", "b", "c", "d"], "documents": ["x", "y", "x", "x"]}
+            if kw["offset"] == 0 else {"ids": [], "documents": []}
+        )
+        index = BM25Index()
+        index.add(["a", "b", "c", "d"], ["x", "y", "x", "x"], [{}] * 4)
+        retriever = _make_retriever(collection, keyword_index=index)
+
+        report = await retriever.deduplicate(dry_run=True)
+        assert report["duplicates"] == 2
+        assert report["examples"] == [{"keep": "a", "remove": ["c", "d"]}]
+        collection.delete.assert_not_called()
+
+        report = await retriever.deduplicate(dry_run=False)
+        assert report["removed"] == 2
+        collection.delete.assert_called_once_with(ids=["c", "d"])
+        assert len(index) == 2
+
+
+# --- Chroma client modes ---
+
+
+class TestChromaClientModes:
+    def test_factory_rejects_unknown_mode(self):
+        with pytest.raises(ValueError):
+            create_chroma_client("grpc")
+
+    def test_persistent_mode_requires_path(self):
+        with pytest.raises(ValueError):
+            create_chroma_client("persistent")
+
+    async def test_retriever_round_trip_in_persistent_mode(self, tmp_path):
+        embedder = EmbeddingService(embedding_function=_CountingEmbedder(), max_wait_ms=1)
+        retriever = KnowledgeRetriever(
+            collection_name="local_test",
+            chroma_mode="persistent",
+            chroma_persist_path=str(tmp_path / "chroma"),
+            embedder=embedder,
+            embedding_store=EmbeddingStore(str(tmp_path / "vectors"), model_id="counting"),
+        )
+        await retriever.initialize()
+
+        await retriever.add_chunks(
+            ["c1", "c2"], ["short text", "a much longer piece of text"], [{"n": 1}, {"n": 2}]
+        )
+        result = await retriever.retrieve("short text", k=1, rewrite=False)
+        await embedder.close()
+
+        assert (tmp_path / "chroma").is_dir()
+        assert retriever.stats()["collection"]["mode"] == "persistent"
+        assert result["sources"][0]["content_preview"] == "short text"
+
+
+# --- Quantized vector store ---
+
+
+class TestQuantizedIndex:
+    @pytest.mark.parametrize("mode", ["int8", "float16"])
+    def test_rescoring_recovers_exact_neighbours(self, mode):
+        rng = np.random.default_rng(0)
+        vectors = rng.standard_normal((500, 32)).astype(np.float32)
+        queries = rng.standard_normal((5, 32)).astype(np.float32)
+        index = QuantizedIndex(mode, rescore_factor=4)
+        index.set_rows(np.arange(500), normalize_rows(vectors))
+
+        hits = index.search(queries, 5, lambda rows: vectors[rows])
+        exact = normalize_rows(queries) @ normalize_rows(vectors).T
+
+        for (rows, sims), truth in zip(hits, exact):
+            assert list(rows) == list(np.argsort(-truth)[:5])
+            assert np.allclose(sims, np.sort(truth)[::-1][:5], atol=1e-5)
+        assert index.nbytes() < vectors.nbytes
+
+    def test_removed_and_filtered_rows_are_skipped(self):
+        vectors = np.eye(4, dtype=np.float32)
+        index = QuantizedIndex("int8")
+        index.set_rows(np.arange(4), vectors)
+        index.remove_rows(np.array([0]))
+
+        rows, _ = index.search(vectors[0], 4, lambda r: vectors[r], allowed=np.array([1, 1, 0, 1], bool))[0]
+        assert sorted(rows) == [1, 3]
+
+
+_COMPACT_ROWS = 2048
+
+
+class TestQuantizedCollection:
+    def test_filters_merge_delete_and_reopen(self, tmp_path):
+        client = QuantizedClient(str(tmp_path))
+        collection = client.get_or_create_collection("content")
+        collection.upsert(
+            ids=["a", "b", "c"],
+            embeddings=[[1.0, 0.0], [0.9, 0.1], [0.0, 1.0]],
+            documents=["A", "B", "C"],
+            metadatas=[{"subject": "math", "n": 1}, {"subject": "math", "n": 2}, {"subject": "art"}],
+        )
+        collection.upsert(ids=["a"], embeddings=[[1.0, 0.0]], documents=["A2"], metadatas=[{"title": "t"}])
+
+        hits = collection.query(query_embeddings=[[1.0, 0.0]], n_results=2, where={"subject": "math"})
+        assert hits["ids"] == [["a", "b"]]
+        assert hits["documents"] == [["A2", "B"]]
+        assert hits["metadatas"][0][0] == {"subject": "math", "n": 1, "title": "t"}
+        assert hits["distances"][0][0] == pytest.approx(0.0, abs=1e-6)
+        assert collection.get(where={"n": {"$gte": 2}})["ids"] == ["b"]
+
+        collection.update(ids=["a"], metadatas=[{"title": None}])
+        collection.delete(where={"subject": "art"})
+        assert collection.count() == 2
+
+        reopened = QuantizedClient(str(tmp_path), quantization="float16").get_collection("content")
+        fetched = reopened.get(ids=["a"], include=["metadatas", "embeddings"])
+        assert fetched["metadatas"] == [{"subject": "math", "n": 1}]
+        assert np.allclose(fetched["embeddings"], [[1.0, 0.0]])
+        assert reopened.query(query_embeddings=[[0.0, 1.0]], n_results=3)["ids"] == [["b", "a"]]
+        assert reopened.stats()["live"] == 2
+
+    def test_distances_stay_paired_with_rows_missing_a_record(self, tmp_path):
+        collection = QuantizedClient(str(tmp_path)).get_or_create_collection("content")
+        collection.upsert(ids=["a", "b", "c"], embeddings=[[1.0, 0.0], [0.8, 0.6], [0.0, 1.0]])
+        collection._db.execute("DELETE FROM chunks WHERE id = 'a'")  # index not told
+
+        hits = collection.query(query_embeddings=[[1.0, 0.0]], n_results=3)
+
+        assert hits["ids"] == [["b", "c"]]
+        assert hits["distances"][0] == pytest.approx([0.2, 1.0], abs=1e-2)
+
+    def test_compaction_reclaims_deleted_rows(self, tmp_path):
+        collection = QuantizedClient(str(tmp_path)).get_or_create_collection("content")
+        rng = np.random.default_rng(0)
+        vectors = rng.standard_normal((_COMPACT_ROWS, 4)).astype(np.float32)
+        ids = [f"c{i}" for i in range(_COMPACT_ROWS)]
+        collection.upsert(ids=ids, embeddings=vectors)
+
+        collection.delete(ids=ids[: _COMPACT_ROWS // 2])
+        assert collection.stats()["tombstones"] == _COMPACT_ROWS // 2
+        collection.delete(ids=ids[_COMPACT_ROWS // 2:][:10])  # past compact_ratio
+
+        stats = collection.stats()
+        assert stats["rows"] == stats["live"] == _COMPACT_ROWS // 2 - 10
+        assert stats["tombstones"] == 0
+        last = collection.get(ids=[ids[-1]], include=["embeddings"])
+        assert np.allclose(last["embeddings"], vectors[-1:])
+        assert collection.query(query_embeddings=vectors[-1:], n_results=1)["ids"] == [[ids[-1]]]
+
+    def test_interrupted_compaction_is_finished_on_open(self, tmp_path):
+        collection = QuantizedClient(str(tmp_path)).get_or_create_collection("content")
+        collection.upsert(ids=["a", "b", "c"], embeddings=[[1.0, 0.0], [0.8, 0.6], [0.0, 1.0]])
+        collection.delete(ids=["a"])
+        # Crash after SQLite took the new row numbers, before the file moved
+        finish = collection._finish_compaction
+        collection._finish_compaction = lambda: None
+        collection.compact()
+        collection._finish_compaction = finish
+        collection.close()
+
+        reopened = QuantizedClient(str(tmp_path)).get_collection("content")
+        fetched = reopened.get(ids=["b", "c"], include=["embeddings"])
+        assert np.allclose(fetched["embeddings"], [[0.8, 0.6], [0.0, 1.0]])
+        assert reopened.stats()["rows"] == 2
+
+    def test_hnsw_parameters_warn_in_quantized_mode(self, tmp_path, caplog):
+        with caplog.at_level("WARNING", logger="src.rag.retriever"):
+            KnowledgeRetriever(chroma_mode="quantized", chroma_persist_path=str(tmp_path))
+            assert not caplog.records
+            KnowledgeRetriever(
+                chroma_mode="quantized", chroma_persist_path=str(tmp_path), hnsw=HNSWConfig(M=32)
+            )
+        assert "ignored" in caplog.records[0].getMessage()
+
+    async def test_retriever_round_trip_in_quantized_mode(self, tmp_path):
+        embedder = EmbeddingService(embedding_function=_CountingEmbedder(), max_wait_ms=1)
+        retriever = KnowledgeRetriever(
+            collection_name="quantized_test",
+            chroma_mode="quantized",
+            chroma_persist_path=str(tmp_path / "chroma"),
+            embedder=embedder,
+            embedding_store=EmbeddingStore(str(tmp_path / "vectors"), model_id="counting"),
+        )
+        await retriever.initialize()
+
+        await retriever.add_chunks(
+            ["c1", "c2"], ["short text", "a much longer piece of text"], [{"n": 1}, {"n": 2}]
+        )
+        result = await retriever.retrieve("short text", k=1, rewrite=False)
+        await embedder.close()
+
+        assert result["sources"][0]["content_preview"] == "short text"
+        assert retriever.stats()["collection"]["quantized"]["live"] == 2
+
+
+# --- Sharding ---
+
+
+class TestShardRouter:
+    def test_names_and_routing(self):
+        router = ShardRouter(base_name="educational_content")
+        assert router.shard_for({"subject": "Computer Science"}) == "educational_content__computer_science"
+        assert router.shard_for({}) == "educational_content__general"
+        assert router.route({"subject": "math", "grade": 5}) == ("educational_content__math", {"grade": 5})
+        assert router.route({"subject": {"$eq": "math"}}) == ("educational_content__math", None)
+        assert router.route({"subject": {"$in": ["a", "b"]}})[0] is None
+        assert router.route({}) == (None, None)
+
+    def test_merge_query_results_keeps_nearest_per_query(self):
+        a = {"ids": [["a1", "a2"]], "documents": [["x", "y"]], "distances": [[0.1, 0.5]]}
+        b = {"ids": [["b1"]], "documents": [["z"]], "distances": [[0.3]]}
+        merged = merge_query_results([a, b], n_results=2)
+        assert merged["ids"] == [["a1", "b1"]]
+        assert merged["distances"] == [[0.1, 0.3]]
+
+
+class TestShardedRetriever:
+    def _retriever(self, tmp_path, embedder, router=None):
+        return KnowledgeRetriever(
+            collection_name="content",
+            chroma_mode="persistent",
+            chroma_persist_path=str(tmp_path / "chroma"),
+            embedder=embedder,
+            embedding_store=EmbeddingStore(str(tmp_path / "vectors"), model_id="counting"),
+            shard_router=router,
+        )
+
+    async def test_reshard_then_route_and_fan_out(self, tmp_path):
+        embedder = EmbeddingService(embedding_function=_CountingEmbedder(), max_wait_ms=1)
+        plain = self._retriever(tmp_path, embedder)
+        await plain.initialize()
+        await plain.add_chunks(
+            ["m1", "b1", "x1"],
+            ["algebra", "cell biology notes", "misc"],
+            [{"subject": "math"}, {"subject": "biology"}, {"source": "x"}],
+        )
+
+        sharded = self._retriever(tmp_path, embedder, ShardRouter(base_name="content"))
+        await sharded.initialize()
+        report = await sharded.reshard()
+        assert report["copied"] == 3
+        assert report["shards"] == {"content__biology": 1, "content__general": 1, "content__math": 1}
+
+        routed = await sharded.retrieve("algebra", subject="math", k=3, rewrite=False)
+        assert [s["id"] for s in routed["sources"]] == ["m1"]
+        fanned = await sharded.retrieve("algebra", k=3, rewrite=False)
+        assert {s["id"] for s in fanned["sources"]} == {"m1", "b1", "x1"}
+        assert fanned["timing"]["shards"] == 3
+
+        memory = MemoryManager(redis_url="redis://unused", retriever=sharded)
+        hits = await memory.search_knowledge("algebra", collection_name="content", filters={"subject": "math"})
+        assert [hit["document"] for hit in hits] == ["algebra"]
+        hits = await memory.search_knowledge("algebra", collection_name="content", n_results=3)
+        assert {hit["document"] for hit in hits} == {"algebra", "cell biology notes", "misc"}
+
+        await sharded.add_chunks(["m2"], ["geometry"], [{"subject": "math", "document_id": "d"}])
+        assert await sharded.count() == 4
+        await sharded.delete_document_chunks("d")
+        assert await sharded.count() == 3
+        await embedder.close()
+
+    async def test_pinned_shard_that_does_not_exist_returns_nothing(self):
+        collection = MagicMock()
+        retriever = _make_retriever(collection, shard_router=ShardRouter(base_name="content"))
+        retriever._client.list_collections.return_value = []
+
+        result = await retriever.retrieve("q", subject="history", rewrite=False, use_cache=False)
+
+        assert result["num_results"] == 0
+        collection.query.assert_not_called()
+
+
+# --- Document metadata resolution ---
+
+
+class _StaticResolver:
+    def __init__(self, documents):
+        self.documents = documents
+        self.calls: list[list[str]] = []
+
+    async def resolve(self, document_ids):
+        self.calls.append(document_ids)
+        return {d: self.documents[d] for d in document_ids if d in self.documents}
+
+    def clear(self):
+        pass
+
+    def stats(self):
+        return {}
+
+
+class TestDocumentResolution:
+    async def test_citations_resolve_titles_in_one_lookup(self):
+        collection = MagicMock()
+        collection.query.return_value = {
+            "ids": [["a", "b"], ["c"]],
+            "documents": [["alpha text", "beta text"], ["gamma text"]],
+            "metadatas": [[{"document_id": "d1"}, {"document_id": "d2"}], [{"document_id": "d1"}]],
+            "distances": [[0.1, 0.2], [0.3]],
+        }
+        resolver = _StaticResolver({"d1": {"title": "Doc One", "source": "one.pdf"}})
+        retriever = _make_retriever(collection, document_resolver=resolver)
+
+        first, second = await retriever.retrieve_many(["alpha", "gamma"], rewrite=False)
+
+        assert len(resolver.calls) == 1
+        assert sorted(set(resolver.calls[0])) == ["d1", "d2"]
+        assert first["citations"][0]["title"] == "Doc One"
+        assert first["citations"][0]["source"] == "one.pdf"
+        assert first["citations"][1]["source"] == "unknown"
+        assert second["citations"][0]["source"] == "one.pdf"
+
+    async def test_prune_metadata_drops_document_level_keys(self, tmp_path):
+        retriever = KnowledgeRetriever(
+            collection_name="prune_test",
+            chroma_mode="persistent",
+            chroma_persist_path=str(tmp_path / "chroma"),
+        )
+        await retriever.initialize()
+        collection = await retriever._acquire_collection()
+        collection.upsert(
+            ids=["c1", "c2"],
+            documents=["one", "two"],
+            embeddings=[[1.0, 0.0], [0.0, 1.0]],
+            metadatas=[
+                {"document_id": "d1", "summary": "s", "key_terms": "a, b"},
+                {"document_id": "d2"},
+            ],
+        )
+
+        report = await retriever.prune_metadata(("document_id",), dry_run=True)
+        assert report["changed"] == 1
+        assert report["keys_removed"] == {"summary": 1, "key_terms": 1}
+
+        await retriever.prune_metadata(("document_id",), dry_run=False)
+        assert collection.get(ids=["c1"])["metadatas"] == [{"document_id": "d1"}]
+
+
+# --- Manifest deletes ---
+
+
+class TestManifestDeletes:
+    async def test_delete_documents_by_id_range_and_filter_fallback(self):
+        collection = MagicMock()
+        index = BM25Index()
+        index.add(
+            ["d1_chunk_0", "d1_chunk_1", "x"],
+            ["a", "b", "c"],
+            [{"document_id": "d1"}, {"document_id": "d1"}, {"document_id": "d2"}],
+        )
+        retriever = _make_retriever(collection, keyword_index=index)
+
+        report = await retriever.delete_documents({"d1": 3, "d2": None}, batch_size=2)
+
+        assert report == {"documents": 2, "by_id": 3, "by_filter": 1, "deleted": True}
+        assert [c.kwargs for c in collection.delete.call_args_list] == [
+            {"ids": ["d1_chunk_0", "d1_chunk_1"]},
+            {"ids": ["d1_chunk_2"]},
+            {"where": {"document_id": "d2"}},
+        ]
+        assert len(index) == 0
+
+    async def test_scan_documents_reports_id_ranges(self):
+        collection = MagicMock()
+        collection.get.side_effect = lambda **kw: (
+            {"ids": ["a", "b", "c", "d"], "metadatas": [
+                {"document_id": "d1", "chunk_index": 0},
+                {"document_id": "d1", "chunk_index": 4},
+                {"document_id": "d2"},
+                {},
+            ]}
+            if kw["offset"] == 0 else {"ids": [], "metadatas": []}
+        )
+        retriever = _make_retriever(collection)
+
+        assert await retriever.scan_documents() == {"d1": 5, "d2": None}
+
+
+# --- HNSW parameters and rebuilds ---
+
+
+class TestHNSWConfig:
+    def test_overrides_cover_shards_and_exact_names_win(self):
+        config = HNSWConfig(
+            M=16,
+            overrides={"content": {"M": 32}, "content__math": {"search_ef": 300}},
+        )
+        assert config.params_for("other") == {"M": 16, "construction_ef": 100, "search_ef": 100}
+        assert config.params_for("content__math") == {"M": 32, "construction_ef": 100, "search_ef": 300}
+        assert config.metadata_for("content")["hnsw:M"] == 32
+        assert config.metadata_for("content")["hnsw:space"] == "cosine"
+        with pytest.raises(ValueError):
+            HNSWConfig(overrides={"content": {"ef": 1}})
+
+
+class TestRebuild:
+    def _retriever(self, tmp_path, embedder, mode="persistent", hnsw=None):
+        return KnowledgeRetriever(
+            collection_name="content",
+            chroma_mode=mode,
+            chroma_persist_path=str(tmp_path / "chroma"),
+            embedder=embedder,
+            embedding_store=EmbeddingStore(str(tmp_path / "vectors"), model_id="counting"),
+            hnsw=hnsw,
+        )
+
+    async def test_rebuild_applies_new_params_and_keeps_chunks(self, tmp_path):
+        embedder = EmbeddingService(embedding_function=_CountingEmbedder(), max_wait_ms=1)
+        before = self._retriever(tmp_path, embedder)
+        await before.initialize()
+        await before.add_chunks(["a", "b", "c"], ["one", "three", "eleven"], [{"n": 1}, {"n": 3}, {"n": 11}])
+        assert HNSWConfig.current(before._collection)["M"] == 16
+
+        retriever = self._retriever(tmp_path, embedder, hnsw=HNSWConfig(M=32, construction_ef=200))
+        await retriever.initialize()
+        assert retriever._hnsw.needs_rebuild(retriever._collection)
+        report = await retriever.rebuild()
+        result = await retriever.retrieve("three", k=1, rewrite=False)
+        await embedder.close()
+
+        physical = report["collections"]["content"]["collection"]
+        assert report["collections"]["content"]["chunks"] == 3
+        assert HNSWConfig.current(retriever._collection)["M"] == 32
+        assert retriever._collection.name == physical
+        assert aliases.resolve(retriever._client, "content") == physical
+        assert sorted(c.name for c in retriever._client.list_collections()) == [
+            aliases.ALIAS_COLLECTION, physical,
+        ]
+        assert result["sources"][0]["id"] == "b"
+
+        # A fresh process finds the rebuilt collection through the alias
+        reopened = self._retriever(tmp_path, embedder, hnsw=HNSWConfig(M=32, construction_ef=200))
+        await reopened.initialize()
+        assert reopened._collection.name == physical
+        assert await reopened.count() == 3
+
+    async def test_writes_during_rebuild_reach_the_new_collection(self, tmp_path):
+        embedder = EmbeddingService(embedding_function=_CountingEmbedder(), max_wait_ms=1)
+        retriever = self._retriever(tmp_path, embedder, mode="quantized")
+        await retriever.initialize()
+        await retriever.add_chunks([f"c{i}" for i in range(20)], [f"t{i}" for i in range(20)], [{}] * 20)
+        await retriever._executor.run(retriever._collection.delete, ids=[f"c{i}" for i in range(10)])
+
+        rebuild = asyncio.create_task(retriever.rebuild(batch_size=4))
+        await asyncio.sleep(0)
+        await retriever.add_chunks(["late"], ["late text"], [{}])
+        report = await rebuild
+        await embedder.close()
+
+        assert await retriever.count() == 11
+        assert retriever._collection.name.startswith("rebuild-content-")
+        assert retriever._collection.stats()["rows"] == 11  # tombstones compacted
+        assert report["collections"]["content"]["chunks"] in (10, 11)
+
+    async def test_writes_while_rebuilding_are_mirrored(self, tmp_path):
+        embedder = EmbeddingService(embedding_function=_CountingEmbedder(), max_wait_ms=1)
+        retriever = self._retriever(tmp_path, embedder)
+        await retriever.initialize()
+        await retriever.add_chunks(["a_chunk_0", "b"], ["one", "two"], [{"n": 1}, {"n": 2}])
+        # Another process started a rebuild and is still copying
+        _, _, target = retriever._start_rebuild("content", "rebuild-content-0000abcd")
+        target.upsert(ids=["a_chunk_0"], documents=["one"], metadatas=[{"n": 1}], embeddings=[[1.0, 0.0]])
+
+        await retriever.add_chunks(["c"], ["three"], [{"n": 3}])
+        await retriever.delete_documents({"a": 1})
+        await embedder.close()
+
+        assert sorted(target.get(include=[])["ids"]) == ["c"]
+        assert sorted(retriever._collection.get(include=[])["ids"]) == ["b", "c"]
+
+    async def test_failed_rebuild_keeps_the_old_collection(self, tmp_path, monkeypatch):
+        embedder = EmbeddingService(embedding_function=_CountingEmbedder(), max_wait_ms=1)
+        retriever = self._retriever(tmp_path, embedder)
+        await retriever.initialize()
+        await retriever.add_chunks(["a"], ["one"], [{"n": 1}])
+
+        async def broken_copy(*args, **kwargs):
+            raise RuntimeError("copy failed")
+
+        monkeypatch.setattr(retriever, "_copy_chunks", broken_copy)
+        with pytest.raises(RuntimeError, match="copy failed"):
+            await retriever.rebuild()
+        await retriever.add_chunks(["b"], ["two"], [{"n": 2}])
+        await embedder.close()
+
+        assert aliases.rebuilding(retriever._client) == {}
+        assert aliases.resolve(retriever._client, "content") == "content"
+        assert sorted(c.name for c in retriever._client.list_collections()) == [
+            aliases.ALIAS_COLLECTION, "content",
+        ]
+        assert await retriever.count() == 2
+
+
+class TestAliases:
+    def test_resolve_point_and_rebuilding(self, tmp_path):
+        client = create_chroma_client("persistent", persist_path=str(tmp_path))
+        assert aliases.resolve(client, "content") == "content"
+
+        aliases.mark_rebuilding(client, "content", "rebuild-content-1")
+        assert aliases.rebuilding(client) == {"content": "rebuild-content-1"}
+        assert aliases.resolve(client, "content") == "content"
+
+        aliases.point(client, "content", "rebuild-content-1")
+        assert aliases.rebuilding(client) == {}
+        assert aliases.aliases(client) == {"content": "rebuild-content-1"}
+
+        aliases.point(client, "content", "content")
+        assert aliases.aliases(client) == {}
+
+
+class TestFileLock:
+    def test_serializes_holders_and_releases_from_other_threads(self, tmp_path):
+        path = str(tmp_path / "locks" / "write.lock")
+        first, second = FileLock(path), FileLock(path)
+        first.acquire()
+        acquired = threading.Event()
+
+        def take() -> None:
+            with second:
+                acquired.set()
+
+        thread = threading.Thread(target=take)
+        thread.start()
+        assert not acquired.wait(0.1)
+        threading.Thread(target=first.release).start()
+        assert acquired.wait(2)
+        thread.join()
@@ -1,5 +1,8 @@
 """Dedicated tests for enhanced TutorAgent with strategy integration."""
 
+import asyncio
+import json
+import time
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
@@ -294,3 +297,196 @@ class TestTutorProcessIntegration:
 
         response = await agent.process("Can you draw a graph?", ctx)
         assert response.metadata["needs_visual_aid"] is True
+
+
+class TestTutorStageFanOut:
+    @staticmethod
+    def _agent(mock_llm, **kwargs):
+        mock_response = MagicMock()
+        mock_response.content = "Here is an answer."
+        llm_instance = AsyncMock()
+        llm_instance.ainvoke = AsyncMock(return_value=mock_response)
+        mock_llm.return_value = llm_instance
+
+        from src.agents.tutor import TutorAgent
+
+        return TutorAgent(**kwargs)
+
+    @staticmethod
+    async def _slow(value, delay=0.1):
+        await asyncio.sleep(delay)
+        return value
+
+    @patch("src.agents.base.BaseAgent._initialize_llm")
+    async def test_stages_run_concurrently_with_timings(self, mock_llm):
+        builder = MagicMock()
+        builder.build_context = lambda **kw: self._slow({"mastery_scores": []})
+        memory = MagicMock()
+        memory.track_confusion = lambda *a: self._slow(1)
+        retriever = MagicMock()
+        retriever.retrieve = lambda **kw: self._slow({"sources": [], "context": ""}, delay=0.15)
+        agent = self._agent(mock_llm, retriever=retriever, memory=memory, context_builder=builder)
+        ctx = AgentContext(session_id="s1", student_id="stu-1", current_topic="Limits")
+
+        started = time.perf_counter()
+        response = await agent.process("What is a limit?", ctx)
+        elapsed = time.perf_counter() - started
+
+        timings = response.metadata["stage_timings"]
+        assert elapsed < 0.3  # sequential would take 0.35s
+        assert set(timings) == {
+            "context_ms", "confusion_ms", "retrieval_ms", "pre_llm_ms", "llm_ms", "total_ms",
+        }
+        assert timings["pre_llm_ms"] < timings["context_ms"] + timings["retrieval_ms"]
+        assert response.metadata["critical_path"] == "retrieval"
+        assert "degraded_stages" not in response.metadata
+
+    @patch("src.agents.base.BaseAgent._initialize_llm")
+    async def test_slow_or_failing_stages_are_skipped(self, mock_llm):
+        retriever = MagicMock()
+        retriever.retrieve = lambda **kw: self._slow({"sources": [{"id": "x"}]}, delay=1.0)
+        memory = MagicMock()
+        memory.track_confusion = AsyncMock(side_effect=ConnectionError("redis down"))
+        agent = self._agent(
+            mock_llm, retriever=retriever, memory=memory, stage_timeouts={"retrieval": 0.05}
+        )
+        ctx = AgentContext(session_id="s1", student_id="stu-1", current_topic="Limits")
+
+        response = await agent.process("What is a limit?", ctx)
+
+        assert response.text == "Here is an answer."
+        assert sorted(response.metadata["degraded_stages"]) == ["confusion", "retrieval"]
+        assert "knowledge_sources" not in response.metadata
+        assert response.metadata["stage_timings"]["retrieval_ms"] < 500
+
+    @patch("src.agents.base.BaseAgent._initialize_llm")
+    async def test_degraded_context_parts_are_reported(self, mock_llm):
+        builder = MagicMock()
+        builder.build_context = AsyncMock(return_value={"mastery_scores": [], "degraded": ["knowledge_gaps"]})
+        agent = self._agent(mock_llm, context_builder=builder)
+        ctx = AgentContext(session_id="s1", student_id="stu-1")
+
+        response = await agent.process("What is a limit?", ctx)
+
+        assert response.text == "Here is an answer."
+        assert response.metadata["degraded_stages"] == ["context.knowledge_gaps"]
+
+
+class TestTutorStreaming:
+    @patch("src.agents.base.BaseAgent._initialize_llm")
+    async def test_stream_yields_chunks_then_response(self, mock_llm):
+        async def astream(messages):
+            for part in ["Vari", "", "ables ", "hold values."]:
+                await asyncio.sleep(0)
+                yield MagicMock(content=part)
+
+        llm_instance = MagicMock()
+        llm_instance.astream = astream
+        mock_llm.return_value = llm_instance
+
+        from src.agents.tutor import TutorAgent
+
+        agent = TutorAgent()
+        ctx = AgentContext(session_id="s1", student_id="stu-1")
+
+        items = [item async for item in agent.stream("What is a variable?", ctx)]
+
+        assert items[:-1] == ["Vari", "ables ", "hold values."]
+        final = items[-1]
+        assert isinstance(final, AgentResponse)
+        assert final.text == "Variables hold values."
+        assert final.metadata["stage_timings"]["ttft_ms"] <= final.metadata["stage_timings"]["total_ms"]
+        assert agent.stats()["streams"] == 1
+        assert agent.stats()["ttft_ms"]["samples"] == 1
+
+
+    @patch("src.agents.base.BaseAgent._initialize_llm")
+    async def test_per_call_llm_leaves_agent_model_alone(self, mock_llm):
+        own = MagicMock()
+        own.ainvoke = AsyncMock(return_value=MagicMock(content="own"))
+        override = MagicMock()
+        override.ainvoke = AsyncMock(return_value=MagicMock(content="override"))
+        mock_llm.return_value = own
+
+        from src.agents.tutor import TutorAgent
+
+        agent = TutorAgent()
+        ctx = AgentContext(session_id="s1", student_id="stu-1")
+
+        response = await agent.process("Hi", ctx, llm=override)
+
+        assert response.text == "override"
+        assert agent.llm is own
+        own.ainvoke.assert_not_awaited()
+
+
+class TestChatStreamEndpoint:
+    async def test_stream_emits_tokens_then_done_and_saves_turn(
+        self, test_client, sample_user, mock_memory, mock_orchestrator
+    ):
+        mock_memory.get_session_context.return_value = {
+            "session_id": "s1", "student_id": str(sample_user.id), "student_profile": {},
+        }
+
+        async def process_stream(message, context, llm=None):
+            yield "Hello "
+            yield "there."
+            yield AgentResponse(
+                text="Hello there.",
+                agent_name="tutor",
+                metadata={"stage_timings": {"ttft_ms": 12.5}},
+            )
+
+        mock_orchestrator.process_stream = process_stream
+
+        response = await test_client.post(
+            "/api/v1/chat/message/stream", json={"session_id": "s1", "content": "Hi"}
+        )
+
+        events = [json.loads(line[6:]) for line in response.text.splitlines() if line.startswith("data: ")]
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert [e["text"] for e in events if e["type"] == "token"] == ["Hello ", "there."]
+        assert events[-1]["type"] == "done"
+        assert events[-1]["text"] == "Hello there."
+        mock_memory.add_to_conversation.assert_any_await("s1", "assistant", "Hello there.")
+        assert mock_memory.save_learning_event.await_args.kwargs["data"]["ttft_ms"] == 12.5
+
+    async def test_stream_without_final_response_errors_and_saves_nothing(
+        self, test_client, sample_user, mock_memory, mock_orchestrator
+    ):
+        mock_memory.get_session_context.return_value = {
+            "session_id": "s1", "student_id": str(sample_user.id), "student_profile": {},
+        }
+
+        async def process_stream(message, context, llm=None):
+            yield "Hello "
+
+        mock_orchestrator.process_stream = process_stream
+
+        response = await test_client.post(
+            "/api/v1/chat/message/stream", json={"session_id": "s1", "content": "Hi"}
+        )
+
+        events = [json.loads(line[6:]) for line in response.text.splitlines() if line.startswith("data: ")]
+        assert [e["type"] for e in events] == ["token", "error"]
+        assert "without a response" in events[-1]["detail"]
+        mock_memory.add_to_conversation.assert_not_awaited()
+        mock_memory.save_learning_event.assert_not_awaited()
+
+    async def test_provider_override_is_passed_per_call(
+        self, test_client, sample_user, mock_memory, mock_orchestrator
+    ):
+        mock_memory.get_session_context.return_value = {
+            "session_id": "s1", "student_id": str(sample_user.id), "student_profile": {},
+        }
+        pooled = MagicMock()
+
+        with patch("src.llm.factory.LLMFactory.get", return_value=pooled) as mock_get:
+            response = await test_client.post(
+                "/api/v1/chat/message",
+                json={"session_id": "s1", "content": "Hi", "provider": "openai", "model": "gpt-4o-mini"},
+            )
+
+        assert response.status_code == 200
+        mock_get.assert_called_once_with(provider="openai", model="gpt-4o-mini")
+        assert mock_orchestrator.process.await_args.kwargs["llm"] is pooled